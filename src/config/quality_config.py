@@ -23,6 +23,10 @@ class QualityConfig:
     dark_pixel_value: int = 50  # Pixel intensity considered "dark"
     bright_pixel_value: int = 205  # Pixel intensity considered "bright"
 
+    # Decode at 1/N resolution for heuristic checks (1, 2, 4 or 8).
+    # Laplacian variance grows when downscaled, so raise blur_threshold to match.
+    heuristic_downscale: int = 1
+
     # Road surface requirements
     min_road_surface_percentage: float = 25.0
 
@@ -46,6 +50,7 @@ class QualityConfig:
             dark_threshold=float(os.getenv("DARK_THRESHOLD", "0.2")),
             bright_threshold=float(os.getenv("BRIGHT_THRESHOLD", "0.8")),
             min_road_surface_percentage=float(os.getenv("MIN_ROAD_SURFACE", "25.0")),
+            heuristic_downscale=int(os.getenv("HEURISTIC_DOWNSCALE", "1")),
         )
 
     def validate(self) -> None:
@@ -58,5 +63,7 @@ class QualityConfig:
             raise ValueError("Dark threshold must be between 0 and 1")
         if not 0 < self.bright_threshold < 1:
             raise ValueError("Bright threshold must be between 0 and 1")
+        if self.heuristic_downscale not in (1, 2, 4, 8):
+            raise ValueError("Heuristic downscale must be 1, 2, 4 or 8")
         if self.min_road_surface_percentage < 0:
             raise ValueError("Road surface percentage cannot be negative")
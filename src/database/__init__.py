@@ -1,7 +1,8 @@
 """Database package for Road Quality Analysis system."""
 
 from .database_service import DatabaseService
+from .db_adapters import GeoPoint
 from .db_init import DatabaseInitializer
 
 
-__all__ = ["DatabaseInitializer", "DatabaseService"]
+__all__ = ["DatabaseInitializer", "DatabaseService", "GeoPoint"]
@@ -11,21 +11,213 @@ Handles all database operations including:
 
 import logging
 import os
+import threading
+from bisect import bisect_right
 from contextlib import contextmanager
 from datetime import datetime
 from typing import Any, Optional
 
 import psycopg2
 from dotenv import load_dotenv
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
 
 from ..services.image_quality import ImageQualityMetrics
 from ..services.road_quality import RoadQualityMetrics
+from .db_adapters import GeoPoint
 
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Max distance (degrees, ~1 m) for two photos to count as the same location.
+# ST_DWithin on geometry can use the GiST index on photos.location.
+DUPLICATE_LOCATION_TOLERANCE_DEG = 0.00001
+
+# Visual duplicates: photos within ~50 m whose perceptual hashes differ in at
+# most this many of their 64 bits
+VISUAL_DUPLICATE_RADIUS_DEG = 0.0005
+VISUAL_DUPLICATE_MAX_DISTANCE = 5
+
+# Per-session settings sent with every connection. Without synchronous_commit
+# a crash can lose the last few commits (never corrupt data); analysis
+# results can be regenerated, so commits don't wait for the WAL flush.
+DEFAULT_SESSION_SETTINGS = {
+    "synchronous_commit": "off",
+    "lock_timeout": "5s",
+}
+
+# Unique index behind the source + source_image_id duplicate check and the
+# conflict target of the idempotent photo inserts. Location + date_taken
+# lookups use the GiST index on location. Kept in sync with
+# database_schema.sql so databases created before it existed catch up.
+SOURCE_IMAGE_INDEX = "idx_photos_source_image_id"
+# pg_get_indexdef reads "CREATE UNIQUE INDEX <name> ON <schema>.photos USING btree (<columns>)"
+SOURCE_IMAGE_INDEX_PREFIX = "CREATE UNIQUE INDEX idx_photos_source_image_id ON "
+SOURCE_IMAGE_INDEX_SUFFIX = " USING btree (source, source_image_id)"
+
+SOURCE_IMAGE_INDEX_QUERY = """
+    SELECT pg_get_indexdef(c.oid) AS indexdef, i.indisvalid AS valid
+    FROM pg_class c
+    JOIN pg_index i ON i.indexrelid = c.oid
+    WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace
+"""
+
+# Rows sharing a source + source_image_id, which a unique index cannot cover
+DUPLICATE_SOURCE_IMAGE_QUERY = """
+    SELECT count(*) AS duplicates FROM (
+        SELECT 1 FROM photos
+        WHERE source_image_id IS NOT NULL
+        GROUP BY source, source_image_id
+        HAVING count(*) > 1
+    ) AS repeated
+"""
+
+# Built concurrently under a temporary name, so writes carry on during the
+# build and an older index is only dropped once its replacement exists. The
+# first statement clears an invalid index left by an interrupted build.
+SOURCE_IMAGE_INDEX_UPGRADE = (
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_photos_source_image_id_new",
+    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_photos_source_image_id_new "
+    "ON photos(source, source_image_id)",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_photos_source_image_id",
+    "ALTER INDEX idx_photos_source_image_id_new RENAME TO idx_photos_source_image_id",
+)
+
+# Quality scores that are NULL when not computed (see database_schema.sql);
+# databases created before that still have NOT NULL on them
+OPTIONAL_QUALITY_SCORE_COLUMNS = {
+    "blur_score": "ALTER TABLE quality_results ALTER COLUMN blur_score DROP NOT NULL",
+    "exposure_score": "ALTER TABLE quality_results ALTER COLUMN exposure_score DROP NOT NULL",
+}
+
+# crack_severity enum values; anything else is stored as "none"
+CRACK_SEVERITIES = frozenset({"none", "minor", "moderate", "severe"})
+
+# Lower score bounds for each road_quality_rating above "severe_issues"
+QUALITY_RATING_THRESHOLDS = [25, 50, 75, 90]
+QUALITY_RATINGS = ["severe_issues", "poor", "fair", "good", "excellent"]
+
+# Photo joined with its results, shared by the single and batched lookups
+PHOTO_WITH_RESULTS_SELECT = """
+    SELECT
+        p.id as photo_id,
+        p.source,
+        p.source_image_id,
+        ST_Y(p.location) as latitude,
+        ST_X(p.location) as longitude,
+        p.date_taken,
+        p.compass_angle,
+        p.created_at as photo_created_at,
+
+        q.id as quality_id,
+        q.overall_score as quality_score,
+        q.is_usable,
+        q.failure_reasons,
+        q.date_calculated as quality_date,
+
+        r.id as road_analysis_id,
+        r.overall_quality_score as road_score,
+        r.quality_rating,
+        r.crack_confidence,
+        r.crack_severity,
+        r.pothole_count,
+        r.date_calculated as analysis_date
+
+    FROM photos p
+    LEFT JOIN quality_results q ON p.id = q.photo_id
+    LEFT JOIN road_analysis_results r ON p.id = r.photo_id
+"""
+
+# Result inserts, written out in full so no SQL is built at run time. Values
+# come from _quality_result_values and _road_analysis_values after photo_id.
+INSERT_QUALITY_RESULT = """
+    INSERT INTO quality_results (
+        photo_id, overall_score, blur_score, exposure_score, size_score,
+        road_surface_percentage, has_sufficient_road, is_usable,
+        failure_reasons, assessment_version
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING id
+"""
+
+INSERT_ROAD_ANALYSIS = """
+    INSERT INTO road_analysis_results (
+        photo_id, overall_quality_score, quality_rating,
+        crack_confidence, crack_severity, pothole_confidence, pothole_count,
+        surface_roughness, surface_type, lane_marking_visibility, debris_score,
+        weather_condition, assessment_confidence,
+        model_name, model_version
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING id
+"""
+
+# Both results of one photo in a single round-trip (see save_photo_results)
+INSERT_QUALITY_RESULT_ONLY = """
+    WITH new_quality AS (
+        INSERT INTO quality_results (
+            photo_id, overall_score, blur_score, exposure_score, size_score,
+            road_surface_percentage, has_sufficient_road, is_usable,
+            failure_reasons, assessment_version
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING id
+    )
+    SELECT (SELECT id FROM new_quality) AS quality_id, NULL AS road_analysis_id
+"""
+
+INSERT_QUALITY_AND_ROAD_RESULTS = """
+    WITH new_quality AS (
+        INSERT INTO quality_results (
+            photo_id, overall_score, blur_score, exposure_score, size_score,
+            road_surface_percentage, has_sufficient_road, is_usable,
+            failure_reasons, assessment_version
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING id
+    ),
+    new_road AS (
+        INSERT INTO road_analysis_results (
+            photo_id, overall_quality_score, quality_rating,
+            crack_confidence, crack_severity, pothole_confidence, pothole_count,
+            surface_roughness, surface_type, lane_marking_visibility, debris_score,
+            weather_condition, assessment_confidence,
+            model_name, model_version
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING id
+    )
+    SELECT
+        (SELECT id FROM new_quality) AS quality_id,
+        (SELECT id FROM new_road) AS road_analysis_id
+"""
+
+# Multi-row inserts for execute_values (VALUES %s expands to every row)
+BULK_INSERT_PHOTOS = """
+    INSERT INTO photos (
+        street_point_id, source, source_image_id,
+        location, date_taken, compass_angle, phash
+    ) VALUES %s
+    ON CONFLICT (source, source_image_id) DO UPDATE SET source = EXCLUDED.source
+    RETURNING id, (xmax = 0) AS inserted
+"""
+
+BULK_INSERT_QUALITY_RESULTS = """
+    INSERT INTO quality_results (
+        photo_id, overall_score, blur_score, exposure_score, size_score,
+        road_surface_percentage, has_sufficient_road, is_usable,
+        failure_reasons, assessment_version
+    ) VALUES %s
+    RETURNING id
+"""
+
+BULK_INSERT_ROAD_ANALYSIS = """
+    INSERT INTO road_analysis_results (
+        photo_id, overall_quality_score, quality_rating,
+        crack_confidence, crack_severity, pothole_confidence, pothole_count,
+        surface_roughness, surface_type, lane_marking_visibility, debris_score,
+        weather_condition, assessment_confidence,
+        model_name, model_version
+    ) VALUES %s
+    RETURNING id
+"""
+
 
 class DatabaseService:
     """Handles all database operations for road quality analysis."""
@@ -37,8 +229,21 @@ class DatabaseService:
         database: Optional[str] = None,
         user: Optional[str] = None,
         password: Optional[str] = None,
+        session_settings: Optional[dict[str, str]] = None,
+        pool_size: Optional[int] = None,
     ) -> None:
-        """Initialize database service with connection parameters."""
+        """
+        Initialize database service with connection parameters.
+
+        Args:
+            session_settings: Postgres settings applied to every connection
+                (defaults to DEFAULT_SESSION_SETTINGS, {} to use server defaults)
+            pool_size: Keep up to this many connections open and reuse them across
+                transactions (e.g. one per thread using the service). When all
+                are in use, further transactions wait for one to be returned.
+                None opens a connection per transaction, which suits connecting
+                through pgbouncer in pool_mode=transaction.
+        """
 
         self.host = host or os.getenv("DB_HOST", "localhost")
         self.port = port or int(os.getenv("DB_PORT", 5432))
@@ -51,23 +256,111 @@ class DatabaseService:
                 "Database password must be provided via DB_PASSWORD env var or constructor"
             )
 
+        self.session_settings = (
+            DEFAULT_SESSION_SETTINGS if session_settings is None else session_settings
+        )
+        self._options = self._session_options(self.session_settings)
+
+        # Created on first use, so constructing the service never connects
+        self.pool_size = pool_size
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        # ThreadedConnectionPool raises when exhausted; callers wait here instead
+        self._pool_slots = threading.BoundedSemaphore(pool_size) if pool_size else None
+
+        # Per-thread connection of the outermost open transaction, if any, and
+        # the connection kept open by pinned_connection
+        self._local = threading.local()
+
+    @staticmethod
+    def _session_options(settings: dict[str, str]) -> Optional[str]:
+        """Build the libpq options string that applies settings at connect time."""
+        # Sent in the startup packet, so applying them costs no extra round-trip
+        options = []
+        for name, value in settings.items():
+            escaped = str(value).replace("\\", "\\\\").replace(" ", "\\ ")
+            options.append(f"-c {name}={escaped}")
+        return " ".join(options) or None
+
+    def _connection_params(self) -> dict[str, Any]:
+        """Keyword arguments for psycopg2.connect."""
+        return {
+            "host": self.host,
+            "port": self.port,
+            "database": self.database,
+            "user": self.user,
+            "password": self.password,
+            "options": self._options,
+            "cursor_factory": RealDictCursor,
+        }
+
     def get_connection(self) -> psycopg2.extensions.connection:
         """Get database connection."""
-        return psycopg2.connect(
-            host=self.host,
-            port=self.port,
-            database=self.database,
-            user=self.user,
-            password=self.password,
-            cursor_factory=RealDictCursor,
-        )
+        return psycopg2.connect(**self._connection_params())
+
+    def _acquire_connection(self) -> psycopg2.extensions.connection:
+        """Take a connection from the pool, or open a new one without pooling."""
+        if not self.pool_size:
+            return self.get_connection()
+
+        self._pool_slots.acquire()
+        try:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadedConnectionPool(
+                        0, self.pool_size, **self._connection_params()
+                    )
+            return self._pool.getconn()
+        except BaseException:
+            self._pool_slots.release()
+            raise
+
+    def _release_connection(self, conn: psycopg2.extensions.connection) -> None:
+        """Return a connection to the pool, or close it without pooling."""
+        try:
+            if self._pool is None:
+                conn.close()
+            else:
+                # Connections broken by the server are dropped instead of reused
+                self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            if self._pool_slots is not None:
+                self._pool_slots.release()
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
 
     @contextmanager
     def transaction(self):
-        """Context manager for database transactions."""
+        """
+        Context manager for database transactions.
+
+        Transactions opened while another is already open on the same thread
+        reuse its connection and run inside a SAVEPOINT, so a failure only
+        rolls back the nested block and the outer transaction commits once.
+        """
+        if getattr(self._local, "conn", None) is not None:
+            with self._savepoint(self._local.conn) as conn:
+                yield conn
+            return
+
+        pinning = getattr(self._local, "pinning", False)
         conn = None
         try:
-            conn = self.get_connection()
+            conn = getattr(self._local, "pinned", None) if pinning else None
+            if conn is not None and conn.closed:
+                self._release_connection(conn)
+                conn = None
+            if conn is None:
+                conn = self._acquire_connection()
+                if pinning:
+                    self._local.pinned = conn
+            self._local.conn = conn
+            self._local.depth = 0
             yield conn
             conn.commit()
             logger.debug("Transaction committed successfully")
@@ -77,8 +370,108 @@ class DatabaseService:
                 logger.error(f"Transaction rolled back due to error: {e}")
             raise
         finally:
-            if conn:
-                conn.close()
+            self._local.conn = None
+            if conn and not pinning:
+                self._release_connection(conn)
+
+    @contextmanager
+    def pinned_connection(self):
+        """
+        Reuse one connection for the transactions opened on this thread in the block.
+
+        The first transaction opens the connection and it is closed when the
+        block exits, so a run of short transactions connects once. Each
+        transaction still commits on its own.
+        """
+        if getattr(self._local, "pinning", False):
+            yield
+            return
+
+        self._local.pinning = True
+        try:
+            yield
+        finally:
+            self._local.pinning = False
+            conn = getattr(self._local, "pinned", None)
+            self._local.pinned = None
+            if conn is not None:
+                self._release_connection(conn)
+
+    @contextmanager
+    def _savepoint(self, conn: psycopg2.extensions.connection):
+        """Run a nested block inside a savepoint of the open transaction."""
+        self._local.depth += 1
+        name = f"nested_{self._local.depth}"
+        cursor = conn.cursor()
+        cursor.execute(f"SAVEPOINT {name}")
+        try:
+            yield conn
+            cursor.execute(f"RELEASE SAVEPOINT {name}")
+        except Exception as e:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            logger.error(f"Rolled back to savepoint {name} due to error: {e}")
+            raise
+        finally:
+            self._local.depth -= 1
+
+    def ensure_duplicate_indexes(self) -> None:
+        """
+        Create or upgrade the unique index used by the duplicate checks.
+
+        Raises:
+            RuntimeError: If photos already holds rows sharing a source and
+                source_image_id, so the unique index cannot be built
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SOURCE_IMAGE_INDEX_QUERY, (SOURCE_IMAGE_INDEX,))
+            row = cursor.fetchone()
+            if (
+                row
+                and row["valid"]
+                and row["indexdef"].startswith(SOURCE_IMAGE_INDEX_PREFIX)
+                and row["indexdef"].endswith(SOURCE_IMAGE_INDEX_SUFFIX)
+            ):
+                return
+
+            cursor.execute(DUPLICATE_SOURCE_IMAGE_QUERY)
+            duplicates = cursor.fetchone()["duplicates"]
+
+        if duplicates:
+            raise RuntimeError(
+                f"{duplicates} source + source_image_id values are stored more than once "
+                f"in photos; remove the extra rows so {SOURCE_IMAGE_INDEX} can be built"
+            )
+
+        logger.info(f"Building duplicate check index {SOURCE_IMAGE_INDEX}")
+        # CONCURRENTLY cannot run inside a transaction block
+        conn = self.get_connection()
+        try:
+            conn.autocommit = True
+            cursor = conn.cursor()
+            for statement in SOURCE_IMAGE_INDEX_UPGRADE:
+                cursor.execute(statement)
+        finally:
+            conn.close()
+
+    def ensure_optional_quality_scores(self) -> None:
+        """Drop NOT NULL from quality scores that may be stored as not computed."""
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            # Only alter columns that need it, as ALTER TABLE locks the table
+            cursor.execute(
+                """
+                SELECT column_name FROM information_schema.columns
+                WHERE table_schema = current_schema()
+                  AND table_name = 'quality_results'
+                  AND column_name = ANY(%s)
+                  AND is_nullable = 'NO'
+            """,
+                (list(OPTIONAL_QUALITY_SCORE_COLUMNS),),
+            )
+            for row in cursor.fetchall():
+                logger.info(f"Allowing NULL in quality_results.{row['column_name']}")
+                cursor.execute(OPTIONAL_QUALITY_SCORE_COLUMNS[row["column_name"]])
 
     def check_duplicate_photo(
         self,
@@ -118,11 +511,11 @@ class DatabaseService:
                 result = cursor.fetchone()
                 if result:
                     logger.info(
-                        f"Found duplicate photo by source_image_id: {source}:{source_image_id}"
+                        "Found duplicate photo by source_image_id: %s:%s", source, source_image_id
                     )
                     return dict(result)
 
-            # Secondary: Check by exact location + date_taken
+            # Secondary: Check by location (within tolerance) + date_taken
             if location and date_taken:
                 lat, lon = location
                 cursor.execute(
@@ -131,21 +524,327 @@ class DatabaseService:
                            ST_Y(location) as latitude, ST_X(location) as longitude,
                            date_taken, created_at
                     FROM photos
-                    WHERE ST_Equals(location, ST_SetSRID(ST_MakePoint(%s, %s), 4326))
+                    WHERE ST_DWithin(location, %s, %s)
                       AND date_taken = %s
+                    LIMIT 1
                 """,
-                    (lon, lat, date_taken),
+                    (
+                        GeoPoint.from_lat_lon(location),
+                        DUPLICATE_LOCATION_TOLERANCE_DEG,
+                        date_taken,
+                    ),
                 )
 
                 result = cursor.fetchone()
                 if result:
                     logger.info(
-                        f"Found duplicate photo by location+time: {lat},{lon} at {date_taken}"
+                        "Found duplicate photo by location+time: %s,%s at %s", lat, lon, date_taken
                     )
                     return dict(result)
 
             return None
 
+    def find_visual_duplicate(
+        self,
+        location: tuple[float, float],
+        phash: int,
+        max_distance: int = VISUAL_DUPLICATE_MAX_DISTANCE,
+    ) -> Optional[dict[str, Any]]:
+        """
+        Find a stored photo near a location that looks the same.
+
+        Catches the same scene uploaded under different image IDs or with
+        different capture times, which the metadata checks miss. Only photos
+        within VISUAL_DUPLICATE_RADIUS_DEG (GiST index) are compared.
+
+        Args:
+            location: (latitude, longitude) tuple
+            phash: Unsigned 64-bit perceptual hash of the image
+            max_distance: Maximum number of differing hash bits
+
+        Returns:
+            Closest matching photo record dict, or None
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            # Popcount of the XOR via its bit string (bit_count needs Postgres 14)
+            cursor.execute(
+                """
+                SELECT id, source, source_image_id,
+                       ST_Y(location) as latitude, ST_X(location) as longitude,
+                       date_taken, created_at, distance
+                FROM (
+                    SELECT *, length(
+                        replace(((phash # %(phash)s)::bit(64))::text, '0', '')
+                    ) AS distance
+                    FROM photos
+                    WHERE ST_DWithin(location, %(location)s, %(radius)s)
+                      AND phash IS NOT NULL
+                ) candidates
+                WHERE distance <= %(max_distance)s
+                ORDER BY distance
+                LIMIT 1
+            """,
+                {
+                    "phash": self._signed_phash(phash),
+                    "location": GeoPoint.from_lat_lon(location),
+                    "radius": VISUAL_DUPLICATE_RADIUS_DEG,
+                    "max_distance": max_distance,
+                },
+            )
+
+            result = cursor.fetchone()
+            if result:
+                logger.info(
+                    "Found visual duplicate photo %s (%s bits apart)",
+                    result["id"],
+                    result["distance"],
+                )
+                return dict(result)
+            return None
+
+    def check_duplicate_photos_batch(
+        self, photos: list[dict[str, Any]]
+    ) -> list[Optional[dict[str, Any]]]:
+        """
+        Check many photos for existing duplicates with one query per key type.
+
+        Applies the same rules as check_duplicate_photo: a match on
+        source + source_image_id first, then location (within tolerance) +
+        date_taken for photos not matched by ID.
+
+        Args:
+            photos: Dicts with source, source_image_id, location and date_taken
+
+        Returns:
+            Photo record dict (or None) for each photo, in the same order
+        """
+        duplicates: list[Optional[dict[str, Any]]] = [None] * len(photos)
+        if not photos:
+            return duplicates
+
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+
+            # Primary: Check by source + source_image_id
+            by_id = [
+                (i, photo["source"], photo["source_image_id"])
+                for i, photo in enumerate(photos)
+                if photo.get("source_image_id")
+            ]
+            if by_id:
+                indexes, sources, image_ids = zip(*by_id)
+                cursor.execute(
+                    """
+                    SELECT DISTINCT ON (v.idx) v.idx,
+                           p.id, p.source, p.source_image_id,
+                           ST_Y(p.location) as latitude, ST_X(p.location) as longitude,
+                           p.date_taken, p.created_at
+                    FROM unnest(%s::int[], %s::image_source[], %s::varchar[])
+                         AS v(idx, source, source_image_id)
+                    JOIN photos p
+                      ON p.source = v.source AND p.source_image_id = v.source_image_id
+                    ORDER BY v.idx, p.id
+                """,
+                    (list(indexes), list(sources), list(image_ids)),
+                )
+                for row in cursor.fetchall():
+                    row = dict(row)
+                    duplicates[row.pop("idx")] = row
+
+            # Secondary: Check by location (within tolerance) + date_taken
+            by_location = [
+                (i, *photo["location"], photo["date_taken"])
+                for i, photo in enumerate(photos)
+                if duplicates[i] is None and photo.get("location") and photo.get("date_taken")
+            ]
+            if by_location:
+                indexes, lats, lons, dates = zip(*by_location)
+                cursor.execute(
+                    """
+                    SELECT DISTINCT ON (v.idx) v.idx,
+                           p.id, p.source, p.source_image_id,
+                           ST_Y(p.location) as latitude, ST_X(p.location) as longitude,
+                           p.date_taken, p.created_at
+                    FROM unnest(%s::int[], %s::float8[], %s::float8[], %s::timestamptz[])
+                         AS v(idx, lat, lon, date_taken)
+                    JOIN photos p
+                      ON ST_DWithin(
+                             p.location, ST_SetSRID(ST_MakePoint(v.lon, v.lat), 4326), %s
+                         )
+                     AND p.date_taken = v.date_taken
+                    ORDER BY v.idx
+                """,
+                    (
+                        list(indexes),
+                        list(lats),
+                        list(lons),
+                        list(dates),
+                        DUPLICATE_LOCATION_TOLERANCE_DEG,
+                    ),
+                )
+                for row in cursor.fetchall():
+                    row = dict(row)
+                    duplicates[row.pop("idx")] = row
+
+        found = sum(duplicate is not None for duplicate in duplicates)
+        logger.info(f"Found {found} duplicate photos out of {len(photos)}")
+        return duplicates
+
+    def get_photo_keys(self, after_id: int = 0) -> list[dict[str, Any]]:
+        """
+        Get the duplicate-detection keys of stored photos.
+
+        Args:
+            after_id: Only return photos with a higher ID (for incremental scans)
+
+        Returns:
+            Dicts with id, source, source_image_id and date_taken, ordered by ID
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, source, source_image_id, date_taken
+                FROM photos
+                WHERE id > %s
+                ORDER BY id
+            """,
+                (after_id,),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def save_photo_idempotent(
+        self,
+        source: str,
+        source_image_id: str = None,
+        location: tuple[float, float] = None,
+        date_taken: datetime = None,
+        compass_angle: float = None,
+        street_point_id: int = None,
+        phash: int = None,
+    ) -> dict[str, Any]:
+        """
+        Insert a photo unless it duplicates a stored one, in one statement.
+
+        Uses the same rules as check_duplicate_photo. A concurrent insert of the
+        same source + source_image_id is caught by the unique index.
+
+        Args:
+            source: Image source ('mapillary', 'streetview', etc.)
+            source_image_id: Original platform image ID
+            location: (latitude, longitude) tuple
+            date_taken: When photo was captured
+            compass_angle: Camera direction in degrees (0-360)
+            street_point_id: Reference to street point (nullable in Phase 1)
+            phash: Unsigned 64-bit perceptual hash of the image
+
+        Returns:
+            Dict with the photo id and whether it was inserted (False for a duplicate)
+        """
+        point = GeoPoint.from_lat_lon(location) if location else None
+        params = {
+            "street_point_id": street_point_id,
+            "source": source,
+            "source_image_id": source_image_id,
+            "location": point,
+            "date_taken": date_taken,
+            "compass_angle": compass_angle,
+            "phash": self._signed_phash(phash),
+            "check_location": bool(location and date_taken),
+            "tolerance": DUPLICATE_LOCATION_TOLERANCE_DEG,
+        }
+
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(
+                """
+                WITH by_id AS (
+                    SELECT id FROM photos
+                    WHERE source = %(source)s AND source_image_id = %(source_image_id)s
+                ),
+                by_location AS (
+                    SELECT id FROM photos
+                    WHERE %(check_location)s
+                      AND ST_DWithin(location, %(location)s, %(tolerance)s)
+                      AND date_taken = %(date_taken)s
+                    LIMIT 1
+                ),
+                new_photo AS (
+                    INSERT INTO photos (
+                        street_point_id, source, source_image_id,
+                        location, date_taken, compass_angle, phash
+                    )
+                    SELECT
+                        %(street_point_id)s, %(source)s, %(source_image_id)s,
+                        %(location)s, %(date_taken)s, %(compass_angle)s, %(phash)s
+                    WHERE NOT EXISTS (SELECT 1 FROM by_id)
+                      AND NOT EXISTS (SELECT 1 FROM by_location)
+                    ON CONFLICT (source, source_image_id) DO NOTHING
+                    RETURNING id
+                )
+                SELECT id, inserted FROM (
+                    SELECT id, TRUE AS inserted, 0 AS priority FROM new_photo
+                    UNION ALL
+                    SELECT id, FALSE, 1 FROM by_id
+                    UNION ALL
+                    SELECT id, FALSE, 2 FROM by_location
+                ) AS matches
+                ORDER BY priority
+                LIMIT 1
+            """,
+                params,
+            )
+
+            result = cursor.fetchone()
+
+        if result is None:
+            # Lost an insert race on the unique index; the winner is now visible
+            duplicate = self.check_duplicate_photo(source, source_image_id, location, date_taken)
+            if not duplicate:
+                raise Exception("Failed to get photo ID from insert")
+            return {"id": duplicate["id"], "inserted": False}
+
+        if result["inserted"]:
+            logger.info("Saved photo %s: %s:%s", result["id"], source, source_image_id)
+        return dict(result)
+
+    def save_photo_results(
+        self,
+        photo_id: int,
+        quality_metrics: ImageQualityMetrics,
+        road_metrics: Optional[RoadQualityMetrics] = None,
+    ) -> dict[str, Optional[int]]:
+        """
+        Save a stored photo's quality and road analysis results in one statement.
+
+        Args:
+            photo_id: Reference to photo
+            quality_metrics: Quality assessment results
+            road_metrics: Road analysis results (None if quality check failed)
+
+        Returns:
+            Dictionary with quality_id and road_analysis_id
+        """
+        params = [photo_id, *self._quality_result_values(quality_metrics)]
+        statement = INSERT_QUALITY_RESULT_ONLY
+        if road_metrics is not None:
+            statement = INSERT_QUALITY_AND_ROAD_RESULTS
+            params.extend([photo_id, *self._road_analysis_values(road_metrics)])
+
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(statement, params)
+
+            result = cursor.fetchone()
+            if not result or not result["quality_id"]:
+                raise Exception("Failed to get quality result ID from insert")
+            logger.info(
+                "Saved results for photo %s: usable=%s", photo_id, quality_metrics.is_usable
+            )
+            return dict(result)
+
     def save_photo(
         self,
         source: str,
@@ -154,6 +853,7 @@ class DatabaseService:
         date_taken: datetime = None,
         compass_angle: float = None,
         street_point_id: int = None,
+        phash: int = None,
     ) -> int:
         """
         Save photo metadata to database.
@@ -165,6 +865,7 @@ class DatabaseService:
             date_taken: When photo was captured
             compass_angle: Camera direction in degrees (0-360)
             street_point_id: Reference to street point (nullable in Phase 1)
+            phash: Unsigned 64-bit perceptual hash of the image
 
         Returns:
             Photo ID
@@ -172,30 +873,32 @@ class DatabaseService:
         with self.transaction() as conn:
             cursor = conn.cursor()
 
-            # Create PostGIS point from lat/lon with SRID 4326
-            location_sql = None
-            if location:
-                lat, lon = location
-                location_sql = f"ST_SetSRID(ST_MakePoint({lon}, {lat}), 4326)"
-
+            # GeoPoint adapts to a PostGIS point with SRID 4326, None to NULL
             cursor.execute(
-                f"""
+                """
                 INSERT INTO photos (
                     street_point_id, source, source_image_id,
-                    location, date_taken, compass_angle
+                    location, date_taken, compass_angle, phash
                 ) VALUES (
-                    %s, %s, %s,
-                    {location_sql if location_sql else "NULL"}, %s, %s
+                    %s, %s, %s, %s, %s, %s, %s
                 ) RETURNING id
             """,
-                (street_point_id, source, source_image_id, date_taken, compass_angle),
+                (
+                    street_point_id,
+                    source,
+                    source_image_id,
+                    GeoPoint.from_lat_lon(location) if location else None,
+                    date_taken,
+                    compass_angle,
+                    self._signed_phash(phash),
+                ),
             )
 
             result = cursor.fetchone()
             photo_id = result["id"] if result else None
             if not photo_id:
                 raise Exception("Failed to get photo ID from insert")
-            logger.info(f"Saved photo {photo_id}: {source}:{source_image_id}")
+            logger.info("Saved photo %s: %s:%s", photo_id, source, source_image_id)
             return photo_id
 
     def save_quality_result(self, photo_id: int, quality_metrics: ImageQualityMetrics) -> int:
@@ -212,35 +915,8 @@ class DatabaseService:
         with self.transaction() as conn:
             cursor = conn.cursor()
 
-            # Convert failure reasons enum to strings
-            failure_reasons = (
-                [reason.value for reason in quality_metrics.failure_reasons]
-                if quality_metrics.failure_reasons
-                else []
-            )
-
             cursor.execute(
-                """
-                INSERT INTO quality_results (
-                    photo_id, overall_score, blur_score, exposure_score, size_score,
-                    road_surface_percentage, has_sufficient_road, is_usable,
-                    failure_reasons, assessment_version
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) RETURNING id
-            """,
-                (
-                    photo_id,
-                    quality_metrics.overall_score,
-                    quality_metrics.blur_score,
-                    quality_metrics.exposure_score,
-                    quality_metrics.size_score,
-                    quality_metrics.road_surface_percentage,
-                    quality_metrics.has_sufficient_road,
-                    quality_metrics.is_usable,
-                    failure_reasons,
-                    getattr(quality_metrics, "assessment_version", "1.0.0"),
-                ),
+                INSERT_QUALITY_RESULT, (photo_id, *self._quality_result_values(quality_metrics))
             )
 
             result = cursor.fetchone()
@@ -248,7 +924,10 @@ class DatabaseService:
             if not quality_id:
                 raise Exception("Failed to get quality result ID from insert")
             logger.info(
-                f"Saved quality result {quality_id} for photo {photo_id}: usable={quality_metrics.is_usable}"
+                "Saved quality result %s for photo %s: usable=%s",
+                quality_id,
+                photo_id,
+                quality_metrics.is_usable,
             )
             return quality_id
 
@@ -266,60 +945,8 @@ class DatabaseService:
         with self.transaction() as conn:
             cursor = conn.cursor()
 
-            # Map crack severity to enum
-            crack_severity_map = {
-                "none": "none",
-                "minor": "minor",
-                "moderate": "moderate",
-                "severe": "severe",
-            }
-            crack_severity = crack_severity_map.get(road_metrics.crack_severity, "none")
-
-            # Map surface type (if available in road_metrics)
-            surface_type = getattr(road_metrics, "surface_type", None)
-
-            # Determine quality rating from overall score
-            score = road_metrics.overall_quality_score
-            if score >= 90:
-                quality_rating = "excellent"
-            elif score >= 75:
-                quality_rating = "good"
-            elif score >= 50:
-                quality_rating = "fair"
-            elif score >= 25:
-                quality_rating = "poor"
-            else:
-                quality_rating = "severe_issues"
-
             cursor.execute(
-                """
-                INSERT INTO road_analysis_results (
-                    photo_id, overall_quality_score, quality_rating,
-                    crack_confidence, crack_severity, pothole_confidence, pothole_count,
-                    surface_roughness, surface_type, lane_marking_visibility, debris_score,
-                    weather_condition, assessment_confidence,
-                    model_name, model_version
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) RETURNING id
-            """,
-                (
-                    photo_id,
-                    road_metrics.overall_quality_score,
-                    quality_rating,
-                    road_metrics.crack_confidence,
-                    crack_severity,
-                    road_metrics.pothole_confidence,
-                    road_metrics.pothole_count,
-                    road_metrics.surface_roughness,
-                    surface_type,
-                    road_metrics.lane_marking_visibility,
-                    road_metrics.debris_score,
-                    road_metrics.weather_condition,
-                    road_metrics.assessment_confidence,
-                    road_metrics.model_name,
-                    road_metrics.model_version,
-                ),
+                INSERT_ROAD_ANALYSIS, (photo_id, *self._road_analysis_values(road_metrics))
             )
 
             result = cursor.fetchone()
@@ -327,10 +954,170 @@ class DatabaseService:
             if not analysis_id:
                 raise Exception("Failed to get road analysis ID from insert")
             logger.info(
-                f"Saved road analysis {analysis_id} for photo {photo_id}: score={road_metrics.overall_quality_score:.1f}"
+                "Saved road analysis %s for photo %s: score=%.1f",
+                analysis_id,
+                photo_id,
+                road_metrics.overall_quality_score,
             )
             return analysis_id
 
+    def save_photos_bulk_idempotent(self, photos: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Save many photos in a single multi-row INSERT, tolerating concurrent inserts.
+
+        A photo whose source + source_image_id was stored since it was checked
+        (e.g. by another thread processing an overlapping coordinate) is not
+        inserted again; its existing ID is returned instead of the whole
+        statement failing on the unique index.
+
+        Args:
+            photos: Dicts with the keyword arguments accepted by save_photo
+
+        Returns:
+            Dicts with the photo id and whether it was inserted, in the same
+            order as photos
+        """
+        # DO UPDATE (not DO NOTHING) so conflicting rows are returned as well;
+        # xmax is 0 only for freshly inserted rows
+        rows = self._execute_many(
+            BULK_INSERT_PHOTOS, [self._photo_values(photo) for photo in photos]
+        )
+        claimed = [{"id": row["id"], "inserted": row["inserted"]} for row in rows]
+        logger.info(f"Saved {sum(row['inserted'] for row in claimed)} of {len(claimed)} photos")
+        return claimed
+
+    def save_quality_results_bulk(
+        self, results: list[tuple[int, ImageQualityMetrics]]
+    ) -> list[int]:
+        """
+        Save many quality assessment results in a single multi-row INSERT.
+
+        Args:
+            results: (photo_id, quality_metrics) pairs
+
+        Returns:
+            Quality result IDs in the same order as results
+        """
+        quality_ids = self._insert_many(
+            BULK_INSERT_QUALITY_RESULTS,
+            [
+                (photo_id, *self._quality_result_values(quality_metrics))
+                for photo_id, quality_metrics in results
+            ],
+        )
+        logger.info(f"Saved {len(quality_ids)} quality results")
+        return quality_ids
+
+    def save_road_analysis_bulk(self, results: list[tuple[int, RoadQualityMetrics]]) -> list[int]:
+        """
+        Save many road analysis results in a single multi-row INSERT.
+
+        Args:
+            results: (photo_id, road_metrics) pairs
+
+        Returns:
+            Road analysis result IDs in the same order as results
+        """
+        analysis_ids = self._insert_many(
+            BULK_INSERT_ROAD_ANALYSIS,
+            [
+                (photo_id, *self._road_analysis_values(road_metrics))
+                for photo_id, road_metrics in results
+            ],
+        )
+        logger.info(f"Saved {len(analysis_ids)} road analysis results")
+        return analysis_ids
+
+    def _insert_many(self, sql: str, values: list[tuple]) -> list[int]:
+        """Run a multi-row INSERT ... VALUES %s RETURNING id and return the IDs."""
+        return [row["id"] for row in self._execute_many(sql, values)]
+
+    def _execute_many(self, sql: str, values: list[tuple]) -> list[dict[str, Any]]:
+        """Run a multi-row INSERT ... VALUES %s RETURNING ... and return one row per value."""
+        if not values:
+            return []
+
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            # One statement for all rows; RETURNING yields rows in VALUES order
+            rows = execute_values(cursor, sql, values, page_size=len(values), fetch=True)
+
+        if len(rows) != len(values):
+            raise Exception(f"Expected {len(values)} rows from bulk insert, got {len(rows)}")
+        return rows
+
+    @classmethod
+    def _photo_values(cls, photo: dict[str, Any]) -> tuple:
+        """Build BULK_INSERT_PHOTOS row values from save_photo keyword arguments."""
+        return (
+            photo.get("street_point_id"),
+            photo["source"],
+            photo.get("source_image_id"),
+            GeoPoint.from_lat_lon(photo["location"]) if photo.get("location") else None,
+            photo.get("date_taken"),
+            photo.get("compass_angle"),
+            cls._signed_phash(photo.get("phash")),
+        )
+
+    @staticmethod
+    def _signed_phash(phash: Optional[int]) -> Optional[int]:
+        """Reinterpret an unsigned 64-bit hash as the signed value a BIGINT stores."""
+        if phash is None:
+            return None
+        return phash - (1 << 64) if phash >= 1 << 63 else phash
+
+    @staticmethod
+    def _quality_result_values(quality_metrics: ImageQualityMetrics) -> tuple:
+        """Build quality_results column values (excluding photo_id)."""
+        # Convert failure reasons enum to strings
+        failure_reasons = (
+            [reason.value for reason in quality_metrics.failure_reasons]
+            if quality_metrics.failure_reasons
+            else []
+        )
+
+        return (
+            quality_metrics.overall_score,
+            quality_metrics.blur_score,
+            quality_metrics.exposure_score,
+            quality_metrics.size_score,
+            quality_metrics.road_surface_percentage,
+            quality_metrics.has_sufficient_road,
+            quality_metrics.is_usable,
+            failure_reasons,
+            quality_metrics.assessment_version,
+        )
+
+    @staticmethod
+    def _road_analysis_values(road_metrics: RoadQualityMetrics) -> tuple:
+        """Build road_analysis_results column values (excluding photo_id)."""
+        # Map crack severity to enum
+        crack_severity = road_metrics.crack_severity
+        if crack_severity not in CRACK_SEVERITIES:
+            crack_severity = "none"
+
+        # Determine quality rating from overall score
+        quality_rating = QUALITY_RATINGS[
+            bisect_right(QUALITY_RATING_THRESHOLDS, road_metrics.overall_quality_score)
+        ]
+
+        return (
+            road_metrics.overall_quality_score,
+            quality_rating,
+            road_metrics.crack_confidence,
+            crack_severity,
+            road_metrics.pothole_confidence,
+            road_metrics.pothole_count,
+            road_metrics.surface_roughness,
+            road_metrics.surface_type,
+            road_metrics.lane_marking_visibility,
+            road_metrics.debris_score,
+            road_metrics.weather_condition,
+            road_metrics.assessment_confidence,
+            road_metrics.model_name,
+            road_metrics.model_version,
+        )
+
     def get_photo_with_results(self, photo_id: int) -> Optional[dict[str, Any]]:
         """
         Get photo with its quality and road analysis results.
@@ -343,43 +1130,35 @@ class DatabaseService:
         """
         with self.transaction() as conn:
             cursor = conn.cursor()
+            cursor.execute(f"{PHOTO_WITH_RESULTS_SELECT} WHERE p.id = %s", (photo_id,))
 
-            cursor.execute(
-                """
-                SELECT
-                    p.id as photo_id,
-                    p.source,
-                    p.source_image_id,
-                    ST_Y(p.location) as latitude,
-                    ST_X(p.location) as longitude,
-                    p.date_taken,
-                    p.compass_angle,
-                    p.created_at as photo_created_at,
-
-                    q.id as quality_id,
-                    q.overall_score as quality_score,
-                    q.is_usable,
-                    q.failure_reasons,
-                    q.date_calculated as quality_date,
-
-                    r.id as road_analysis_id,
-                    r.overall_quality_score as road_score,
-                    r.quality_rating,
-                    r.crack_confidence,
-                    r.crack_severity,
-                    r.pothole_count,
-                    r.date_calculated as analysis_date
+            result = cursor.fetchone()
+            return dict(result) if result else None
 
-                FROM photos p
-                LEFT JOIN quality_results q ON p.id = q.photo_id
-                LEFT JOIN road_analysis_results r ON p.id = r.photo_id
-                WHERE p.id = %s
-            """,
-                (photo_id,),
+    def get_photos_with_results(self, photo_ids: list[int]) -> dict[int, dict[str, Any]]:
+        """
+        Get several photos with their quality and road analysis results in one query.
+
+        Args:
+            photo_ids: Photo IDs to retrieve
+
+        Returns:
+            Complete photo records with results by photo ID (missing IDs are left out)
+        """
+        if not photo_ids:
+            return {}
+
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"{PHOTO_WITH_RESULTS_SELECT} WHERE p.id = ANY(%s::int[])", (list(photo_ids),)
             )
 
-            result = cursor.fetchone()
-            return dict(result) if result else None
+            photos = {}
+            for row in cursor.fetchall():
+                # Like get_photo_with_results, one row per photo
+                photos.setdefault(row["photo_id"], dict(row))
+            return photos
 
     def get_processing_stats(self) -> dict[str, Any]:
         """Get summary statistics about processed photos."""
@@ -404,13 +1183,17 @@ class DatabaseService:
             result = cursor.fetchone()
             if result:
                 return {
-                    'total_photos': result['total_photos'] or 0,
-                    'quality_assessed': result['quality_assessed'] or 0,
-                    'usable_photos': result['usable_photos'] or 0,
-                    'road_analyzed': result['road_analyzed'] or 0,
-                    'avg_quality_score': float(result['avg_quality_score']) if result['avg_quality_score'] else None,
-                    'avg_road_score': float(result['avg_road_score']) if result['avg_road_score'] else None,
-                    'last_quality_assessment': result['last_quality_assessment'],
-                    'last_road_analysis': result['last_road_analysis']
+                    "total_photos": result["total_photos"] or 0,
+                    "quality_assessed": result["quality_assessed"] or 0,
+                    "usable_photos": result["usable_photos"] or 0,
+                    "road_analyzed": result["road_analyzed"] or 0,
+                    "avg_quality_score": float(result["avg_quality_score"])
+                    if result["avg_quality_score"]
+                    else None,
+                    "avg_road_score": float(result["avg_road_score"])
+                    if result["avg_road_score"]
+                    else None,
+                    "last_quality_assessment": result["last_quality_assessment"],
+                    "last_road_analysis": result["last_road_analysis"],
                 }
             return {}
@@ -0,0 +1,46 @@
+"""
+psycopg2 type adapters for Road Quality Analysis database writes.
+
+Registered once when the database package is imported so that:
+- numpy scalars from model outputs can be passed straight to queries
+- GeoPoint values render as PostGIS points without per-query SQL building
+"""
+
+import math
+
+import numpy as np
+from psycopg2.extensions import AsIs, Boolean, Float, register_adapter
+
+
+class GeoPoint(tuple):
+    """(longitude, latitude) pair adapted as a WGS84 PostGIS point."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_lat_lon(cls, location: tuple[float, float]) -> "GeoPoint":
+        """
+        Create a GeoPoint from a (latitude, longitude) tuple.
+
+        Raises:
+            ValueError: If either coordinate is NaN or infinite
+        """
+        lat, lon = float(location[0]), float(location[1])
+        if not (math.isfinite(lat) and math.isfinite(lon)):
+            raise ValueError(f"Location must be finite, got {location!r}")
+        return cls((lon, lat))
+
+
+def _adapt_geo_point(point: GeoPoint) -> AsIs:
+    """Render a GeoPoint as an SRID 4326 point expression."""
+    lon, lat = float(point[0]), float(point[1])
+    # repr of nan/inf is not valid SQL, so never let it reach the query text
+    if not (math.isfinite(lon) and math.isfinite(lat)):
+        raise ValueError(f"GeoPoint must be finite, got {tuple(point)!r}")
+    return AsIs(f"ST_SetSRID(ST_MakePoint({lon!r}, {lat!r}), 4326)")
+
+
+register_adapter(np.integer, lambda value: AsIs(int(value)))
+register_adapter(np.floating, lambda value: Float(float(value)))
+register_adapter(np.bool_, lambda value: Boolean(bool(value)))
+register_adapter(GeoPoint, _adapt_geo_point)
@@ -7,15 +7,23 @@ This module provides functionality to:
 - Handle schema migrations during development
 
 Usage:
-    python -m src.database.db_init --reset  # Drop all and recreate
+    python -m src.database.db_init --reset  # Truncate, or drop all and recreate if schema changed
+    python -m src.database.db_init --reset --full  # Always drop all and recreate
     python -m src.database.db_init --init   # Create if not exists
 """
 
 import argparse
+import hashlib
 import logging
 import os
+import re
 import sys
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Optional
 
 import psycopg2
 from dotenv import load_dotenv
@@ -30,6 +38,27 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# Matches deferrable index statements: "CREATE [UNIQUE] INDEX <name> ON ..."
+INDEX_STATEMENT_RE = re.compile(
+    r"^CREATE\s+(UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s",
+    re.IGNORECASE,
+)
+CONCURRENT_MARKER = "-- @concurrent"
+
+# Application tables in reverse dependency order
+SCHEMA_TABLES = [
+    "group_analysis_photos",
+    "road_analysis_groups",
+    "road_analysis_results",
+    "quality_results",
+    "photos",
+    "street_points",
+    "streets",
+]
+
+# Records the hash of the schema file the database was built from
+SCHEMA_METADATA_TABLE = "schema_metadata"
+
 
 class DatabaseInitializer:
     """Handles database initialization and schema management."""
@@ -72,78 +101,89 @@ class DatabaseInitializer:
         conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
         return conn
 
+    @contextmanager
+    def connection(self, database: str = None) -> Iterator[psycopg2.extensions.connection]:
+        """Context manager yielding an autocommit connection that is closed on exit."""
+        conn = self.get_connection(database)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
     def database_exists(self) -> bool:
         """Check if the target database exists."""
         try:
             # Connect to postgres database to check if target exists
-            conn = self.get_connection("postgres")
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (self.database,))
-            exists = cursor.fetchone() is not None
-
-            cursor.close()
-            conn.close()
-
-            return exists
+            with self.connection("postgres") as conn:
+                return self._database_exists_using(conn)
 
         except psycopg2.Error as e:
             logger.error(f"Error checking database existence: {e}")
             return False
 
+    def _database_exists_using(self, conn: psycopg2.extensions.connection) -> bool:
+        """Check if the target database exists using a postgres-DB connection."""
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (self.database,))
+        exists = cursor.fetchone() is not None
+        cursor.close()
+        return exists
+
     def create_database(self) -> None:
         """Create the target database if it doesn't exist."""
-        if self.database_exists():
-            logger.info(f"Database '{self.database}' already exists")
-            return
-
         try:
             # Connect to postgres database to create target
-            conn = self.get_connection("postgres")
-            cursor = conn.cursor()
-
-            # Create database (cannot use parameterized query for database name)
-            cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(self.database)))
-
-            logger.info(f"Created database '{self.database}'")
-
-            cursor.close()
-            conn.close()
+            with self.connection("postgres") as conn:
+                self._create_database_using(conn)
 
         except psycopg2.Error as e:
             logger.error(f"Error creating database: {e}")
             raise
 
-    def drop_database(self) -> None:
-        """Drop the target database if it exists."""
-        if not self.database_exists():
-            logger.info(f"Database '{self.database}' does not exist, nothing to drop")
+    def _create_database_using(self, conn: psycopg2.extensions.connection) -> None:
+        """Create the target database using a postgres-DB connection."""
+        if self._database_exists_using(conn):
+            logger.info(f"Database '{self.database}' already exists")
             return
 
+        cursor = conn.cursor()
+
+        # Create database (cannot use parameterized query for database name)
+        cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(self.database)))
+
+        logger.info(f"Created database '{self.database}'")
+
+        cursor.close()
+
+    def drop_database(self) -> None:
+        """Drop the target database if it exists."""
         try:
             # Connect to postgres database to drop target
-            conn = self.get_connection("postgres")
-            cursor = conn.cursor()
+            with self.connection("postgres") as conn:
+                if not self._database_exists_using(conn):
+                    logger.info(f"Database '{self.database}' does not exist, nothing to drop")
+                    return
 
-            # Terminate active connections to target database
-            cursor.execute(
-                """
-                SELECT pg_terminate_backend(pid)
-                FROM pg_stat_activity
-                WHERE datname = %s AND pid <> pg_backend_pid()
-            """,
-                (self.database,),
-            )
+                cursor = conn.cursor()
 
-            # Drop database
-            cursor.execute(
-                sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(self.database))
-            )
+                # Terminate active connections to target database
+                cursor.execute(
+                    """
+                    SELECT pg_terminate_backend(pid)
+                    FROM pg_stat_activity
+                    WHERE datname = %s AND pid <> pg_backend_pid()
+                """,
+                    (self.database,),
+                )
 
-            logger.info(f"Dropped database '{self.database}'")
+                # Drop database
+                cursor.execute(
+                    sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(self.database))
+                )
 
-            cursor.close()
-            conn.close()
+                logger.info(f"Dropped database '{self.database}'")
+
+                cursor.close()
 
         except psycopg2.Error as e:
             logger.error(f"Error dropping database: {e}")
@@ -151,8 +191,12 @@ class DatabaseInitializer:
 
     def drop_all_schema_objects(self) -> None:
         """Drop all tables, types, and other schema objects in the target database."""
+        with self.connection() as conn:
+            self._drop_all_schema_objects_using(conn)
+
+    def _drop_all_schema_objects_using(self, conn: psycopg2.extensions.connection) -> None:
+        """Drop all schema objects using an existing connection."""
         try:
-            conn = self.get_connection()
             cursor = conn.cursor()
 
             logger.info("Dropping all schema objects...")
@@ -164,17 +208,7 @@ class DatabaseInitializer:
             """)
 
             # Drop tables in reverse dependency order
-            tables = [
-                "group_analysis_photos",
-                "road_analysis_groups",
-                "road_analysis_results",
-                "quality_results",
-                "photos",
-                "street_points",
-                "streets",
-            ]
-
-            for table in tables:
+            for table in [*SCHEMA_TABLES, SCHEMA_METADATA_TABLE]:
                 cursor.execute(
                     sql.SQL("DROP TABLE IF EXISTS {} CASCADE").format(sql.Identifier(table))
                 )
@@ -196,7 +230,6 @@ class DatabaseInitializer:
                 logger.info(f"Dropped type: {type_name}")
 
             cursor.close()
-            conn.close()
 
             logger.info("Successfully dropped all schema objects")
 
@@ -205,21 +238,37 @@ class DatabaseInitializer:
             raise
 
     def run_schema_file(self) -> None:
-        """Execute the schema SQL file to create all objects."""
+        """
+        Execute the schema SQL file to create all objects.
+
+        Runs in two phases: all non-index DDL is sent as a single batch, then
+        index statements are built with CREATE INDEX CONCURRENTLY in parallel
+        over a small pool of autocommit connections.
+        """
+        with self.connection() as conn:
+            self._run_schema_file_using(conn)
+
+    def _run_schema_file_using(self, conn: psycopg2.extensions.connection) -> None:
+        """Execute the schema SQL file using an existing connection for DDL."""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
             logger.info(f"Executing schema file: {self.schema_file}")
 
-            # Read and execute schema file
+            # Read schema file and split off index statements
             with open(self.schema_file) as f:
                 schema_sql = f.read()
 
-            cursor.execute(schema_sql)
+            ddl_sql, index_statements = self._split_schema(schema_sql)
 
+            # Phase 1: transactional DDL (types, tables, views, comments)
+            cursor = conn.cursor()
+            cursor.execute(ddl_sql)
             cursor.close()
-            conn.close()
+
+            # Phase 2: index builds
+            if index_statements:
+                self._create_indexes(conn, index_statements)
+
+            self._record_schema_hash_using(conn, self.schema_hash())
 
             logger.info("Successfully created all schema objects")
 
@@ -230,10 +279,197 @@ class DatabaseInitializer:
             logger.error(f"Error reading schema file: {e}")
             raise
 
+    def schema_hash(self) -> str:
+        """Return the SHA-256 hex digest of the schema file."""
+        return hashlib.sha256(self.schema_file.read_bytes()).hexdigest()
+
+    def get_applied_schema_hash(self) -> Optional[str]:
+        """Return the schema hash recorded in the database, or None if absent."""
+        try:
+            with self.connection() as conn:
+                return self._get_applied_schema_hash_using(conn)
+
+        except psycopg2.Error as e:
+            logger.error(f"Error reading schema hash: {e}")
+            return None
+
+    def _get_applied_schema_hash_using(self, conn: psycopg2.extensions.connection) -> Optional[str]:
+        """Read the recorded schema hash using an existing connection."""
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT 1 FROM information_schema.tables
+            WHERE table_schema = 'public' AND table_name = %s
+        """,
+            (SCHEMA_METADATA_TABLE,),
+        )
+        if cursor.fetchone() is None:
+            applied_hash = None
+        else:
+            cursor.execute(
+                sql.SQL("SELECT schema_hash FROM {}").format(sql.Identifier(SCHEMA_METADATA_TABLE))
+            )
+            row = cursor.fetchone()
+            applied_hash = row[0] if row else None
+
+        cursor.close()
+        return applied_hash
+
+    def _record_schema_hash_using(
+        self, conn: psycopg2.extensions.connection, schema_hash: str
+    ) -> None:
+        """Store the hash of the schema file that was just applied."""
+        cursor = conn.cursor()
+
+        table = sql.Identifier(SCHEMA_METADATA_TABLE)
+        cursor.execute(
+            sql.SQL(
+                """
+                CREATE TABLE IF NOT EXISTS {} (
+                    schema_hash CHAR(64) NOT NULL,
+                    applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+                );
+                TRUNCATE {};
+                INSERT INTO {} (schema_hash) VALUES (%s);
+            """
+            ).format(table, table, table),
+            (schema_hash,),
+        )
+
+        cursor.close()
+
+    @staticmethod
+    def _split_schema(schema_sql: str) -> tuple[str, list[str]]:
+        """
+        Split schema SQL into batch DDL and deferred index statements.
+
+        A statement is deferred when its line begins with CREATE INDEX or the
+        line directly above it is a "-- @concurrent" marker. Deferred
+        statements must fit on a single line.
+
+        Returns:
+            Tuple of (ddl_sql, index_statements)
+        """
+        ddl_lines = []
+        index_statements = []
+        marked = False
+
+        for line in schema_sql.splitlines():
+            stripped = line.strip()
+            if stripped == CONCURRENT_MARKER:
+                marked = True
+                continue
+            if marked or INDEX_STATEMENT_RE.match(stripped):
+                index_statements.append(stripped)
+                marked = False
+                continue
+            ddl_lines.append(line)
+
+        return "\n".join(ddl_lines), index_statements
+
+    @staticmethod
+    def _concurrent_statement(statement: str) -> str:
+        """Rewrite a CREATE INDEX statement to build CONCURRENTLY."""
+        return re.sub(
+            r"^CREATE\s+(UNIQUE\s+)?INDEX\s+(?!CONCURRENTLY)",
+            lambda m: f"CREATE {m.group(1) or ''}INDEX CONCURRENTLY ",
+            statement,
+            count=1,
+            flags=re.IGNORECASE,
+        )
+
+    def _create_indexes(
+        self, conn: psycopg2.extensions.connection, index_statements: list[str]
+    ) -> None:
+        """Build indexes in parallel, falling back to serial builds on ``conn``."""
+        try:
+            self._create_indexes_concurrently(index_statements)
+        except psycopg2.Error as e:
+            logger.warning(f"Concurrent index build failed ({e}), retrying serially")
+            self._create_indexes_serially(conn, index_statements)
+
+    def _create_indexes_concurrently(self, index_statements: list[str]) -> None:
+        """Run CREATE INDEX CONCURRENTLY statements over a pool of connections."""
+        max_workers = min(len(index_statements), max(4, os.cpu_count() or 1))
+        logger.info(f"Building {len(index_statements)} indexes with {max_workers} connections")
+
+        local = threading.local()
+        connections = []
+        connections_lock = threading.Lock()
+
+        def build(statement: str) -> None:
+            conn = getattr(local, "conn", None)
+            if conn is None:
+                conn = self.get_connection()
+                local.conn = conn
+                with connections_lock:
+                    connections.append(conn)
+            with conn.cursor() as cursor:
+                cursor.execute(self._concurrent_statement(statement))
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Consume the iterator so worker exceptions propagate here
+                list(executor.map(build, index_statements))
+        finally:
+            for conn in connections:
+                conn.close()
+
+    def _create_indexes_serially(
+        self, conn: psycopg2.extensions.connection, index_statements: list[str]
+    ) -> None:
+        """Rebuild each index with a plain CREATE INDEX on one connection."""
+        cursor = conn.cursor()
+
+        for statement in index_statements:
+            # A failed concurrent build leaves an INVALID index behind
+            match = INDEX_STATEMENT_RE.match(statement)
+            if match:
+                cursor.execute(
+                    sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(match.group(2)))
+                )
+            cursor.execute(statement)
+
+        cursor.close()
+
+    def truncate_all(self) -> None:
+        """Remove all rows from application tables, keeping the schema intact."""
+        with self.connection() as conn:
+            self._truncate_all_using(conn)
+
+    def _truncate_all_using(self, conn: psycopg2.extensions.connection) -> None:
+        """Truncate all application tables using an existing connection."""
+        try:
+            cursor = conn.cursor()
+
+            cursor.execute(
+                sql.SQL("TRUNCATE {} RESTART IDENTITY CASCADE").format(
+                    sql.SQL(", ").join(sql.Identifier(table) for table in SCHEMA_TABLES)
+                )
+            )
+
+            cursor.close()
+
+            logger.info("Truncated all tables")
+
+        except psycopg2.Error as e:
+            logger.error(f"Error truncating tables: {e}")
+            raise
+
     def validate_schema(self) -> bool:
         """Validate that all expected tables and types exist."""
         try:
-            conn = self.get_connection()
+            with self.connection() as conn:
+                return self._validate_schema_using(conn)
+
+        except psycopg2.Error as e:
+            logger.error(f"Error validating schema: {e}")
+            return False
+
+    def _validate_schema_using(self, conn: psycopg2.extensions.connection) -> bool:
+        """Validate the schema using an existing connection."""
+        try:
             cursor = conn.cursor()
 
             # Check tables
@@ -287,7 +523,6 @@ class DatabaseInitializer:
                 return False
 
             cursor.close()
-            conn.close()
 
             logger.info("Schema validation passed")
             return True
@@ -303,31 +538,50 @@ class DatabaseInitializer:
         # Create database if needed
         self.create_database()
 
-        # Run schema file
-        self.run_schema_file()
+        # Run schema file and validate over one connection
+        with self.connection() as conn:
+            self._run_schema_file_using(conn)
+            is_valid = self._validate_schema_using(conn)
 
-        # Validate
-        if self.validate_schema():
+        if is_valid:
             logger.info("✅ Database initialization completed successfully")
         else:
             logger.error("❌ Database initialization failed validation")
             raise Exception("Schema validation failed")
 
-    def reset_database(self) -> None:
-        """Drop everything and recreate from scratch."""
+    def reset_database(self, full: bool = False) -> None:
+        """
+        Reset the database to an empty, up-to-date schema.
+
+        When the schema file matches the hash recorded at the last build,
+        tables are emptied with a single TRUNCATE. Otherwise (or when
+        ``full`` is set) all schema objects are dropped and recreated.
+        All steps after database creation share one connection.
+
+        Args:
+            full: Always drop and recreate schema objects
+        """
         logger.info("Starting database reset...")
 
         # Option 1: Drop entire database and recreate
         # self.drop_database()
         # self.init_fresh_database()
 
-        # Option 2: Drop only schema objects (faster, preserves database)
-        self.create_database()  # Ensure database exists
-        self.drop_all_schema_objects()
-        self.run_schema_file()
+        self.create_database()  # Ensure database exists (needs a postgres-DB connection)
+
+        with self.connection() as conn:
+            if not full and self._get_applied_schema_hash_using(conn) == self.schema_hash():
+                # Option 2: Schema unchanged - only clear data
+                logger.info("Schema unchanged, truncating tables")
+                self._truncate_all_using(conn)
+            else:
+                # Option 3: Drop only schema objects (preserves database)
+                self._drop_all_schema_objects_using(conn)
+                self._run_schema_file_using(conn)
+
+            is_valid = self._validate_schema_using(conn)
 
-        # Validate
-        if self.validate_schema():
+        if is_valid:
             logger.info("✅ Database reset completed successfully")
         else:
             logger.error("❌ Database reset failed validation")
@@ -343,6 +597,11 @@ def main():
     parser.add_argument(
         "--init", action="store_true", help="Initialize database (create if not exists)"
     )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="With --reset, drop and recreate schema objects even if the schema is unchanged",
+    )
     parser.add_argument("--validate", action="store_true", help="Validate existing schema")
     parser.add_argument("--drop-db", action="store_true", help="Drop entire database (DESTRUCTIVE)")
 
@@ -369,7 +628,7 @@ def main():
                 f"Reset will drop all data in '{db_init.database}'. Continue? (yes/no): "
             )
             if confirm.lower() == "yes":
-                db_init.reset_database()
+                db_init.reset_database(full=args.full)
             else:
                 logger.info("Database reset cancelled")
 
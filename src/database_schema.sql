@@ -75,6 +75,7 @@ CREATE TABLE photos (
     location GEOMETRY(POINT, 4326), -- Exact camera position (may differ from street_point)
     date_taken TIMESTAMP WITH TIME ZONE,
     compass_angle FLOAT, -- Camera direction in degrees (0-360)
+    phash BIGINT, -- 64-bit perceptual hash (unsigned bits stored as signed)
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     
     -- Constraints
@@ -88,8 +89,9 @@ CREATE TABLE quality_results (
     
     -- Quality scores (0-100, higher = better)
     overall_score FLOAT NOT NULL CHECK (overall_score >= 0 AND overall_score <= 100),
-    blur_score FLOAT NOT NULL CHECK (blur_score >= 0 AND blur_score <= 100),
-    exposure_score FLOAT NOT NULL CHECK (exposure_score >= 0 AND exposure_score <= 100),
+    -- NULL when not computed (images rejected from their header dimensions)
+    blur_score FLOAT CHECK (blur_score >= 0 AND blur_score <= 100),
+    exposure_score FLOAT CHECK (exposure_score >= 0 AND exposure_score <= 100),
     size_score FLOAT NOT NULL CHECK (size_score >= 0 AND size_score <= 100),
     
     -- Road surface analysis
@@ -193,7 +195,8 @@ CREATE INDEX idx_street_points_local_authority ON street_points(local_authority)
 -- Photos indexes
 CREATE INDEX idx_photos_street_point ON photos(street_point_id);
 CREATE INDEX idx_photos_source ON photos(source);
-CREATE INDEX idx_photos_source_image_id ON photos(source_image_id);
+-- Duplicate check and upsert target (see SOURCE_IMAGE_INDEX)
+CREATE UNIQUE INDEX idx_photos_source_image_id ON photos(source, source_image_id);
 CREATE INDEX idx_photos_location ON photos USING GIST(location);
 CREATE INDEX idx_photos_date_taken ON photos(date_taken);
 
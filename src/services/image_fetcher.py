@@ -1,11 +1,21 @@
 import tempfile
 import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
-from .mapillary_client import MapillaryClient
 from src.utils.coord_utils import bbox_from_point
 
+from .mapillary_client import MapillaryClient
+
+
+# Mapillary caps a single images query at 2000 results
+MAX_BATCH_IMAGES = 2000
+
+# Concurrent per-point queries for points a capped batched query left short
+POINT_FETCH_WORKERS = 8
+
 
 class ImageFetcherService:
     """
@@ -47,7 +57,7 @@ class ImageFetcherService:
         Returns:
             Dictionary with fetch results including image paths and metadata
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         # Use default radius if not specified
         if radius_m is None:
@@ -67,7 +77,7 @@ class ImageFetcherService:
             image_metadata = self.mapillary_client.fetch_images(bbox, limit=limit)
 
             if not image_metadata:
-                processing_time = (time.time() - start_time) * 1000
+                processing_time = (time.perf_counter() - start_time) * 1000
                 return {
                     "success": True,
                     "coordinates": {"lat": lat, "lon": lon},
@@ -86,7 +96,7 @@ class ImageFetcherService:
             # Download images
             downloaded_paths = self.mapillary_client.download_images(image_metadata, output_dir)
 
-            processing_time = (time.time() - start_time) * 1000
+            processing_time = (time.perf_counter() - start_time) * 1000
 
             return {
                 "success": True,
@@ -105,7 +115,7 @@ class ImageFetcherService:
             }
 
         except Exception as e:
-            processing_time = (time.time() - start_time) * 1000
+            processing_time = (time.perf_counter() - start_time) * 1000
             return {
                 "success": False,
                 "coordinates": {"lat": lat, "lon": lon},
@@ -121,6 +131,177 @@ class ImageFetcherService:
                 "service_version": self.version,
             }
 
+    def fetch_image_metadata_at_point(
+        self, lat: float, lon: float, radius_m: Optional[float] = None, limit: int = 10
+    ) -> list[dict]:
+        """
+        Fetch metadata of the images at a coordinate point without downloading them.
+
+        Args:
+            lat: Latitude in degrees
+            lon: Longitude in degrees
+            radius_m: Radius in meters for image search (uses default if None)
+            limit: Maximum number of images to fetch
+
+        Returns:
+            List of Mapillary image metadata dictionaries
+        """
+        if radius_m is None:
+            radius_m = self.default_radius_m
+
+        bbox = bbox_from_point(lat, lon, radius_m)
+        return self.mapillary_client.fetch_images(bbox, limit=limit)
+
+    def iter_download_images(
+        self, images: list[dict], output_dir: str
+    ) -> Iterator[tuple[int, str]]:
+        """
+        Download images concurrently, yielding (index, path) as each completes.
+
+        Args:
+            images: Mapillary image metadata dictionaries
+            output_dir: Directory to download images to
+
+        Yields:
+            (index into images, local file path); failed downloads are skipped
+        """
+        return self.mapillary_client.iter_download_images(images, output_dir)
+
+    def fetch_images_at_points(
+        self,
+        points: list[tuple[float, float]],
+        radius_m: Optional[float] = None,
+        limit: int = 10,
+        output_dir: Optional[str] = None,
+    ) -> list[dict]:
+        """
+        Fetch images for several nearby coordinate points with one metadata request.
+
+        A single Mapillary query covers the union of all point bounding boxes;
+        results are then assigned back to each point client-side. If that query
+        hit its result cap, points left with fewer than limit images are queried
+        again with their own bounding box, so a dense area cannot crowd them out.
+        Intended for clustered points (e.g. along one street) - Mapillary rejects
+        very large bboxes.
+
+        Args:
+            points: List of (lat, lon) tuples in degrees
+            radius_m: Radius in meters for image search (uses default if None)
+            limit: Maximum number of images to fetch per point
+            output_dir: Directory to download images (uses temp dir if None)
+
+        Returns:
+            List of fetch result dictionaries, one per point, in the same
+            format as fetch_images_at_point
+        """
+        if not points:
+            return []
+
+        start_time = time.perf_counter()
+
+        if radius_m is None:
+            radius_m = self.default_radius_m
+
+        if output_dir is None:
+            output_dir = tempfile.mkdtemp(prefix="mapillary_images_")
+        else:
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+        bboxes = [bbox_from_point(lat, lon, radius_m) for lat, lon in points]
+        union_bbox = (
+            min(bbox[0] for bbox in bboxes),
+            min(bbox[1] for bbox in bboxes),
+            max(bbox[2] for bbox in bboxes),
+            max(bbox[3] for bbox in bboxes),
+        )
+
+        try:
+            batch_limit = min(limit * len(points), MAX_BATCH_IMAGES)
+            all_metadata = self.mapillary_client.fetch_images(union_bbox, limit=batch_limit)
+
+            # Assign images to every point whose bbox contains them
+            point_metadata = [
+                [img for img in all_metadata if self._in_bbox(img, bbox)][:limit] for bbox in bboxes
+            ]
+
+            # A capped response may have stopped before reaching some points
+            if len(all_metadata) >= batch_limit:
+                short = [i for i, images in enumerate(point_metadata) if len(images) < limit]
+                if short:
+                    with ThreadPoolExecutor(
+                        max_workers=min(len(short), POINT_FETCH_WORKERS)
+                    ) as executor:
+                        refetched = executor.map(
+                            lambda i: self.mapillary_client.fetch_images(bboxes[i], limit=limit),
+                            short,
+                        )
+                        for i, images in zip(short, refetched):
+                            point_metadata[i] = images
+
+            # Download each selected image once, even if shared between points
+            unique_images = list(
+                {img["id"]: img for images in point_metadata for img in images}.values()
+            )
+            downloaded = self.mapillary_client.download_images(unique_images, output_dir)
+            path_by_id = {Path(path).stem: path for path in downloaded}
+
+        except Exception as e:
+            processing_time = (time.perf_counter() - start_time) * 1000
+            return [
+                {
+                    "success": False,
+                    "coordinates": {"lat": lat, "lon": lon},
+                    "radius_m": radius_m,
+                    "error": str(e),
+                    "images_found": 0,
+                    "images_downloaded": 0,
+                    "image_paths": [],
+                    "failed_downloads": 0,
+                    "output_dir": output_dir,
+                    "processing_time_ms": processing_time,
+                    "timestamp": time.time(),
+                    "service_version": self.version,
+                }
+                for lat, lon in points
+            ]
+
+        processing_time = (time.perf_counter() - start_time) * 1000
+        results = []
+        for (lat, lon), bbox, image_metadata in zip(points, bboxes, point_metadata):
+            image_paths = [
+                path_by_id[img["id"]] for img in image_metadata if img["id"] in path_by_id
+            ]
+            results.append(
+                {
+                    "success": True,
+                    "coordinates": {"lat": lat, "lon": lon},
+                    "radius_m": radius_m,
+                    "bbox": bbox,
+                    "images_found": len(image_metadata),
+                    "images_downloaded": len(image_paths),
+                    "image_paths": image_paths,
+                    "failed_downloads": len(image_metadata) - len(image_paths),
+                    "output_dir": output_dir,
+                    "processing_time_ms": processing_time,
+                    "timestamp": time.time(),
+                    "service_version": self.version,
+                    "image_metadata": image_metadata,
+                }
+            )
+
+        return results
+
+    @staticmethod
+    def _in_bbox(image_metadata: dict, bbox: tuple[float, float, float, float]) -> bool:
+        """Check whether an image lies inside a (min_lat, min_lon, max_lat, max_lon) bbox."""
+        coordinates = (image_metadata.get("geometry") or {}).get("coordinates")
+        if not coordinates:
+            return False
+
+        lon, lat = coordinates[:2]
+        min_lat, min_lon, max_lat, max_lon = bbox
+        return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
     def fetch_and_process_images(
         self,
         lat: float,
@@ -0,0 +1,40 @@
+"""
+Thread-local scratch buffers for per-image OpenCV work
+"""
+
+import math
+import threading
+
+import numpy as np
+
+
+class BufferPool(threading.local):
+    """
+    Named scratch arrays reused across images, one set per thread.
+
+    Each buffer grows to the largest shape requested so far, so a batch of
+    similarly sized images allocates its intermediates only once.
+    """
+
+    def __init__(self):
+        self._buffers: dict[str, np.ndarray] = {}
+
+    def get(self, name: str, shape: tuple[int, ...], dtype) -> np.ndarray:
+        """
+        Get a contiguous array of the given shape backed by the named buffer.
+
+        The returned array's contents are undefined and are overwritten by the
+        next request for the same name on this thread.
+        """
+        dtype = np.dtype(dtype)
+        size = math.prod(shape)
+
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.dtype != dtype or buffer.size < size:
+            buffer = np.empty(size, dtype=dtype)
+            self._buffers[name] = buffer
+
+        return buffer[:size].reshape(shape)
+
+
+buffer_pool = BufferPool()
@@ -1,60 +1,209 @@
+import struct
 import sys
 from pathlib import Path
+from typing import Optional
 
 import cv2
+import numpy as np
 
 
 # Add config to path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from config import QualityConfig
 
+from .buffer_pool import buffer_pool
+
+
+# Decoder flags for reduced-resolution reads (JPEG scales during decode)
+REDUCED_READ_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# JPEG start-of-frame markers (C4, C8 and CC are DHT, JPG and DAC)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def to_gray(image) -> np.ndarray:
+    """Return the image as grayscale, converting from BGR if needed."""
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
 
 def is_blurry(image, config: QualityConfig):
-    """Check if image is blurry using Laplacian variance."""
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    lap_var = cv2.Laplacian(gray, cv2.CV_64F).var()
+    """Check if image (grayscale or BGR) is blurry using Laplacian variance."""
+    gray = to_gray(image)
+    # int16 holds the default 3x3 Laplacian of uint8 input exactly (|value| <= 1020)
+    lap = cv2.Laplacian(gray, cv2.CV_16S, dst=buffer_pool.get("lap", gray.shape, np.int16))
+    _, std = cv2.meanStdDev(lap)
+    lap_var = float(std[0, 0]) ** 2
     return lap_var < config.blur_threshold, lap_var
 
 
 def is_exposed_poorly(image, config: QualityConfig):
-    """Check if image is too dark or too bright based on histogram."""
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-    hist = hist / hist.sum()  # normalize
+    """
+    Check if image (grayscale or BGR) is too dark or too bright based on histogram.
+
+    Returns:
+        (too_dark, too_bright, dark_frac, bright_frac)
+    """
+    gray = to_gray(image)
+    hist = np.bincount(gray.ravel(), minlength=256)
 
-    dark_frac = hist[: config.dark_pixel_value].sum()
-    bright_frac = hist[config.bright_pixel_value :].sum()
+    # cdf[k] = number of pixels with intensity < k
+    cdf = np.concatenate(([0], np.cumsum(hist)))
+    total = cdf[-1]
 
-    too_dark = dark_frac > config.dark_threshold
-    too_bright = bright_frac > config.bright_threshold
+    dark_frac = cdf[config.dark_pixel_value] / total
+    bright_frac = (total - cdf[config.bright_pixel_value]) / total
 
-    return too_dark or too_bright, (dark_frac, bright_frac)
+    too_dark = bool(dark_frac > config.dark_threshold)
+    too_bright = bool(bright_frac > config.bright_threshold)
 
+    return too_dark, too_bright, dark_frac, bright_frac
 
-def is_too_small(image, config: QualityConfig):
-    """Reject images smaller than the given resolution."""
+
+def is_too_small(image, config: QualityConfig, scale: int = 1):
+    """
+    Reject images smaller than the given resolution.
+
+    For an image decoded at 1/scale resolution the smallest full size that
+    could have produced it is checked, as reduced decoding rounds up.
+    """
     h, w = image.shape[:2]
-    return w < config.min_width or h < config.min_height, (w, h)
+    if scale > 1:
+        return is_size_too_small((w - 1) * scale + 1, (h - 1) * scale + 1, config)
+    return is_size_too_small(w, h, config)
+
+
+def is_size_too_small(width: int, height: int, config: QualityConfig):
+    """Reject image dimensions smaller than the given resolution."""
+    return width < config.min_width or height < config.min_height, (width, height)
+
+
+def is_header_size_too_small(
+    width: int, height: int, config: QualityConfig, decoded_shape: tuple = None
+):
+    """
+    Reject header dimensions smaller than the given resolution.
+
+    Header dimensions are stored before EXIF orientation is applied. If the
+    shape of the decoded image shows which way round the image is, the
+    dimensions are oriented to match; otherwise they are only rejected if too
+    small either way round.
+    """
+    if decoded_shape is not None:
+        h, w = decoded_shape[:2]
+        turn = (width - height) * (w - h)
+        if turn < 0:
+            return is_size_too_small(height, width, config)
+        if turn > 0:
+            return is_size_too_small(width, height, config)
+
+    size_result = is_size_too_small(width, height, config)
+    if size_result[0]:
+        rotated = is_size_too_small(height, width, config)
+        if not rotated[0]:
+            return rotated
+    return size_result
+
+
+def read_image_size(image_path) -> Optional[tuple[int, int]]:
+    """
+    Read (width, height) from a JPEG or PNG header without decoding pixels.
+
+    Returns None for other formats or malformed headers. Dimensions are as
+    stored in the file, before any EXIF orientation is applied.
+    """
+    try:
+        with open(image_path, "rb") as f:
+            head = f.read(24)
+            if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+
+            if not head.startswith(b"\xff\xd8"):
+                return None
+
+            # Walk JPEG segments until the start-of-frame header
+            f.seek(2)
+            while True:
+                marker = f.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                if marker[1] == 0xFF:
+                    # Fill byte; the real marker code follows
+                    f.seek(-1, 1)
+                    continue
+
+                segment = f.read(2)
+                if len(segment) < 2:
+                    return None
+                (length,) = struct.unpack(">H", segment)
+
+                if marker[1] in JPEG_SOF_MARKERS:
+                    frame = f.read(5)
+                    if len(frame) < 5:
+                        return None
+                    height, width = struct.unpack(">HH", frame[1:5])
+                    return width, height
+
+                f.seek(length - 2, 1)
+    except OSError:
+        return None
+
+
+def load_image(image_path, downscale: int = 1) -> np.ndarray:
+    """Decode an image file to a BGR array, optionally at 1/2, 1/4 or 1/8 resolution."""
+    image = cv2.imread(str(image_path), REDUCED_READ_FLAGS[downscale])
+    if image is None:
+        raise ValueError(f"Cannot load image: {image_path}")
+    return image
 
 
-def check_image_quality(image_path, config: QualityConfig = None):
-    """Run all Stage 1 checks and return results."""
+def check_image_quality(image, config: QualityConfig = None):
+    """
+    Run all Stage 1 checks and return results.
+
+    Accepts a decoded BGR image, or a path which is decoded at
+    config.heuristic_downscale resolution. For paths, the size check uses
+    the dimensions from the file header when available, oriented like the
+    decoded image.
+    """
     if config is None:
         config = QualityConfig()
 
-    image = cv2.imread(image_path)
-    if image is None:
-        raise ValueError(f"Cannot load image: {image_path}")
+    scale = 1
+    header_size = None
+    if not isinstance(image, np.ndarray):
+        header_size = read_image_size(image)
+        scale = config.heuristic_downscale
+        image = load_image(image, scale)
 
     results = {}
 
-    blur_flag, blur_score = is_blurry(image, config)
+    # Convert once and share the grayscale buffer between checks
+    gray = cv2.cvtColor(
+        image, cv2.COLOR_BGR2GRAY, dst=buffer_pool.get("gray", image.shape[:2], np.uint8)
+    )
+
+    blur_flag, blur_score = is_blurry(gray, config)
     results["blurry"] = (blur_flag, blur_score)
 
-    exposure_flag, exposure_vals = is_exposed_poorly(image, config)
-    results["poor_exposure"] = (exposure_flag, exposure_vals)
+    too_dark, too_bright, dark_frac, bright_frac = is_exposed_poorly(gray, config)
+    exposure_flag = too_dark or too_bright
+    results["poor_exposure"] = (exposure_flag, (dark_frac, bright_frac))
+    results["too_dark"] = too_dark
+    results["too_bright"] = too_bright
 
-    size_flag, size_vals = is_too_small(image, config)
+    if header_size:
+        size_flag, size_vals = is_header_size_too_small(*header_size, config, image.shape)
+    else:
+        size_flag, size_vals = is_too_small(image, config, scale)
     results["too_small"] = (size_flag, size_vals)
 
     results["usable"] = not (blur_flag or exposure_flag or size_flag)
@@ -1,6 +1,7 @@
+import time
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any
+from typing import Any, Optional
 
 from .failure_reasons import ImageFailureReason
 
@@ -15,8 +16,8 @@ class ImageQualityMetrics:
     failure_reasons: list[ImageFailureReason]
 
     # Heuristic check results
-    blur_score: float
-    exposure_score: float
+    blur_score: Optional[float]  # None if not computed
+    exposure_score: Optional[float]  # None if not computed
     size_score: float
 
     # Segmentation results
@@ -24,7 +25,7 @@ class ImageQualityMetrics:
     has_sufficient_road: bool
 
     # Metadata
-    timestamp: str
+    timestamp: float  # Unix epoch seconds; formatted as ISO 8601 by to_dict()
     assessment_version: str
 
     def to_dict(self) -> dict[str, Any]:
@@ -45,7 +46,7 @@ class ImageQualityMetrics:
                 "has_sufficient_road": self.has_sufficient_road,
             },
             "metadata": {
-                "timestamp": self.timestamp,
+                "timestamp": datetime.fromtimestamp(self.timestamp).isoformat(),
                 "assessment_version": self.assessment_version,
             },
         }
@@ -65,6 +66,6 @@ class ImageQualityMetrics:
             size_score=0.0,
             road_surface_percentage=0.0,
             has_sufficient_road=False,
-            timestamp=datetime.now().isoformat(),
+            timestamp=time.time(),
             assessment_version="1.0.0",
         )
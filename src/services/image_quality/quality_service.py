@@ -1,10 +1,19 @@
+import os
 import sys
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
+
+import numpy as np
 
 from .failure_reasons import ImageFailureReason
-from .heuristics import check_image_quality
+from .heuristics import (
+    check_image_quality,
+    is_header_size_too_small,
+    load_image,
+    read_image_size,
+)
 from .quality_metrics import ImageQualityMetrics
 from .segmentation import RoadSegmentation
 
@@ -39,68 +48,206 @@ class ImageQualityService:
                     image_path, ImageFailureReason.FILE_NOT_FOUND
                 )
 
-            # Stage 1: Heuristic checks (fast pre-filter)
-            heuristics_result = check_image_quality(image_path, self.config)
-
-            # Calculate heuristic scores
-            blur_score = self._calculate_blur_score(heuristics_result["blurry"])
-            exposure_score = self._calculate_exposure_score(heuristics_result["poor_exposure"])
-            size_score = self._calculate_size_score(heuristics_result["too_small"])
-
-            # Early termination: Skip expensive AI if heuristics fail
-            heuristic_failure_reasons = self._get_heuristic_failure_reasons(heuristics_result)
-
-            if heuristic_failure_reasons:
-                # Failed heuristics - skip expensive segmentation
-                return ImageQualityMetrics(
-                    image_path=image_path,
-                    overall_score=min(blur_score, exposure_score, size_score),
-                    is_usable=False,
-                    failure_reasons=heuristic_failure_reasons,
-                    blur_score=blur_score,
-                    exposure_score=exposure_score,
-                    size_score=size_score,
-                    road_surface_percentage=0.0,  # Not computed
-                    has_sufficient_road=False,
-                    timestamp=datetime.now().isoformat(),
-                    assessment_version=self.version,
-                )
+            # Reject undersized images from the file header, before decoding
+            header_rejection = self._reject_by_header_size(image_path)
+            if header_rejection:
+                return header_rejection
+
+            # With heuristic_downscale, heuristics decode at reduced resolution and
+            # segmentation decodes the full image only if they pass. Otherwise
+            # decode once and share the pixels between heuristics and segmentation.
+            image = image_path if self.config.heuristic_downscale > 1 else load_image(image_path)
+
+            heuristics = self._evaluate_heuristics(image_path, image)
+            if isinstance(heuristics, ImageQualityMetrics):
+                return heuristics
 
             # Stage 2: AI segmentation (expensive - only if heuristics pass)
-            road_percentage, has_sufficient_road = self.segmentation.detect_road_surface(image_path)
+            road_percentage, has_sufficient_road = self.segmentation.detect_road_surface(image)
+
+            return self._build_metrics(image_path, heuristics, road_percentage, has_sufficient_road)
+
+        except Exception:
+            return ImageQualityMetrics.create_failed(
+                image_path, ImageFailureReason.PROCESSING_ERROR
+            )
+
+    def evaluate_batch(
+        self, image_paths: list[str], max_workers: Optional[int] = None
+    ) -> list[ImageQualityMetrics]:
+        """
+        Evaluate several images, running segmentation once for the whole batch
+
+        Heuristic checks run concurrently (OpenCV releases the GIL while
+        decoding and filtering); images that pass are then segmented in a
+        single batched model call. Decoded pixels are not held between the
+        two stages, so memory stays bounded for large batches.
 
-            # Calculate overall score with road surface factor
-            overall_score = self._calculate_overall_score(
-                blur_score, exposure_score, size_score, road_percentage
+        Args:
+            image_paths: Paths to image files
+            max_workers: Thread count for heuristics (defaults to the number of CPUs)
+
+        Returns:
+            ImageQualityMetrics for each image, in input order
+        """
+        if not image_paths:
+            return []
+
+        max_workers = min(max_workers or os.cpu_count() or 1, len(image_paths))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            heuristics = list(executor.map(self._safe_evaluate_heuristics, image_paths))
+
+        results: list[Optional[ImageQualityMetrics]] = [
+            result if isinstance(result, ImageQualityMetrics) else None for result in heuristics
+        ]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        # Stage 2: one batched segmentation call for every image that passed
+        try:
+            road_results = self.segmentation.detect_road_surface_batch(
+                [image_paths[i] for i in pending]
             )
+            for i, (road_percentage, has_sufficient_road) in zip(pending, road_results):
+                results[i] = self._build_metrics(
+                    image_paths[i], heuristics[i], road_percentage, has_sufficient_road
+                )
+        except Exception:
+            for i in pending:
+                results[i] = ImageQualityMetrics.create_failed(
+                    image_paths[i], ImageFailureReason.PROCESSING_ERROR
+                )
 
-            # Only segmentation can fail at this point (heuristics already passed)
-            failure_reasons = []
-            if not has_sufficient_road:
-                failure_reasons.append(ImageFailureReason.INSUFFICIENT_ROAD_SURFACE)
+        return results
 
-            # Determine if image is usable
-            is_usable = len(failure_reasons) == 0
+    def _evaluate_heuristics(self, image_path: str, image: Union[str, np.ndarray]):
+        """
+        Run Stage 1 heuristic checks on a decoded image or image path
 
+        Returns:
+            Final ImageQualityMetrics if the image fails here, otherwise the
+            (blur_score, exposure_score, size_score) tuple for Stage 2
+        """
+        # Stage 1: Heuristic checks (fast pre-filter)
+        heuristics_result = check_image_quality(image, self.config)
+
+        # Calculate heuristic scores
+        blur_score = self._calculate_blur_score(heuristics_result["blurry"])
+        exposure_score = self._calculate_exposure_score(heuristics_result["poor_exposure"])
+        size_score = self._calculate_size_score(heuristics_result["too_small"])
+
+        # Early termination: Skip expensive AI if heuristics fail
+        heuristic_failure_reasons = self._get_heuristic_failure_reasons(heuristics_result)
+
+        if heuristic_failure_reasons:
+            # Failed heuristics - skip expensive segmentation
             return ImageQualityMetrics(
                 image_path=image_path,
-                overall_score=overall_score,
-                is_usable=is_usable,
-                failure_reasons=failure_reasons,
+                overall_score=min(blur_score, exposure_score, size_score),
+                is_usable=False,
+                failure_reasons=heuristic_failure_reasons,
                 blur_score=blur_score,
                 exposure_score=exposure_score,
                 size_score=size_score,
-                road_surface_percentage=road_percentage,
-                has_sufficient_road=has_sufficient_road,
-                timestamp=datetime.now().isoformat(),
+                road_surface_percentage=0.0,  # Not computed
+                has_sufficient_road=False,
+                timestamp=time.time(),
                 assessment_version=self.version,
             )
 
+        return blur_score, exposure_score, size_score
+
+    def _reject_by_header_size(self, image_path: str) -> Optional[ImageQualityMetrics]:
+        """
+        Fail undersized images using dimensions read from the file header
+
+        Header dimensions are stored before EXIF orientation is applied, so an
+        image is only rejected here if it is too small either way round; other
+        images are left to the decoded size check. Blur and exposure are not
+        computed for rejected images: their scores are None and the failure
+        reasons cover resolution only.
+
+        Returns:
+            Failed ImageQualityMetrics, or None if the image may be large enough
+            or its header could not be read
+        """
+        size = read_image_size(image_path)
+        if size is None:
+            return None
+
+        size_result = is_header_size_too_small(*size, self.config)
+        if not size_result[0]:
+            return None
+
+        size_score = self._calculate_size_score(size_result)
+        return ImageQualityMetrics(
+            image_path=image_path,
+            # Minimum of the computed heuristic scores, as for other heuristic failures
+            overall_score=size_score,
+            is_usable=False,
+            failure_reasons=[ImageFailureReason.RESOLUTION_TOO_SMALL],
+            blur_score=None,  # Not computed
+            exposure_score=None,  # Not computed
+            size_score=size_score,
+            road_surface_percentage=0.0,  # Not computed
+            has_sufficient_road=False,
+            timestamp=time.time(),
+            assessment_version=self.version,
+        )
+
+    def _safe_evaluate_heuristics(self, image_path: str):
+        """Load an image and run Stage 1 checks, mapping errors to a failed result"""
+        try:
+            if not Path(image_path).exists():
+                return ImageQualityMetrics.create_failed(
+                    image_path, ImageFailureReason.FILE_NOT_FOUND
+                )
+            return self._reject_by_header_size(image_path) or self._evaluate_heuristics(
+                image_path, image_path
+            )
         except Exception:
             return ImageQualityMetrics.create_failed(
                 image_path, ImageFailureReason.PROCESSING_ERROR
             )
 
+    def _build_metrics(
+        self,
+        image_path: str,
+        heuristic_scores: tuple[float, float, float],
+        road_percentage: float,
+        has_sufficient_road: bool,
+    ) -> ImageQualityMetrics:
+        """Combine heuristic scores with segmentation output into final metrics"""
+        blur_score, exposure_score, size_score = heuristic_scores
+
+        # Calculate overall score with road surface factor
+        overall_score = self._calculate_overall_score(
+            blur_score, exposure_score, size_score, road_percentage
+        )
+
+        # Only segmentation can fail at this point (heuristics already passed)
+        failure_reasons = []
+        if not has_sufficient_road:
+            failure_reasons.append(ImageFailureReason.INSUFFICIENT_ROAD_SURFACE)
+
+        # Determine if image is usable
+        is_usable = len(failure_reasons) == 0
+
+        return ImageQualityMetrics(
+            image_path=image_path,
+            overall_score=overall_score,
+            is_usable=is_usable,
+            failure_reasons=failure_reasons,
+            blur_score=blur_score,
+            exposure_score=exposure_score,
+            size_score=size_score,
+            road_surface_percentage=road_percentage,
+            has_sufficient_road=has_sufficient_road,
+            timestamp=time.time(),
+            assessment_version=self.version,
+        )
+
     def _calculate_blur_score(self, blur_result: tuple) -> float:
         """Calculate blur quality score (0-100)"""
         is_blurry, lap_var = blur_result
@@ -148,12 +295,11 @@ class ImageQualityService:
         if heuristics_result["blurry"][0]:
             reasons.append(ImageFailureReason.TOO_BLURRY)
 
-        if heuristics_result["poor_exposure"][0]:
-            dark_frac, bright_frac = heuristics_result["poor_exposure"][1]
-            if dark_frac > self.config.dark_threshold:
-                reasons.append(ImageFailureReason.TOO_DARK)
-            if bright_frac > self.config.bright_threshold:
-                reasons.append(ImageFailureReason.TOO_BRIGHT)
+        if heuristics_result["too_dark"]:
+            reasons.append(ImageFailureReason.TOO_DARK)
+
+        if heuristics_result["too_bright"]:
+            reasons.append(ImageFailureReason.TOO_BRIGHT)
 
         if heuristics_result["too_small"][0]:
             reasons.append(ImageFailureReason.RESOLUTION_TOO_SMALL)
@@ -2,6 +2,9 @@
 AI segmentation for road surface detection using semantic segmentation
 """
 
+import threading
+from typing import Union
+
 import cv2
 import numpy as np
 
@@ -12,6 +15,10 @@ class RoadSegmentation:
     def __init__(self):
         self.model = None
         self.model_loaded = False
+        # FP16 inference, enabled only when a CUDA device is available
+        self.half = False
+        # YOLO predictors are not thread-safe; serialise inference
+        self._model_lock = threading.Lock()
         self._load_model()
 
     def _load_model(self) -> bool:
@@ -22,6 +29,8 @@ class RoadSegmentation:
 
             # Use YOLOv8 segmentation model (can detect road/street)
             self.model = YOLO("yolov8n-seg.pt")  # nano segmentation model
+            self.model.fuse()  # fold Conv+BatchNorm layers for faster inference
+            self.half = self._cuda_available()
             self.model_loaded = True
             return True
         except ImportError:
@@ -32,61 +41,110 @@ class RoadSegmentation:
             self.model_loaded = False
             return False
 
-    def detect_road_surface(self, image_path: str) -> tuple[float, bool]:
+    @staticmethod
+    def _cuda_available() -> bool:
+        """Check whether torch can run on a CUDA device"""
+        try:
+            import torch
+
+            return torch.cuda.is_available()
+        except ImportError:
+            return False
+
+    def detect_road_surface(self, image: Union[str, np.ndarray]) -> tuple[float, bool]:
         """
         Detect road surface percentage in image
 
+        Args:
+            image: Decoded BGR image, or path to an image file
+
         Returns:
             Tuple of (road_percentage, has_sufficient_road)
         """
         if self.model_loaded:
-            return self._ai_segmentation(image_path)
-        return self._fallback_segmentation(image_path)
+            return self._ai_segmentation(image)
+        return self._fallback_segmentation(image)
 
-    def _ai_segmentation(self, image_path: str) -> tuple[float, bool]:
+    def detect_road_surface_batch(
+        self, images: list[Union[str, np.ndarray]], batch_size: int = 16
+    ) -> list[tuple[float, bool]]:
+        """
+        Detect road surface percentage for several images
+
+        The AI model is run once per chunk of batch_size images instead of
+        once per image. Images may be decoded BGR arrays or file paths.
+
+        Returns:
+            List of (road_percentage, has_sufficient_road) tuples, in input order
+        """
+        if not self.model_loaded:
+            return [self._fallback_segmentation(image) for image in images]
+
+        results = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start : start + batch_size]
+            try:
+                with self._model_lock:
+                    model_results = self.model(chunk, half=self.half)
+                for result in model_results:
+                    road_percentage = self._road_percentage(result)
+                    results.append((road_percentage, road_percentage >= 10.0))
+            except Exception:
+                # Fall back to traditional method
+                results.extend(self._fallback_segmentation(image) for image in chunk)
+
+        return results
+
+    def _ai_segmentation(self, image: Union[str, np.ndarray]) -> tuple[float, bool]:
         """Use AI model for road surface detection"""
         try:
-            results = self.model(image_path)
+            with self._model_lock:
+                results = self.model(image, half=self.half)
 
-            # Look for road/street classes in segmentation
             road_percentage = 0.0
-
             for result in results:
-                if result.masks is not None:
-                    masks = result.masks.data
-                    classes = result.boxes.cls if result.boxes is not None else []
-
-                    # Check for road-related classes (road, street, pavement)
-                    # COCO classes: road might be class 0 (person), but we need street/road
-                    road_mask = None
-
-                    for i, cls_id in enumerate(classes):
-                        # Look for relevant classes (this depends on model training)
-                        # For general COCO model, we might not have specific road class
-                        # So we'll use the bottom portion of image as road assumption
-                        if cls_id in [0, 2, 5, 7]:  # person, car, bus, truck - indicates road
-                            if road_mask is None:
-                                road_mask = masks[i]
-                            else:
-                                road_mask = np.logical_or(road_mask, masks[i])
-
-                    if road_mask is not None:
-                        road_percentage = float(road_mask.sum() / road_mask.size * 100)
-                    else:
-                        # If no vehicles detected, assume bottom 40% is road
-                        road_percentage = 40.0
+                road_percentage = self._road_percentage(result)
 
             has_sufficient_road = road_percentage >= 10.0  # At least 10% road surface
             return road_percentage, has_sufficient_road
 
         except Exception:
             # Fall back to traditional method
-            return self._fallback_segmentation(image_path)
+            return self._fallback_segmentation(image)
 
-    def _fallback_segmentation(self, image_path: str) -> tuple[float, bool]:
+    @staticmethod
+    def _road_percentage(result) -> float:
+        """Estimate road surface percentage from a single YOLO segmentation result"""
+        # Look for road/street classes in segmentation
+        if result.masks is None:
+            return 0.0
+
+        # Move tensors to host memory once; masks are float 0/1 per detection
+        masks = result.masks.data.cpu().numpy() > 0.5
+        classes = result.boxes.cls.cpu().numpy() if result.boxes is not None else []
+
+        # Check for road-related classes (road, street, pavement)
+        # COCO classes: road might be class 0 (person), but we need street/road
+        road_mask = None
+
+        for i, cls_id in enumerate(classes):
+            # Look for relevant classes (this depends on model training)
+            # For general COCO model, we might not have specific road class
+            # So we'll use the bottom portion of image as road assumption
+            if cls_id in [0, 2, 5, 7]:  # person, car, bus, truck - indicates road
+                road_mask = masks[i] if road_mask is None else np.logical_or(road_mask, masks[i])
+
+        if road_mask is not None:
+            return cv2.countNonZero(road_mask.view(np.uint8)) / road_mask.size * 100
+
+        # If no vehicles detected, assume bottom 40% is road
+        return 40.0
+
+    def _fallback_segmentation(self, image: Union[str, np.ndarray]) -> tuple[float, bool]:
         """Fallback road detection using traditional computer vision"""
         try:
-            image = cv2.imread(image_path)
+            if not isinstance(image, np.ndarray):
+                image = cv2.imread(str(image))
             if image is None:
                 return 0.0, False
 
@@ -111,7 +169,7 @@ class RoadSegmentation:
 
             # Calculate percentage
             total_pixels = height * width
-            road_pixels = np.sum(road_mask)
+            road_pixels = cv2.countNonZero(road_mask)
             road_percentage = float(road_pixels / total_pixels * 100)
 
             has_sufficient_road = road_percentage >= 20.0  # At least 20% road surface
@@ -123,32 +181,32 @@ class RoadSegmentation:
     def _detect_road_by_color_texture(
         self, gray_roi: np.ndarray, hsv_roi: np.ndarray
     ) -> np.ndarray:
-        """Detect road surface using color and texture analysis"""
-        # Color-based detection (roads are typically gray/dark)
-        # Look for pixels with low saturation and mid-range value
-        h, s, v = cv2.split(hsv_roi)
+        """
+        Detect road surface using color and texture analysis
 
-        # Road color criteria: low saturation, mid-range brightness
-        color_mask = (s < 50) & (v > 30) & (v < 180)
+        Returns:
+            uint8 mask with 255 for road pixels and 0 elsewhere
+        """
+        # Color-based detection (roads are typically gray/dark)
+        # Road color criteria: low saturation (< 50), mid-range brightness (30 < v < 180)
+        color_mask = cv2.inRange(hsv_roi, (0, 0, 31), (180, 49, 179))
 
         # Texture-based detection using local standard deviation
         # Roads have relatively uniform texture
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
         blurred = cv2.GaussianBlur(gray_roi, (5, 5), 0)
 
-        # Calculate local standard deviation
-        mean = cv2.filter2D(blurred, -1, kernel / 25)
-        sqr_diff = (blurred.astype(np.float32) - mean) ** 2
-        local_std = np.sqrt(cv2.filter2D(sqr_diff, -1, kernel / 25))
+        # Local variance as E[X^2] - E[X]^2 over a 5x5 window
+        mean = cv2.boxFilter(blurred, cv2.CV_32F, (5, 5))
+        mean_sq = cv2.sqrBoxFilter(blurred, cv2.CV_32F, (5, 5))
+        local_var = mean_sq - mean * mean
 
-        # Roads have low texture variation
-        texture_mask = local_std < 15
+        # Roads have low texture variation (local std < 15, i.e. variance < 225)
+        texture_mask = cv2.compare(local_var, 15.0**2, cv2.CMP_LT)
 
         # Combine color and texture masks
-        road_mask = color_mask & texture_mask
+        road_mask = cv2.bitwise_and(color_mask, texture_mask)
 
         # Clean up mask with morphological operations
-        road_mask = cv2.morphologyEx(road_mask.astype(np.uint8), cv2.MORPH_CLOSE, kernel)
-        road_mask = cv2.morphologyEx(road_mask, cv2.MORPH_OPEN, kernel)
-
-        return road_mask.astype(bool)
+        road_mask = cv2.morphologyEx(road_mask, cv2.MORPH_CLOSE, kernel)
+        return cv2.morphologyEx(road_mask, cv2.MORPH_OPEN, kernel)
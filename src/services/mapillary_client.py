@@ -1,21 +1,118 @@
+import hashlib
+import json
 import os
+import queue
+import tempfile
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Optional
 
 import requests
+import urllib3
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from src.utils.rate_limit import TokenBucket
 
 
 load_dotenv()
 
+# Concurrent thumbnail downloads per download_images call
+DOWNLOAD_WORKERS = 16
+
+# Reusable read buffers for streaming thumbnails to disk
+DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+_download_buffers: queue.SimpleQueue = queue.SimpleQueue()
+
+# Shared session so all requests reuse pooled keep-alive connections
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+
+# Process-wide request budget, well under Mapillary's per-minute API limits
+MAX_CALLS_PER_MINUTE = 900
+rate_limiter = TokenBucket(calls=MAX_CALLS_PER_MINUTE, period=60)
+
+# Cached metadata responses are reused for up to 60 days
+METADATA_CACHE_TTL_S = 60 * 86400
+
+# Retry policy for HTTP 429 (Too Many Requests) responses
+MAX_RETRIES = 5
+BACKOFF_BASE_S = 1.0
+
+
+def rate_limited_get(url: str, **kwargs) -> requests.Response:
+    """
+    Issue a GET through the shared session, respecting the rate limit.
+
+    Responses with HTTP 429 are retried with exponential backoff, honouring
+    a numeric Retry-After header when present. Other responses, including
+    other errors, are returned to the caller unchanged.
+
+    Args:
+        url: Request URL
+        **kwargs: Passed through to requests.Session.get
+
+    Returns:
+        The final response
+    """
+    for attempt in range(MAX_RETRIES):
+        rate_limiter.acquire()
+        response = http_session.get(url, **kwargs)
+
+        if response.status_code != 429 or attempt == MAX_RETRIES - 1:
+            return response
+
+        retry_after = response.headers.get("Retry-After", "")
+        delay = float(retry_after) if retry_after.isdigit() else BACKOFF_BASE_S * 2**attempt
+        response.close()
+        time.sleep(delay)
+
+    return response
+
+
+def _acquire_download_buffer() -> bytearray:
+    """Take a scratch buffer from the pool, allocating one if none are free."""
+    try:
+        return _download_buffers.get_nowait()
+    except queue.Empty:
+        return bytearray(DOWNLOAD_BUFFER_SIZE)
+
+
+def _release_download_buffer(buffer: bytearray) -> None:
+    """Return a scratch buffer to the pool, keeping at most one per worker."""
+    if _download_buffers.qsize() < DOWNLOAD_WORKERS:
+        _download_buffers.put(buffer)
+
+
+def _temp_file_for(target: Path, suffix: str, mode: str = "wb"):
+    """Open a uniquely named temp file beside target, so concurrent writers never share one."""
+    return tempfile.NamedTemporaryFile(
+        mode, dir=target.parent, prefix=f"{target.stem}.", suffix=suffix, delete=False
+    )
+
 
 class MapillaryClient:
     BASE_URL = "https://graph.mapillary.com/images"
 
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize the client.
+
+        Args:
+            cache_dir: Directory for cached metadata responses; falls back to the
+                MAPILLARY_CACHE_DIR environment variable, caching is off if neither is set
+        """
         self.access_token = os.getenv("MAPILLARY_ACCESS_TOKEN")
         if not self.access_token:
             raise ValueError("MAPILLARY_ACCESS_TOKEN not set in environment")
 
+        cache_dir = cache_dir or os.getenv("MAPILLARY_CACHE_DIR")
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
     def fetch_images(
         self,
         bbox: tuple,
@@ -32,6 +129,14 @@ class MapillaryClient:
         Returns:
             List of image metadata dictionaries
         """
+        cache_file = self._metadata_cache_file(bbox, limit, fields)
+        if (
+            cache_file
+            and cache_file.exists()
+            and time.time() - cache_file.stat().st_mtime < METADATA_CACHE_TTL_S
+        ):
+            return json.loads(cache_file.read_text())
+
         params = {"access_token": self.access_token, "fields": fields, "limit": limit}
 
         # Convert bbox from (min_lat, min_lon, max_lat, max_lon)
@@ -39,13 +144,37 @@ class MapillaryClient:
         min_lat, min_lon, max_lat, max_lon = bbox
         mapillary_bbox = f"{min_lon},{min_lat},{max_lon},{max_lat}"
 
-        response = requests.get(f"{self.BASE_URL}?bbox={mapillary_bbox}", params=params, timeout=30)
+        response = rate_limited_get(
+            f"{self.BASE_URL}?bbox={mapillary_bbox}", params=params, timeout=30
+        )
         response.raise_for_status()
-        return response.json().get("data", [])
+        images = response.json().get("data", [])
+
+        if cache_file:
+            with _temp_file_for(cache_file, ".tmp", "w") as f:
+                tmp_path = Path(f.name)
+            try:
+                tmp_path.write_text(json.dumps(images))
+                tmp_path.replace(cache_file)
+            except OSError:
+                tmp_path.unlink(missing_ok=True)
+                raise
+
+        return images
+
+    def _metadata_cache_file(self, bbox: tuple, limit: int, fields: str) -> Optional[Path]:
+        """Return the cache file for a metadata query, or None if caching is disabled."""
+        if not self.cache_dir:
+            return None
+
+        key = hashlib.blake2b(repr((bbox, limit, fields)).encode(), digest_size=16)
+        return self.cache_dir / f"{key.hexdigest()}.json"
 
     def download_image(self, image_metadata: dict, output_dir: str = "mapillary_images") -> str:
         """Download a single image and return the local file path.
 
+        Images already present in output_dir are reused without a request.
+
         Args:
             image_metadata: Image metadata dict with id and thumb_original_url
             output_dir: Directory to save downloaded images
@@ -54,7 +183,7 @@ class MapillaryClient:
             Path to downloaded image file
 
         Raises:
-            requests.RequestException: If download fails
+            requests.RequestException: If download or writing the file fails
         """
         Path(output_dir).mkdir(parents=True, exist_ok=True)
 
@@ -62,35 +191,93 @@ class MapillaryClient:
         url = image_metadata["thumb_original_url"]
         file_path = Path(output_dir) / f"{img_id}.jpg"
 
-        response = requests.get(url, stream=True, timeout=30)
-        response.raise_for_status()
+        if file_path.exists():
+            return str(file_path)
 
-        with open(file_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        response = rate_limited_get(url, stream=True, timeout=30)
+        # Closing the streamed response hands its connection back to the pool
+        with response:
+            response.raise_for_status()
+
+            # Write to a temp file first so an interrupted download is never reused
+            part_path = None
+            buffer = _acquire_download_buffer()
+            try:
+                view = memoryview(buffer)
+                response.raw.decode_content = True
+                with _temp_file_for(file_path, ".part") as f:
+                    part_path = Path(f.name)
+                    while n := response.raw.readinto(view):
+                        f.write(view[:n])
+                part_path.replace(file_path)
+            except (urllib3.exceptions.HTTPError, OSError) as e:
+                if part_path is not None:
+                    part_path.unlink(missing_ok=True)
+                # Images only appear by replace, so an existing file is complete,
+                # e.g. when another thread downloaded the same image first
+                if file_path.exists():
+                    return str(file_path)
+                raise requests.ConnectionError(f"Download of image {img_id} failed: {e}") from e
+            finally:
+                _release_download_buffer(buffer)
 
         return str(file_path)
 
     def download_images(
-        self, images: list[dict], output_dir: str = "mapillary_images"
+        self,
+        images: list[dict],
+        output_dir: str = "mapillary_images",
+        max_workers: int = DOWNLOAD_WORKERS,
     ) -> list[str]:
-        """Download multiple images and return list of local file paths.
+        """Download multiple images concurrently and return list of local file paths.
 
         Args:
             images: List of image metadata dictionaries
             output_dir: Directory to save downloaded images
+            max_workers: Maximum number of concurrent downloads
 
         Returns:
-            List of paths to successfully downloaded images
+            List of paths to successfully downloaded images, in input order
         """
-        downloaded_paths = []
+        downloaded_paths = [None] * len(images)
+        for index, path in self.iter_download_images(images, output_dir, max_workers):
+            downloaded_paths[index] = path
 
-        for img in images:
-            try:
-                file_path = self.download_image(img, output_dir)
-                downloaded_paths.append(file_path)
-            except requests.RequestException:
-                # Skip failed downloads, continue with others
-                continue
+        return [path for path in downloaded_paths if path is not None]
+
+    def iter_download_images(
+        self,
+        images: list[dict],
+        output_dir: str = "mapillary_images",
+        max_workers: int = DOWNLOAD_WORKERS,
+    ) -> Iterator[tuple[int, str]]:
+        """Download multiple images concurrently, yielding each as it completes.
+
+        Downloads keep running while the caller handles a yielded image.
+
+        Args:
+            images: List of image metadata dictionaries
+            output_dir: Directory to save downloaded images
+            max_workers: Maximum number of concurrent downloads
+
+        Yields:
+            (index into images, local file path) in completion order; failed
+            downloads are skipped
+        """
+        if not images:
+            return
+
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
 
-        return downloaded_paths
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(images))) as executor:
+            futures = {
+                executor.submit(self.download_image, img, output_dir): index
+                for index, img in enumerate(images)
+            }
+            for future in as_completed(futures):
+                try:
+                    path = future.result()
+                except requests.RequestException:
+                    # Skip failed downloads, continue with others
+                    continue
+                yield futures[future], path
@@ -9,9 +9,25 @@ Extends the base pipeline to save all results to the database with:
 """
 
 import logging
-from datetime import datetime
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
 from typing import Any, Optional
 
+import numpy as np
+import psycopg2
+
+from src.utils.bloom_filter import BloomFilter
+from src.utils.phash import phash_file
+
 from ...database import DatabaseService
 from .pipeline_result import PipelineResult
 from .road_analysis_pipeline import RoadAnalysisPipeline
@@ -19,12 +35,48 @@ from .road_analysis_pipeline import RoadAnalysisPipeline
 
 logger = logging.getLogger(__name__)
 
+# Mapillary returns captured_at in epoch milliseconds; smaller numbers (before
+# year 5138 in seconds) are taken as epoch seconds
+MS_TIMESTAMP_THRESHOLD = 1e11
+# Epoch milliseconds of year 9000, well inside datetime's range
+MAX_TIMESTAMP_MS = 2.2e14
+
+# Images downloaded (or coordinates processed) between progress log lines
+PROGRESS_LOG_INTERVAL = 25
+
+# Stored photo IDs remembered by (source, source_image_id), so images returned
+# again for overlapping coordinates skip the database duplicate check
+KNOWN_PHOTO_CACHE_SIZE = 100_000
+
+# Coordinates processed between saves of the duplicate filter in
+# process_coordinates_with_db, which also saves once the run ends
+DUPLICATE_FILTER_SAVE_INTERVAL = 100
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO 8601 date, accepting a trailing "Z" for UTC."""
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
 
 class DatabasePipeline(RoadAnalysisPipeline):
     """Road analysis pipeline with database integration."""
 
     def __init__(
-        self, enable_fetcher: bool = False, database_service: Optional[DatabaseService] = None
+        self,
+        enable_fetcher: bool = False,
+        database_service: Optional[DatabaseService] = None,
+        analysis_workers: int = 1,
+        duplicate_filter: bool = False,
+        duplicate_filter_path: Optional[str] = None,
+        db_session_settings: Optional[dict[str, str]] = None,
+        visual_duplicates: bool = False,
+        db_pool_size: Optional[int] = None,
+        analysis_threads: bool = False,
+        analysis_batch_size: int = 1,
+        result_cache_size: int = 0,
     ) -> None:
         """
         Initialize database-integrated pipeline.
@@ -32,47 +84,310 @@ class DatabasePipeline(RoadAnalysisPipeline):
         Args:
             enable_fetcher: Enable image fetching capability
             database_service: Database service instance (creates new if None)
+            analysis_workers: Worker processes used to analyse coordinate batches
+                (e.g. os.cpu_count(); each loads its own models)
+            duplicate_filter: Skip database duplicate checks for photos a Bloom
+                filter of stored photo keys rules out. The filter only sees photos
+                stored at startup and saved by this pipeline, so enable it only
+                when no other process writes photos concurrently.
+            duplicate_filter_path: File to persist the filter to between runs
+            db_session_settings: Postgres session settings for a newly created
+                database service (see DatabaseService)
+            visual_duplicates: Hash each downloaded image and skip analysing it
+                if a stored photo nearby looks the same (one query per image)
+            db_pool_size: Connection pool size for a newly created database
+                service (see DatabaseService)
+            analysis_threads: Run the analysis workers as threads sharing this
+                pipeline's models instead of as processes (see process_batch)
+            analysis_batch_size: Images per road model call; above 1 the quality
+                checks and batched road analysis run as two threaded stages
+            result_cache_size: Results reused for visually near-identical images
+                (see RoadAnalysisPipeline)
         """
-        super().__init__(enable_fetcher=enable_fetcher)
+        super().__init__(enable_fetcher=enable_fetcher, result_cache_size=result_cache_size)
 
-        self.db_service = database_service or DatabaseService()
+        self.db_service = database_service or DatabaseService(
+            session_settings=db_session_settings, pool_size=db_pool_size
+        )
         self.save_to_db = True
+        self.analysis_workers = analysis_workers
+        self.analysis_threads = analysis_threads
+        self.analysis_batch_size = analysis_batch_size
+        self.visual_duplicates = visual_duplicates
+
+        # Databases created from an older schema may lack the duplicate check
+        # index. Duplicate rows blocking it are raised, as every photo insert
+        # would fail without it.
+        try:
+            self.db_service.ensure_duplicate_indexes()
+        except psycopg2.Error as e:
+            logger.warning(f"Could not verify duplicate check indexes: {e}")
+        # ... or reject the NULL scores stored for header-rejected images
+        try:
+            self.db_service.ensure_optional_quality_scores()
+        except Exception as e:
+            logger.warning(f"Could not allow NULL quality scores: {e}")
+
+        self.duplicate_filter_path = duplicate_filter_path
+        self._dup_bloom: Optional[BloomFilter] = None
+        self._dup_bloom_max_id = 0
+        self._dup_bloom_changed = False
+        # Coordinates processed on several threads share the filter
+        self._dup_bloom_lock = threading.Lock()
+        if duplicate_filter:
+            self._load_duplicate_filter()
+
+        self._known_photos: OrderedDict[tuple[str, str], int] = OrderedDict()
+        self._known_photos_lock = threading.Lock()
 
         logger.info("Database pipeline initialized")
 
+    def _load_duplicate_filter(self) -> None:
+        """Build the duplicate filter from its saved copy and the photos table."""
+        self._dup_bloom, self._dup_bloom_max_id = BloomFilter(), 0
+
+        path = self.duplicate_filter_path
+        if path and os.path.exists(path):
+            try:
+                data = Path(path).read_bytes()
+                (max_id,) = struct.unpack_from("<Q", data)
+                self._dup_bloom = BloomFilter.from_bytes(data[8:])
+                self._dup_bloom_max_id = max_id
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Ignoring unreadable duplicate filter {path}: {e}")
+
+        # Only photos stored since the filter was saved need to be scanned
+        rows = self.db_service.get_photo_keys(after_id=self._dup_bloom_max_id)
+        for row in rows:
+            self._remember_photo(row)
+        if rows:
+            self._dup_bloom_max_id = rows[-1]["id"]
+
+        logger.info(f"Duplicate filter loaded with {len(self._dup_bloom)} keys")
+
+    def save_duplicate_filter(self) -> None:
+        """Persist the duplicate filter to duplicate_filter_path."""
+        if self._dup_bloom is None or not self.duplicate_filter_path:
+            return
+
+        # The scan position is saved rather than our own photo IDs, so photos
+        # other processes stored meanwhile are picked up on the next load
+        with self._dup_bloom_lock:
+            data = struct.pack("<Q", self._dup_bloom_max_id) + self._dup_bloom.to_bytes()
+            self._dup_bloom_changed = False
+
+        # Each save writes its own temp file, so concurrent saves never
+        # interleave and the saved filter is only ever replaced whole
+        path = Path(self.duplicate_filter_path)
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f"{path.name}.", suffix=".part", delete=False
+        ) as tmp_file:
+            tmp_path = Path(tmp_file.name)
+        try:
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            self._dup_bloom_changed = True
+            raise
+
+    def _save_changed_duplicate_filter(self) -> None:
+        """Persist the duplicate filter if photos were added since the last save."""
+        if not self._dup_bloom_changed:
+            return
+        try:
+            self.save_duplicate_filter()
+        except OSError as e:
+            logger.warning(f"Could not save duplicate filter: {e}")
+
+    @staticmethod
+    def _duplicate_keys(photo: dict[str, Any]) -> tuple[Optional[str], Optional[str]]:
+        """Filter keys for the ID and location+time duplicate rules."""
+        id_key = (
+            f"id:{photo['source']}:{photo['source_image_id']}"
+            if photo.get("source_image_id")
+            else None
+        )
+        date_taken = photo.get("date_taken")
+        date_key = f"date:{date_taken.timestamp()}" if date_taken else None
+        return id_key, date_key
+
+    def _remember_photo(self, photo: dict[str, Any]) -> None:
+        """Add a stored photo's keys to the duplicate filter."""
+        if self._dup_bloom is None:
+            return
+        with self._dup_bloom_lock:
+            for key in self._duplicate_keys(photo):
+                if key:
+                    self._dup_bloom.add(key)
+            self._dup_bloom_changed = True
+
+    def _known_photo_id(self, photo: dict[str, Any]) -> Optional[int]:
+        """ID of the stored photo this one is known to duplicate, if cached."""
+        if not photo.get("source_image_id"):
+            return None
+        key = (photo["source"], photo["source_image_id"])
+        with self._known_photos_lock:
+            photo_id = self._known_photos.get(key)
+            if photo_id is not None:
+                self._known_photos.move_to_end(key)
+        return photo_id
+
+    def _cache_photo_id(self, photo: dict[str, Any], photo_id: int) -> None:
+        """Remember the stored photo a photo was saved as or found to duplicate."""
+        if not photo.get("source_image_id"):
+            return
+        key = (photo["source"], photo["source_image_id"])
+        with self._known_photos_lock:
+            self._known_photos[key] = photo_id
+            self._known_photos.move_to_end(key)
+            if len(self._known_photos) > KNOWN_PHOTO_CACHE_SIZE:
+                self._known_photos.popitem(last=False)
+
+    def _may_be_duplicate(self, photo: dict[str, Any]) -> bool:
+        """Check whether a photo needs the authoritative database duplicate check."""
+        if self._dup_bloom is None:
+            return True
+
+        id_key, date_key = self._duplicate_keys(photo)
+        if id_key and id_key in self._dup_bloom:
+            return True
+        if photo.get("location") and date_key:
+            # Naive times are compared in the database session's time zone
+            return photo["date_taken"].tzinfo is None or date_key in self._dup_bloom
+        return False
+
     def _parse_mapillary_date(self, captured_at: Any) -> Optional[datetime]:
         """Parse Mapillary date which can be ISO string or timestamp."""
         if not captured_at:
             return None
 
         try:
-            # Try parsing as ISO string first
-            if isinstance(captured_at, str):
-                return datetime.fromisoformat(captured_at.replace("Z", "+00:00"))
-            # Try parsing as timestamp
+            # Mapillary returns timestamps, so try those first (UTC, ms or seconds)
             if isinstance(captured_at, (int, float)):
-                return datetime.fromtimestamp(captured_at)
+                if captured_at >= MS_TIMESTAMP_THRESHOLD:
+                    captured_at = captured_at / 1000
+                return datetime.fromtimestamp(captured_at, tz=timezone.utc)
+            # ISO strings repeat across overlapping fetches, so parses are cached
+            if isinstance(captured_at, str):
+                return _parse_iso(captured_at)
             return None
-        except (ValueError, TypeError):
+        except (ValueError, TypeError, OverflowError, OSError):
             logger.warning(f"Could not parse Mapillary date: {captured_at}")
             return None
 
+    def _parse_mapillary_dates_batch(self, values: list[Any]) -> list[Optional[datetime]]:
+        """
+        Parse many Mapillary dates at once.
+
+        Timestamps and UTC ("Z") ISO strings are converted with one NumPy call
+        per kind; other values go through _parse_mapillary_date.
+
+        Args:
+            values: Raw captured_at values
+
+        Returns:
+            Parsed dates (or None) in the same order as values
+        """
+        parsed: list[Optional[datetime]] = [None] * len(values)
+        numbers, strings, others = [], [], []
+        for i, value in enumerate(values):
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value:
+                numbers.append(i)
+            elif isinstance(value, str) and value.endswith("Z"):
+                strings.append(i)
+            elif value:
+                others.append(i)
+
+        if numbers:
+            stamps = np.array([values[i] for i in numbers], dtype=np.float64)
+            stamps = np.where(stamps >= MS_TIMESTAMP_THRESHOLD, stamps, stamps * 1000)
+            # Beyond datetime's range (or NaN) the per-value parser logs and skips
+            in_range = np.abs(stamps) < MAX_TIMESTAMP_MS
+            # Microsecond resolution, as datetime.fromtimestamp keeps
+            self._fill_utc_dates(
+                parsed,
+                [i for i, ok in zip(numbers, in_range) if ok],
+                np.rint(stamps[in_range] * 1000).astype("int64").astype("M8[us]"),
+            )
+            others.extend(i for i, ok in zip(numbers, in_range) if not ok)
+
+        if strings:
+            try:
+                # NumPy parses naive ISO strings; the stripped "Z" makes them UTC
+                dates = np.array([values[i][:-1] for i in strings], dtype="M8[us]")
+                self._fill_utc_dates(parsed, strings, dates)
+            except ValueError:
+                others.extend(strings)
+
+        for i in others:
+            parsed[i] = self._parse_mapillary_date(values[i])
+        return parsed
+
+    @staticmethod
+    def _fill_utc_dates(
+        parsed: list[Optional[datetime]], indexes: list[int], dates: np.ndarray
+    ) -> None:
+        """Store UTC datetime64 values as aware datetimes at the given indexes."""
+        for i, value in zip(indexes, dates.astype("M8[us]").tolist()):
+            # tolist() yields ints for dates outside datetime's range
+            if isinstance(value, datetime):
+                parsed[i] = value.replace(tzinfo=timezone.utc)
+            else:
+                logger.warning(f"Could not parse Mapillary date: {value}")
+
     def _validate_compass_angle(self, angle: Any) -> Optional[float]:
         """Validate compass angle to be between 0-360 degrees."""
         if angle is None:
             return None
-        
+        # Mapillary sends floats; valid ones need no conversion
+        if type(angle) is float and 0.0 <= angle < 360.0:
+            return angle
+
         try:
             angle_float = float(angle)
             if 0 <= angle_float < 360:
                 return angle_float
-            else:
-                logger.warning(f"Invalid compass angle {angle_float}, must be 0-360")
-                return None
+            logger.warning(f"Invalid compass angle {angle_float}, must be 0-360")
+            return None
         except (ValueError, TypeError):
             logger.warning(f"Could not parse compass angle: {angle}")
             return None
 
+    def _validate_compass_angles_batch(self, values: list[Any]) -> list[Optional[float]]:
+        """
+        Validate many compass angles at once.
+
+        Float angles are range-checked with one NumPy comparison (NaN fails it);
+        invalid and non-float values go through _validate_compass_angle.
+
+        Args:
+            values: Raw compass_angle values
+
+        Returns:
+            Validated angles (or None) in the same order as values
+        """
+        validated: list[Optional[float]] = [None] * len(values)
+        floats, others = [], []
+        for i, value in enumerate(values):
+            if type(value) is float:
+                floats.append(i)
+            elif value is not None:
+                others.append(i)
+
+        if floats:
+            angles = np.array([values[i] for i in floats], dtype=np.float64)
+            valid = (angles >= 0.0) & (angles < 360.0)
+            for i, angle, ok in zip(floats, angles.tolist(), valid.tolist()):
+                if ok:
+                    validated[i] = angle
+                else:
+                    others.append(i)
+
+        for i in others:
+            validated[i] = self._validate_compass_angle(values[i])
+        return validated
+
     def process_image_with_db(
         self,
         image_path: str,
@@ -81,6 +396,7 @@ class DatabasePipeline(RoadAnalysisPipeline):
         location: Optional[tuple[float, float]] = None,
         date_taken: Optional[datetime] = None,
         compass_angle: Optional[float] = None,
+        fetch_existing_results: bool = True,
     ) -> dict[str, Any]:
         """
         Process image and save all results to database.
@@ -92,111 +408,328 @@ class DatabasePipeline(RoadAnalysisPipeline):
             location: (latitude, longitude) tuple
             date_taken: When photo was captured
             compass_angle: Camera direction in degrees
+            fetch_existing_results: Load the stored results of a duplicate photo
 
         Returns:
             Dictionary with processing results and database IDs
         """
-        logger.info(f"Processing image with database integration: {image_path}")
+        logger.info("Processing image with database integration: %s", image_path)
+
+        photo = {
+            "source": source,
+            "source_image_id": source_image_id,
+            "location": location,
+            "date_taken": date_taken,
+            "compass_angle": compass_angle,
+        }
+        if self.save_to_db:
+            return self._process_and_save_to_db(image_path, photo, fetch_existing_results)
+
+        if self._may_be_duplicate(photo):
+            result = self._check_duplicate(image_path, photo, fetch_existing_results)
+            if result is not None:
+                return result
+
+        # Process image with base pipeline
+        pipeline_result = self.process_image(image_path)
+        return {"pipeline_result": pipeline_result, "database_saved": False}
+
+    def _check_duplicate(
+        self, image_path: str, photo: dict[str, Any], fetch_existing_results: bool = True
+    ) -> Optional[dict[str, Any]]:
+        """
+        Look up an image's photo metadata among already saved photos.
+
+        Args:
+            image_path: Path to image file
+            photo: Photo metadata (source, source_image_id, location, date_taken,
+                compass_angle)
+            fetch_existing_results: Load the stored results of a duplicate photo
 
+        Returns:
+            Duplicate or error result, or None if the image still needs processing
+        """
         try:
-            # Check for duplicates first
             duplicate = self.db_service.check_duplicate_photo(
-                source=source,
-                source_image_id=source_image_id,
-                location=location,
-                date_taken=date_taken,
+                source=photo["source"],
+                source_image_id=photo["source_image_id"],
+                location=photo["location"],
+                date_taken=photo["date_taken"],
             )
+        except Exception as e:
+            logger.error(f"Error processing image {image_path}: {e}")
+            return {"error": str(e), "success": False, "image_path": image_path}
 
-            if duplicate:
-                logger.info(
-                    f"Found duplicate photo (ID: {duplicate['id']}), returning existing results"
-                )
+        if not duplicate:
+            return None
+        return self._duplicate_result(image_path, duplicate, fetch_existing_results)
+
+    def _duplicate_result(
+        self, image_path: str, duplicate: dict[str, Any], fetch_existing_results: bool
+    ) -> dict[str, Any]:
+        """
+        Build the result for an image whose photo is already in the database.
+
+        Without fetch_existing_results, existing_results is None and only the
+        duplicate photo row (already loaded by the duplicate check) is returned.
+        """
+        logger.info("Found duplicate photo (ID: %s)", duplicate["id"])
+        existing_results = None
+        if fetch_existing_results:
+            try:
                 existing_results = self.db_service.get_photo_with_results(duplicate["id"])
-                return {
-                    "duplicate_found": True,
-                    "photo_id": duplicate["id"],
-                    "existing_results": existing_results,
-                    "processing_skipped": True,
-                }
+            except Exception as e:
+                logger.error(f"Error processing image {image_path}: {e}")
+                return {"error": str(e), "success": False, "image_path": image_path}
+
+        return {
+            "duplicate_found": True,
+            "photo_id": duplicate["id"],
+            "duplicate_photo": duplicate,
+            "existing_results": existing_results,
+            "processing_skipped": True,
+        }
+
+    @staticmethod
+    def _unique_images(image_metadata: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Drop repeated Mapillary records of the same image, keeping the first.
+
+        A repeated id would be downloaded twice to the same file and would make
+        the multi-row photo insert touch one row twice, failing the whole flush.
+        """
+        seen = set()
+        unique = []
+        for image in image_metadata:
+            image_id = image.get("id")
+            if image_id is not None:
+                if image_id in seen:
+                    continue
+                seen.add(image_id)
+            unique.append(image)
+        return unique
 
-            # Process image with base pipeline
-            pipeline_result = self.process_image(image_path)
+    def _analyses_in_process(self) -> bool:
+        """Whether images are analysed by this process's models rather than worker processes."""
+        return self.analysis_workers <= 1 or self.analysis_threads or self.analysis_batch_size > 1
 
-            if not self.save_to_db:
-                return {"pipeline_result": pipeline_result, "database_saved": False}
+    def _find_visual_duplicate(
+        self, photo: dict[str, Any], image_path: str
+    ) -> Optional[dict[str, Any]]:
+        """
+        Hash a downloaded image and look for a stored photo nearby that looks the same.
+
+        The hash is kept on the photo so it is saved with it. Does nothing unless
+        visual_duplicates is enabled and the photo has a location.
+        """
+        if not self.visual_duplicates or not photo.get("location"):
+            return None
+
+        photo["phash"] = phash_file(image_path)
+        if photo["phash"] is None:
+            return None
+        return self.db_service.find_visual_duplicate(photo["location"], photo["phash"])
+
+    def _extract_metadata_soa(
+        self, metadata: list[dict[str, Any]]
+    ) -> tuple[
+        list[Optional[str]],
+        list[Optional[tuple[float, float]]],
+        list[Optional[datetime]],
+        list[Optional[float]],
+    ]:
+        """
+        Split Mapillary image records into parallel metadata lists in one pass.
+
+        Args:
+            metadata: Mapillary image records
 
-            # Save to database in transaction
-            return self._save_pipeline_result_to_db(
-                pipeline_result=pipeline_result,
-                source=source,
-                source_image_id=source_image_id,
-                location=location,
-                date_taken=date_taken,
-                compass_angle=compass_angle,
+        Returns:
+            (source_image_ids, locations as (lat, lon), dates_taken, compass_angles)
+        """
+        ids, locations, raw_dates, raw_angles = [], [], [], []
+        for mapillary_data in metadata:
+            geometry = mapillary_data.get("geometry")
+            coordinates = geometry.get("coordinates") if geometry else None
+            ids.append(mapillary_data.get("id"))
+            locations.append((coordinates[1], coordinates[0]) if coordinates else None)
+            raw_dates.append(mapillary_data.get("captured_at"))
+            raw_angles.append(mapillary_data.get("compass_angle"))
+
+        return (
+            ids,
+            locations,
+            self._parse_mapillary_dates_batch(raw_dates),
+            self._validate_compass_angles_batch(raw_angles),
+        )
+
+    def _process_and_save_to_db(
+        self, image_path: str, photo: dict[str, Any], fetch_existing_results: bool
+    ) -> dict[str, Any]:
+        """
+        Analyse an image that is not a known duplicate, then save it with its results.
+
+        Known duplicates are found before any analysis. The photo row is only
+        claimed once the analysis is done, in one short transaction with its
+        results, so no row stays locked while the models run. A photo stored
+        concurrently in the meantime is returned as a duplicate. Everything is
+        rolled back if saving the results fails.
+        """
+        known_photo_id = self._known_photo_id(photo)
+        if known_photo_id is not None:
+            return self._duplicate_result(
+                image_path, {"id": known_photo_id}, fetch_existing_results
             )
 
+        if self._may_be_duplicate(photo):
+            result = self._check_duplicate(image_path, photo, fetch_existing_results)
+            if result is not None:
+                if result.get("duplicate_found"):
+                    self._cache_photo_id(photo, result["photo_id"])
+                return result
+
+        try:
+            duplicate = self._find_visual_duplicate(photo, image_path)
         except Exception as e:
             logger.error(f"Error processing image {image_path}: {e}")
             return {"error": str(e), "success": False, "image_path": image_path}
+        if duplicate:
+            self._cache_photo_id(photo, duplicate["id"])
+            return self._duplicate_result(image_path, duplicate, fetch_existing_results)
 
-    def _save_pipeline_result_to_db(
-        self,
-        pipeline_result: PipelineResult,
-        source: str,
-        source_image_id: str = None,
-        location: tuple[float, float] = None,
-        date_taken: datetime = None,
-        compass_angle: float = None,
-    ) -> dict[str, Any]:
-        """Save pipeline result to database with transaction safety."""
+        # Process image with base pipeline
+        pipeline_result = self.process_image(image_path)
 
-        with self.db_service.transaction():
-            try:
-                # 1. Save photo metadata
-                photo_id = self.db_service.save_photo(
-                    source=source,
-                    source_image_id=source_image_id,
-                    location=location,
-                    date_taken=date_taken,
-                    compass_angle=compass_angle,
+        try:
+            with self.db_service.transaction():
+                saved_photo = self.db_service.save_photo_idempotent(
+                    **photo,
                     street_point_id=None,  # Phase 1: no street points yet
                 )
+                if not saved_photo["inserted"]:
+                    self._cache_photo_id(photo, saved_photo["id"])
+                    return self._duplicate_result(
+                        image_path, {"id": saved_photo["id"]}, fetch_existing_results
+                    )
 
-                # 2. Save quality assessment (always)
-                quality_id = self.db_service.save_quality_result(
-                    photo_id=photo_id, quality_metrics=pipeline_result.quality_metrics
+                # Quality assessment (always) and road analysis (only if quality
+                # passed) are written in one round-trip
+                result_ids = self.db_service.save_photo_results(
+                    saved_photo["id"],
+                    pipeline_result.quality_metrics,
+                    pipeline_result.road_metrics,
                 )
 
-                # 3. Save road analysis (only if quality passed)
-                road_analysis_id = None
-                if pipeline_result.road_metrics:
-                    road_analysis_id = self.db_service.save_road_analysis_result(
-                        photo_id=photo_id, road_metrics=pipeline_result.road_metrics
+        except Exception as e:
+            logger.error(f"Failed to save pipeline result to database: {e}")
+            # Nothing was written; inside a batch transaction only this
+            # image's savepoint is rolled back
+            return {
+                "success": False,
+                "error": f"Database save failed: {e}",
+                "pipeline_result": pipeline_result,
+                "database_saved": False,
+            }
+
+        self._remember_photo(photo)
+        self._cache_photo_id(photo, saved_photo["id"])
+        logger.info(
+            "Successfully saved pipeline result to database: photo_id=%s", saved_photo["id"]
+        )
+
+        return {
+            "success": True,
+            "duplicate_found": False,
+            "pipeline_result": pipeline_result,
+            "database_ids": {"photo_id": saved_photo["id"], **result_ids},
+            "database_saved": True,
+        }
+
+    def _save_pipeline_results_bulk(
+        self, pending: list[tuple[dict[str, Any], PipelineResult]]
+    ) -> list[dict[str, Any]]:
+        """
+        Save many pipeline results with one multi-row INSERT per table.
+
+        The inserts share a transaction (a savepoint inside a batch), so either
+        every result is saved or none is. Photos stored concurrently since the
+        duplicate check (e.g. by a thread processing an overlapping coordinate)
+        are returned as duplicates instead of failing the batch.
+
+        Args:
+            pending: (photo metadata, pipeline result) pairs
+
+        Returns:
+            One result dictionary per pair, in the same order
+        """
+        if not pending:
+            return []
+
+        try:
+            with self.db_service.transaction():
+                claimed = self.db_service.save_photos_bulk_idempotent(
+                    [photo for photo, _ in pending]
+                )
+                inserted = [
+                    (claim["id"], pipeline_result)
+                    for claim, (_, pipeline_result) in zip(claimed, pending)
+                    if claim["inserted"]
+                ]
+                quality_ids = iter(
+                    self.db_service.save_quality_results_bulk(
+                        [
+                            (photo_id, pipeline_result.quality_metrics)
+                            for photo_id, pipeline_result in inserted
+                        ]
+                    )
+                )
+                # Road analysis only exists for images that passed quality
+                road_ids = iter(
+                    self.db_service.save_road_analysis_bulk(
+                        [
+                            (photo_id, pipeline_result.road_metrics)
+                            for photo_id, pipeline_result in inserted
+                            if pipeline_result.road_metrics is not None
+                        ]
                     )
+                )
+
+        except Exception as e:
+            logger.error(f"Failed to save {len(pending)} pipeline results to database: {e}")
+            return [
+                {
+                    "success": False,
+                    "error": f"Database save failed: {e}",
+                    "pipeline_result": pipeline_result,
+                    "database_saved": False,
+                }
+                for _, pipeline_result in pending
+            ]
 
-                logger.info(f"Successfully saved pipeline result to database: photo_id={photo_id}")
+        results = []
+        for claim, (_, pipeline_result) in zip(claimed, pending):
+            if not claim["inserted"]:
+                results.append(
+                    self._duplicate_result(pipeline_result.image_path, {"id": claim["id"]}, False)
+                )
+                continue
 
-                return {
+            results.append(
+                {
                     "success": True,
                     "duplicate_found": False,
                     "pipeline_result": pipeline_result,
                     "database_ids": {
-                        "photo_id": photo_id,
-                        "quality_id": quality_id,
-                        "road_analysis_id": road_analysis_id,
+                        "photo_id": claim["id"],
+                        "quality_id": next(quality_ids),
+                        "road_analysis_id": next(road_ids)
+                        if pipeline_result.road_metrics is not None
+                        else None,
                     },
                     "database_saved": True,
                 }
-
-            except Exception as e:
-                logger.error(f"Failed to save pipeline result to database: {e}")
-                # Transaction will be rolled back automatically
-                return {
-                    "success": False,
-                    "error": f"Database save failed: {e}",
-                    "pipeline_result": pipeline_result,
-                    "database_saved": False,
-                }
+            )
+        return results
 
     def process_coordinate_with_db(
         self,
@@ -205,6 +738,8 @@ class DatabasePipeline(RoadAnalysisPipeline):
         radius_m: float = 100.0,
         limit: int = 5,
         output_dir: str = None,
+        fetch_existing_results: bool = False,
+        save_filter: bool = True,
     ) -> dict[str, Any]:
         """
         Process coordinate with image fetching and database integration.
@@ -215,6 +750,10 @@ class DatabasePipeline(RoadAnalysisPipeline):
             radius_m: Search radius in meters
             limit: Maximum images to fetch
             output_dir: Directory to save images
+            fetch_existing_results: Load the stored results of duplicate photos
+                (one extra query per duplicate)
+            save_filter: Save the duplicate filter if photos were stored; callers
+                processing many coordinates pass False and save it themselves
 
         Returns:
             Processing results with database integration
@@ -224,87 +763,283 @@ class DatabasePipeline(RoadAnalysisPipeline):
         if not self.fetcher_service:
             raise ValueError("Fetcher service not enabled. Initialize with enable_fetcher=True")
 
-        try:
-            # Fetch images from coordinate
-            fetch_result = self.fetcher_service.fetch_images_at_point(
-                lat=lat, lon=lon, radius_m=radius_m, limit=limit, output_dir=output_dir
-            )
+        # Every database step of the coordinate reuses one connection
+        with self.db_service.pinned_connection():
+            try:
+                # Metadata first: duplicates are found before anything is downloaded.
+                # The first call also warms the models up while the request runs
+                # (worker processes warm up their own models).
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    if self._analyses_in_process():
+                        executor.submit(self.warm_up)
+                    image_metadata = self.fetcher_service.fetch_image_metadata_at_point(
+                        lat=lat, lon=lon, radius_m=radius_m, limit=limit
+                    )
+                image_metadata = self._unique_images(image_metadata)
+                if output_dir is None:
+                    output_dir = tempfile.mkdtemp(prefix="mapillary_images_")
+
+                fetch_result = {
+                    "success": True,
+                    "coordinates": {"lat": lat, "lon": lon},
+                    "radius_m": radius_m,
+                    "images_found": len(image_metadata),
+                    "images_downloaded": 0,
+                    "image_paths": [],
+                    "failed_downloads": 0,
+                    "output_dir": output_dir,
+                    "image_metadata": image_metadata,
+                }
+                if not image_metadata:
+                    return {
+                        "fetch_result": fetch_result,
+                        "processed_images": [],
+                        "database_results": [],
+                        "summary": {
+                            "total_images_fetched": 0,
+                            "total_processed": 0,
+                            "successful_database_saves": 0,
+                            "duplicates_found": 0,
+                            "processing_errors": 0,
+                        },
+                        "success": True,
+                    }
+
+                ids, locations, dates, angles = self._extract_metadata_soa(image_metadata)
+                photos = [
+                    {
+                        "source": "mapillary",
+                        "source_image_id": ids[i],
+                        "location": locations[i],
+                        "date_taken": dates[i],
+                        "compass_angle": angles[i],
+                    }
+                    for i in range(len(image_metadata))
+                ]
+                duplicates = [None] * len(photos)
+                for i, photo in enumerate(photos):
+                    known_photo_id = self._known_photo_id(photo)
+                    if known_photo_id is not None:
+                        duplicates[i] = {"id": known_photo_id}
+
+                # Only photos the filter cannot rule out need the database check
+                candidates = [
+                    i
+                    for i, photo in enumerate(photos)
+                    if duplicates[i] is None and self._may_be_duplicate(photo)
+                ]
+                found = self.db_service.check_duplicate_photos_batch(
+                    [photos[i] for i in candidates]
+                )
+                for i, duplicate in zip(candidates, found):
+                    duplicates[i] = duplicate
+                    if duplicate:
+                        self._cache_photo_id(photos[i], duplicate["id"])
+
+                # Stored results of all duplicates are loaded with one query
+                existing_results = {}
+                if fetch_existing_results:
+                    existing_results = self.db_service.get_photos_with_results(
+                        [duplicate["id"] for duplicate in duplicates if duplicate]
+                    )
+
+                results = [None] * len(photos)
+                duplicates_found = 0
+                for i, duplicate in enumerate(duplicates):
+                    if duplicate:
+                        result = self._duplicate_result(ids[i], duplicate, False)
+                        if fetch_existing_results:
+                            result["existing_results"] = existing_results.get(duplicate["id"])
+                        duplicates_found += 1
+                        results[i] = result
+
+                # Download only the new images; each one is analysed as soon as it
+                # arrives while the remaining downloads continue in the background
+                new_indexes = [i for i, duplicate in enumerate(duplicates) if not duplicate]
+                paths = {}  # metadata index -> downloaded image path
+                analysed = {}  # the same, for images that are not visual duplicates
+
+                def downloaded_paths() -> Iterator[str]:
+                    downloads = self.fetcher_service.iter_download_images(
+                        [image_metadata[i] for i in new_indexes], output_dir
+                    )
+                    for position, image_path in downloads:
+                        i = new_indexes[position]
+                        paths[i] = image_path
+                        if len(paths) % PROGRESS_LOG_INTERVAL == 0:
+                            logger.info("Downloaded %d/%d new images", len(paths), len(new_indexes))
+                        try:
+                            duplicate = self._find_visual_duplicate(photos[i], image_path)
+                        except Exception as e:
+                            # One failed lookup must not stop the coordinate's other images
+                            logger.warning(f"Visual duplicate check failed for {image_path}: {e}")
+                            duplicate = None
+                        if duplicate:
+                            self._cache_photo_id(photos[i], duplicate["id"])
+                            results[i] = self._duplicate_result(
+                                image_path, duplicate, fetch_existing_results
+                            )
+                            continue
+
+                        logger.debug("Processing image with database integration: %s", image_path)
+                        analysed[i] = image_path
+                        yield image_path
+
+                pipeline_results = self.process_stream(
+                    downloaded_paths(),
+                    max_workers=self.analysis_workers,
+                    use_threads=self.analysis_threads,
+                    road_batch_size=self.analysis_batch_size,
+                )
+                duplicates_found += sum(
+                    bool(results[i] and results[i].get("duplicate_found"))
+                    for i in paths.keys() - analysed.keys()
+                )
+                new_images = sorted(analysed.items())
+                fetch_result["image_paths"] = [paths[i] for i in sorted(paths)]
+                fetch_result["images_downloaded"] = len(paths)
+                fetch_result["failed_downloads"] = len(new_indexes) - len(paths)
+
+                for i, image_path in new_images:
+                    results[i] = {
+                        "pipeline_result": pipeline_results[image_path],
+                        "database_saved": False,
+                    }
+
+                # All new rows are written together with one INSERT per table
+                database_results = []
+                if self.save_to_db and new_images:
+                    saved = self._save_pipeline_results_bulk(
+                        [(photos[i], pipeline_results[image_path]) for i, image_path in new_images]
+                    )
+                    for (i, _), result in zip(new_images, saved):
+                        results[i] = result
+                        if result.get("database_saved"):
+                            database_results.append(result["database_ids"])
+                            self._remember_photo(photos[i])
+                            self._cache_photo_id(photos[i], result["database_ids"]["photo_id"])
+                        elif result.get("duplicate_found"):
+                            # Stored concurrently since the duplicate check
+                            duplicates_found += 1
+                            self._cache_photo_id(photos[i], result["photo_id"])
+
+                if database_results and save_filter:
+                    self._save_changed_duplicate_filter()
+
+                # Failed downloads leave no result
+                processed_images = [result for result in results if result is not None]
+
+                # Summary statistics, counted as the results were produced
+                total_processed = len(processed_images)
+                successful_saves = len(database_results)
+
+                logger.info(
+                    f"Coordinate processing complete: {successful_saves}/{total_processed} saved to database, {duplicates_found} duplicates found"
+                )
 
-            if not fetch_result["success"] or not fetch_result["image_paths"]:
                 return {
                     "fetch_result": fetch_result,
-                    "processed_images": [],
-                    "database_results": [],
+                    "processed_images": processed_images,
+                    "database_results": database_results,
                     "summary": {
-                        "total_images_fetched": 0,
-                        "total_processed": 0,
-                        "successful_database_saves": 0,
-                        "duplicates_found": 0,
-                        "processing_errors": 0,
+                        "total_images_fetched": len(image_metadata),
+                        "total_processed": total_processed,
+                        "successful_database_saves": successful_saves,
+                        "duplicates_found": duplicates_found,
+                        "processing_errors": total_processed - successful_saves - duplicates_found,
                     },
-                    "success": fetch_result["success"],
+                    "success": True,
                 }
 
-            # Process each downloaded image with database integration
-            processed_images = []
-            database_results = []
-
-            # Combine image paths with metadata
-            image_paths = fetch_result["image_paths"]
-            image_metadata_list = fetch_result["image_metadata"]
-
-            for i, image_path in enumerate(image_paths):
-                # Get corresponding metadata (if available)
-                mapillary_data = image_metadata_list[i] if i < len(image_metadata_list) else {}
-
-                result = self.process_image_with_db(
-                    image_path=image_path,
-                    source="mapillary",
-                    source_image_id=mapillary_data.get("id"),
-                    location=(
-                        mapillary_data.get("geometry", {}).get("coordinates", [None, None])[
-                            1
-                        ],  # lat
-                        mapillary_data.get("geometry", {}).get("coordinates", [None, None])[
-                            0
-                        ],  # lon
-                    )
-                    if mapillary_data.get("geometry")
-                    else None,
-                    date_taken=self._parse_mapillary_date(mapillary_data.get("captured_at")),
-                    compass_angle=self._validate_compass_angle(mapillary_data.get("compass_angle")),
-                )
+            except Exception as e:
+                logger.error(f"Error processing coordinate {lat}, {lon}: {e}")
+                return {"error": str(e), "success": False, "coordinates": (lat, lon)}
+
+    def process_coordinates_with_db(
+        self,
+        points: list[tuple[float, float]],
+        radius_m: float = 100.0,
+        limit: int = 5,
+        output_dir: str = None,
+        max_workers: int = 1,
+    ) -> dict[str, Any]:
+        """
+        Process several coordinates with database integration.
 
-                processed_images.append(result)
-                if result.get("database_saved"):
-                    database_results.append(result["database_ids"])
+        With max_workers > 1 coordinates are processed on that many threads, so
+        one point's HTTP and database waits overlap another's analysis. Model
+        inference stays serialised; combine with analysis_workers for parallel
+        analysis and db_pool_size to reuse connections between points. Each
+        point holds a connection while it runs, so with a smaller pool the
+        extra points wait for a free connection.
 
-            # Calculate summary statistics
-            total_processed = len(processed_images)
-            successful_saves = len([r for r in processed_images if r.get("database_saved")])
-            duplicates_found = len([r for r in processed_images if r.get("duplicate_found")])
+        Args:
+            points: List of (lat, lon) tuples in degrees
+            radius_m: Search radius in meters
+            limit: Maximum images to fetch per point
+            output_dir: Directory to save images
+            max_workers: Number of coordinates processed at a time
+
+        Returns:
+            Per-point results of process_coordinate_with_db (in input order) and
+            summed summary statistics
+        """
+        start_time = time.perf_counter()
 
-            logger.info(
-                f"Coordinate processing complete: {successful_saves}/{total_processed} saved to database, {duplicates_found} duplicates found"
+        def process(point: tuple[float, float]) -> dict[str, Any]:
+            lat, lon = point
+            return self.process_coordinate_with_db(
+                lat, lon, radius_m=radius_m, limit=limit, output_dir=output_dir, save_filter=False
             )
 
-            return {
-                "fetch_result": fetch_result,
-                "processed_images": processed_images,
-                "database_results": database_results,
-                "summary": {
-                    "total_images_fetched": len(fetch_result.get("image_paths", [])),
-                    "total_processed": total_processed,
-                    "successful_database_saves": successful_saves,
-                    "duplicates_found": duplicates_found,
-                    "processing_errors": total_processed - successful_saves - duplicates_found,
-                },
-                "success": True,
-            }
+        # The duplicate filter is saved every DUPLICATE_FILTER_SAVE_INTERVAL
+        # coordinates and once at the end, rather than after every coordinate
+        try:
+            if max_workers <= 1 or len(points) <= 1:
+                results = []
+                for completed, point in enumerate(points, 1):
+                    results.append(process(point))
+                    if completed % DUPLICATE_FILTER_SAVE_INTERVAL == 0:
+                        self._save_changed_duplicate_filter()
+            else:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(points))) as executor:
+                    futures = [executor.submit(process, point) for point in points]
+                    for completed, _ in enumerate(as_completed(futures), 1):
+                        if completed % PROGRESS_LOG_INTERVAL == 0:
+                            logger.info(
+                                "Processed %d/%d coordinates (%.1f per minute)",
+                                completed,
+                                len(points),
+                                completed / (time.perf_counter() - start_time) * 60,
+                            )
+                        if completed % DUPLICATE_FILTER_SAVE_INTERVAL == 0:
+                            self._save_changed_duplicate_filter()
+                    results = [future.result() for future in futures]
+        finally:
+            self._save_changed_duplicate_filter()
 
-        except Exception as e:
-            logger.error(f"Error processing coordinate {lat}, {lon}: {e}")
-            return {"error": str(e), "success": False, "coordinates": (lat, lon)}
+        summary = {
+            "points_processed": len(points),
+            "failed_points": 0,
+            "total_images_fetched": 0,
+            "total_processed": 0,
+            "successful_database_saves": 0,
+            "duplicates_found": 0,
+            "processing_errors": 0,
+        }
+        for result in results:
+            if not result.get("success"):
+                summary["failed_points"] += 1
+            for key, value in result.get("summary", {}).items():
+                summary[key] += value
+        summary["processing_time_ms"] = (time.perf_counter() - start_time) * 1000
+
+        logger.info(
+            f"Processed {len(points)} coordinates: "
+            f"{summary['successful_database_saves']} saved, "
+            f"{summary['duplicates_found']} duplicates, {summary['failed_points']} failed points"
+        )
+        return {"results": results, "summary": summary}
 
     def get_database_stats(self) -> dict[str, Any]:
         """Get database processing statistics."""
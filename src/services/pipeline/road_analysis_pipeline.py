@@ -1,12 +1,64 @@
+import dataclasses
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
 import time
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
 from typing import Optional
 
+import numpy as np
+
+from src.utils.phash import hamming_distance, phash_file
+from src.utils.readahead import readahead
+
 from ..image_fetcher import ImageFetcherService
-from ..image_quality import ImageQualityService
+from ..image_quality import (
+    ImageFailureReason,
+    ImageQualityMetrics,
+    ImageQualityService,
+)
 from ..road_quality import RoadQualityService
 from .pipeline_result import PipelineResult
 
 
+logger = logging.getLogger(__name__)
+
+# Side of the blank image run through the models by warm_up (YOLO input size)
+WARM_UP_IMAGE_SIZE = 640
+
+# Perceptual hashes this many bits apart or fewer reuse a cached result
+RESULT_CACHE_MAX_DISTANCE = 4
+
+# Pipeline of a process_batch worker process, built once by _init_worker
+_worker_pipeline: Optional["RoadAnalysisPipeline"] = None
+
+
+def _init_worker(road_model_path: Optional[str], result_cache_size: int) -> None:
+    """Load the models once per worker process."""
+    global _worker_pipeline
+    _worker_pipeline = RoadAnalysisPipeline(
+        road_model_path, enable_fetcher=False, result_cache_size=result_cache_size
+    )
+
+
+def _process_in_worker(image_path: str) -> PipelineResult:
+    """Run the worker process's pipeline on one image."""
+    return _worker_pipeline.process_image(image_path)
+
+
+def _chunked(items: Iterable[str], size: int) -> Iterator[list[str]]:
+    """Yield lists of up to size items as the iterable produces them."""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
 class RoadAnalysisPipeline:
     """
     Complete pipeline for road quality analysis with quality gating
@@ -19,30 +71,121 @@ class RoadAnalysisPipeline:
     5. Return combined results
     """
 
-    def __init__(self, road_model_path: Optional[str] = None, enable_fetcher: bool = True):
+    def __init__(
+        self,
+        road_model_path: Optional[str] = None,
+        enable_fetcher: bool = True,
+        result_cache_size: int = 0,
+    ):
         """
         Initialize pipeline services
 
         Args:
             road_model_path: Optional path to custom road quality model
             enable_fetcher: Whether to initialize image fetcher service
+            result_cache_size: Number of results remembered by perceptual hash so
+                near-identical images skip both models (0 disables the cache)
         """
+        self.road_model_path = road_model_path
         self.quality_service = ImageQualityService()
         self.road_service = RoadQualityService(road_model_path)
         self.fetcher_service = ImageFetcherService() if enable_fetcher else None
         self.version = "1.1.0"
+        self._warmed_up = False
+        self._warm_up_lock = threading.Lock()
+        self.result_cache_size = result_cache_size
+        self._result_cache: OrderedDict[int, PipelineResult] = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        """
+        Run a blank image through both models once
+
+        The first inference of a loaded model pays one-off setup costs
+        (predictor construction, memory allocation). Calling this while waiting
+        on I/O keeps them out of the first image's processing time. Runs once;
+        concurrent callers wait for the first warm-up instead of repeating it.
+        """
+        with self._warm_up_lock:
+            if self._warmed_up:
+                return
+
+            blank = np.zeros((WARM_UP_IMAGE_SIZE, WARM_UP_IMAGE_SIZE, 3), dtype=np.uint8)
+            try:
+                # Both calls take their model's inference lock
+                self.quality_service.segmentation.detect_road_surface(blank)
+                self.road_service.warm_up(blank)
+            except Exception:
+                # Not fatal, but a broken model should show up now, not on the first image
+                logger.warning("Model warm-up failed", exc_info=True)
+            self._warmed_up = True
 
     def process_image(self, image_path: str) -> PipelineResult:
         """
         Process single image through complete pipeline
 
+        With the result cache enabled, an image whose perceptual hash is close
+        to a recently analysed one reuses that image's metrics.
+
         Args:
             image_path: Path to image file
 
         Returns:
             PipelineResult with quality and road analysis
         """
-        start_time = time.time()
+        if not self.result_cache_size:
+            return self._analyse_image(image_path)
+
+        start_time = time.perf_counter()
+        image_hash = phash_file(image_path)
+        if image_hash is None:
+            return self._analyse_image(image_path)
+
+        cached = self._cached_result(image_hash)
+        if cached is not None:
+            processing_time = (time.perf_counter() - start_time) * 1000
+            return self._reuse_result(image_path, cached, processing_time)
+
+        result = self._analyse_image(image_path)
+        if ImageFailureReason.PROCESSING_ERROR not in result.quality_metrics.failure_reasons:
+            # Errors may be transient, so only real assessments are reused
+            self._cache_result(image_hash, result)
+        return result
+
+    def _cached_result(self, image_hash: int) -> Optional[PipelineResult]:
+        """Find the cached result of a visually near-identical image."""
+        with self._result_cache_lock:
+            for cached_hash, result in self._result_cache.items():
+                if hamming_distance(cached_hash, image_hash) <= RESULT_CACHE_MAX_DISTANCE:
+                    self._result_cache.move_to_end(cached_hash)
+                    return result
+        return None
+
+    def _cache_result(self, image_hash: int, result: PipelineResult) -> None:
+        """Remember a result, evicting the least recently used beyond the cache size."""
+        with self._result_cache_lock:
+            self._result_cache[image_hash] = result
+            self._result_cache.move_to_end(image_hash)
+            while len(self._result_cache) > self.result_cache_size:
+                self._result_cache.popitem(last=False)
+
+    @staticmethod
+    def _reuse_result(
+        image_path: str, cached: PipelineResult, processing_time: float
+    ) -> PipelineResult:
+        """Create this image's result from the metrics of an (almost) identical image."""
+        quality_metrics = dataclasses.replace(cached.quality_metrics, image_path=image_path)
+        if cached.road_metrics is None:
+            return PipelineResult.create_quality_failed(
+                image_path, quality_metrics, processing_time
+            )
+        return PipelineResult.create_success(
+            image_path, quality_metrics, cached.road_metrics, processing_time
+        )
+
+    def _analyse_image(self, image_path: str) -> PipelineResult:
+        """Run the quality check and, for usable images, road analysis."""
+        start_time = time.perf_counter()
 
         try:
             # Stage 1: Image Quality Assessment (always performed)
@@ -51,7 +194,7 @@ class RoadAnalysisPipeline:
             # Stage 2: Quality Gate
             if not quality_metrics.is_usable:
                 # Image failed quality check - early termination
-                processing_time = (time.time() - start_time) * 1000
+                processing_time = (time.perf_counter() - start_time) * 1000
                 return PipelineResult.create_quality_failed(
                     image_path, quality_metrics, processing_time
                 )
@@ -61,46 +204,248 @@ class RoadAnalysisPipeline:
 
             if road_metrics is None:
                 # Road analysis failed - treat as quality failure
-                from ..image_quality import ImageFailureReason, ImageQualityMetrics
-
-                failed_quality = ImageQualityMetrics.create_failed(
-                    image_path, ImageFailureReason.PROCESSING_ERROR
-                )
-                processing_time = (time.time() - start_time) * 1000
-                return PipelineResult.create_quality_failed(
-                    image_path, failed_quality, processing_time
-                )
+                return self._processing_error_result(image_path, start_time)
 
             # Success: Both quality and road analysis completed
-            processing_time = (time.time() - start_time) * 1000
+            processing_time = (time.perf_counter() - start_time) * 1000
             return PipelineResult.create_success(
                 image_path, quality_metrics, road_metrics, processing_time
             )
 
         except Exception:
             # Pipeline error - return failure result
-            from ..image_quality import ImageFailureReason, ImageQualityMetrics
+            return self._processing_error_result(image_path, start_time)
 
-            failed_quality = ImageQualityMetrics.create_failed(
-                image_path, ImageFailureReason.PROCESSING_ERROR
-            )
-            processing_time = (time.time() - start_time) * 1000
-            return PipelineResult.create_quality_failed(image_path, failed_quality, processing_time)
+    @staticmethod
+    def _processing_error_result(image_path: str, start_time: float) -> PipelineResult:
+        """Create the failed result of an image whose analysis raised or returned nothing."""
+        failed_quality = ImageQualityMetrics.create_failed(
+            image_path, ImageFailureReason.PROCESSING_ERROR
+        )
+        processing_time = (time.perf_counter() - start_time) * 1000
+        return PipelineResult.create_quality_failed(image_path, failed_quality, processing_time)
 
-    def process_batch(self, image_paths: list[str]) -> dict[str, PipelineResult]:
+    def process_batch(
+        self,
+        image_paths: list[str],
+        max_workers: int = 1,
+        use_threads: bool = False,
+        road_batch_size: int = 1,
+    ) -> dict[str, PipelineResult]:
         """
         Process multiple images through pipeline
 
+        With max_workers > 1 the images are spread over worker processes, each
+        loading its own copy of the models once, so memory grows per worker.
+        With use_threads the workers are threads sharing this pipeline's models:
+        decoding and quality heuristics run in parallel while model inference
+        is serialised. With road_batch_size > 1 the pipeline is split into two
+        stages instead: max_workers threads run the quality checks on chunks of
+        road_batch_size images, segmenting each chunk with one model call, and
+        feed usable images to one road analysis thread, which assesses them in
+        batches of up to road_batch_size with a single model call. Byte-identical
+        files are analysed once and share the result. Serial batches prefetch
+        the next few image files while the current one is analysed.
+
         Args:
             image_paths: List of image file paths
+            max_workers: Number of workers (1 processes in this thread)
+            use_threads: Use worker threads instead of worker processes
+            road_batch_size: Images per road model call (1 analyses each image alone)
 
         Returns:
             Dictionary mapping image paths to pipeline results
         """
-        results = {}
+        # The same photo may be fetched for overlapping areas; analyse it once
+        representatives = self._content_representatives(image_paths)
+        unique_paths = list(dict.fromkeys(representatives.values()))
+
+        max_workers = min(max_workers, len(unique_paths))
+        if max_workers <= 1 and road_batch_size <= 1:
+            # Serial reads would stall on disk; have the next files read meanwhile
+            unique_paths = readahead(unique_paths)
+
+        results = self.process_stream(
+            unique_paths,
+            max_workers,
+            use_threads=use_threads,
+            road_batch_size=road_batch_size,
+        )
+        return {
+            image_path: results[image_path]
+            if representative == image_path
+            else self._reuse_result(image_path, results[representative], 0.0)
+            for image_path, representative in representatives.items()
+        }
+
+    @staticmethod
+    def _content_representatives(image_paths: list[str]) -> dict[str, str]:
+        """
+        Map each path to the first path with byte-identical content
+
+        Only files sharing a size are read and hashed, so batches without
+        duplicates cost one stat per file.
+        """
+        paths_by_size = defaultdict(list)
+        representatives = {}
         for image_path in image_paths:
-            results[image_path] = self.process_image(image_path)
-        return results
+            representatives[image_path] = image_path
+            try:
+                paths_by_size[os.path.getsize(image_path)].append(image_path)
+            except OSError:
+                continue
+
+        for same_size in paths_by_size.values():
+            if len(same_size) < 2:
+                continue
+            first_by_digest = {}
+            for image_path in same_size:
+                try:
+                    with open(image_path, "rb") as f:
+                        digest = hashlib.blake2b(f.read(), digest_size=16).digest()
+                except OSError:
+                    continue
+                representatives[image_path] = first_by_digest.setdefault(digest, image_path)
+
+        return representatives
+
+    def process_stream(
+        self,
+        image_paths: Iterable[str],
+        max_workers: int = 1,
+        use_threads: bool = False,
+        road_batch_size: int = 1,
+    ) -> dict[str, PipelineResult]:
+        """
+        Process images as they become available (e.g. while still downloading)
+
+        Each path is processed (or handed to a worker) as soon as the iterable
+        yields it, so producing the next path overlaps with analysis.
+
+        Args:
+            image_paths: Iterable of image file paths
+            max_workers: Number of workers (1 processes in this thread)
+            use_threads: Use worker threads instead of worker processes
+            road_batch_size: Images per road model call (see process_batch)
+
+        Returns:
+            Dictionary mapping image paths to pipeline results
+        """
+        if road_batch_size > 1:
+            return self._process_two_stage(image_paths, max(max_workers, 1), road_batch_size)
+
+        if max_workers <= 1:
+            return {image_path: self.process_image(image_path) for image_path in image_paths}
+
+        with self._analysis_executor(max_workers, use_threads) as executor:
+            process = self.process_image if use_threads else _process_in_worker
+            futures = {
+                image_path: executor.submit(process, image_path) for image_path in image_paths
+            }
+            return {image_path: future.result() for image_path, future in futures.items()}
+
+    def _process_two_stage(
+        self, image_paths: Iterable[str], quality_workers: int, road_batch_size: int
+    ) -> dict[str, PipelineResult]:
+        """
+        Overlap the CPU quality stage with batched road model inference
+
+        Quality threads each check a chunk of road_batch_size images, running
+        segmentation once for the chunk's heuristic survivors, and push usable
+        images into a bounded queue that one road analysis thread drains in
+        batches; a None sentinel ends the stage.
+        """
+        usable = queue.Queue(maxsize=road_batch_size * 2)
+        results: dict[str, PipelineResult] = {}
+        road_stage = threading.Thread(
+            target=self._road_stage, args=(usable, results, road_batch_size), daemon=True
+        )
+        road_stage.start()
+
+        try:
+            with ThreadPoolExecutor(max_workers=quality_workers) as executor:
+                futures = [
+                    executor.submit(self._quality_stage, chunk, usable, results)
+                    for chunk in _chunked(image_paths, road_batch_size)
+                ]
+        finally:
+            usable.put(None)
+            road_stage.join()
+
+        ordered_paths = [image_path for future in futures for image_path in future.result()]
+        return {image_path: results[image_path] for image_path in ordered_paths}
+
+    def _quality_stage(
+        self, image_paths: list[str], usable: queue.Queue, results: dict[str, PipelineResult]
+    ) -> list[str]:
+        """Quality-check a chunk of images, queueing the usable ones for road analysis."""
+        start_time = time.perf_counter()
+        try:
+            # The chunk already runs on a worker thread, so its heuristics run serially
+            chunk_metrics = self.quality_service.evaluate_batch(image_paths, max_workers=1)
+        except Exception:
+            for image_path in image_paths:
+                results[image_path] = self._processing_error_result(image_path, start_time)
+            return image_paths
+
+        for image_path, quality_metrics in zip(image_paths, chunk_metrics):
+            if quality_metrics.is_usable:
+                usable.put((image_path, quality_metrics, start_time))
+            else:
+                processing_time = (time.perf_counter() - start_time) * 1000
+                results[image_path] = PipelineResult.create_quality_failed(
+                    image_path, quality_metrics, processing_time
+                )
+        return image_paths
+
+    def _road_stage(
+        self, usable: queue.Queue, results: dict[str, PipelineResult], batch_size: int
+    ) -> None:
+        """Drain usable images and assess them in batches until the sentinel arrives."""
+        batch = []
+        while True:
+            item = usable.get()
+            if item is not None:
+                batch.append(item)
+            # Don't hold a partial batch while the quality stage has nothing ready
+            if batch and (item is None or len(batch) >= batch_size or usable.empty()):
+                self._assess_road_batch(batch, results)
+                batch = []
+            if item is None:
+                return
+
+    def _assess_road_batch(
+        self, batch: list[tuple[str, ImageQualityMetrics, float]], results: dict
+    ) -> None:
+        """Run one road model call for a batch of quality-checked images."""
+        try:
+            road_metrics = self.road_service.assess_road_quality_batch(
+                [image_path for image_path, _, _ in batch]
+            )
+        except Exception:
+            road_metrics = [None] * len(batch)
+
+        for (image_path, quality_metrics, start_time), metrics in zip(batch, road_metrics):
+            if metrics is None:
+                results[image_path] = self._processing_error_result(image_path, start_time)
+            else:
+                processing_time = (time.perf_counter() - start_time) * 1000
+                results[image_path] = PipelineResult.create_success(
+                    image_path, quality_metrics, metrics, processing_time
+                )
+
+    def _analysis_executor(self, max_workers: int, use_threads: bool) -> Executor:
+        """Create the worker pool used by process_stream."""
+        if use_threads:
+            return ThreadPoolExecutor(max_workers=max_workers)
+
+        # spawn: forking a process that has loaded torch/CUDA is unsafe
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.road_model_path, self.result_cache_size),
+        )
 
     def process_coordinate(
         self,
@@ -145,52 +490,60 @@ class RoadAnalysisPipeline:
         Returns:
             Statistics summary
         """
-        total_images = len(results)
-        successful = sum(1 for r in results.values() if r.processed_successfully)
-        failed_quality = sum(1 for r in results.values() if not r.processed_successfully)
-
-        # Average processing times
-        all_times = [r.processing_time_ms for r in results.values()]
-        successful_times = [
-            r.processing_time_ms for r in results.values() if r.processed_successfully
-        ]
-        failed_times = [
-            r.processing_time_ms for r in results.values() if not r.processed_successfully
-        ]
-
-        # Quality scores for successful images
-        quality_scores = [
-            r.quality_metrics.overall_score for r in results.values() if r.processed_successfully
-        ]
-
-        # Road scores for successful images
-        road_scores = [
-            r.road_metrics.overall_quality_score
-            for r in results.values()
-            if r.processed_successfully and r.road_metrics
-        ]
+        successful = failed_quality = 0
+        successful_time = failed_time = 0.0
+        quality_total = 0.0
+        quality_min = quality_max = None
+        road_count = 0
+        road_total = 0.0
+        road_min = road_max = None
+
+        # One pass accumulating counts, sums and extremes
+        for r in results.values():
+            if not r.processed_successfully:
+                failed_quality += 1
+                failed_time += r.processing_time_ms
+                continue
+
+            successful += 1
+            successful_time += r.processing_time_ms
+
+            # Quality scores for successful images
+            score = r.quality_metrics.overall_score
+            quality_total += score
+            quality_min = score if quality_min is None else min(quality_min, score)
+            quality_max = score if quality_max is None else max(quality_max, score)
+
+            # Road scores for successful images
+            if r.road_metrics:
+                score = r.road_metrics.overall_quality_score
+                road_count += 1
+                road_total += score
+                road_min = score if road_min is None else min(road_min, score)
+                road_max = score if road_max is None else max(road_max, score)
 
+        total_images = len(results)
         return {
             "total_images": total_images,
             "successful_analyses": successful,
             "failed_quality_check": failed_quality,
             "success_rate": (successful / total_images * 100) if total_images > 0 else 0,
             "processing_times": {
-                "average_total_ms": sum(all_times) / len(all_times) if all_times else 0,
-                "average_successful_ms": sum(successful_times) / len(successful_times)
-                if successful_times
+                "average_total_ms": (successful_time + failed_time) / total_images
+                if total_images
                 else 0,
-                "average_failed_ms": sum(failed_times) / len(failed_times) if failed_times else 0,
+                "average_successful_ms": successful_time / successful if successful else 0,
+                "average_failed_ms": failed_time / failed_quality if failed_quality else 0,
             },
             "quality_scores": {
-                "average": sum(quality_scores) / len(quality_scores) if quality_scores else 0,
-                "min": min(quality_scores) if quality_scores else 0,
-                "max": max(quality_scores) if quality_scores else 0,
+                "average": quality_total / successful if successful else 0,
+                "min": quality_min if successful else 0,
+                "max": quality_max if successful else 0,
             },
             "road_scores": {
-                "average": sum(road_scores) / len(road_scores) if road_scores else 0,
-                "min": min(road_scores) if road_scores else 0,
-                "max": max(road_scores) if road_scores else 0,
+                "average": road_total / road_count if road_count else 0,
+                "min": road_min if road_count else 0,
+                "max": road_max if road_count else 0,
             },
         }
 
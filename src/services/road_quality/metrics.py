@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any
+from typing import Any, Optional
 
 import numpy as np
 
@@ -20,6 +20,7 @@ class RoadQualityMetrics:
     timestamp: str  # ISO format timestamp of assessment
     model_name: str  # Name/version of model used
     model_version: str  # Version of the model
+    surface_type: Optional[str] = None  # road_surface_type enum value, if classified
 
     def to_dict(self) -> dict[str, Any]:
         def convert_numpy(val):
@@ -19,6 +19,10 @@ class RoadQualityModel:
         """Generate road quality predictions from preprocessed image batch"""
         raise NotImplementedError("Subclasses must implement predict")
 
+    def predict_batch(self, images: list[np.ndarray]) -> list[dict[str, Any]]:
+        """Generate predictions for several preprocessed images, in input order"""
+        return [self.predict(image) for image in images]
+
     def get_model_info(self) -> dict[str, Any]:
         """Get information about the loaded model"""
         raise NotImplementedError("Subclasses must implement get_model_info")
@@ -1,6 +1,9 @@
+import threading
 from pathlib import Path
 from typing import Any, Optional
 
+import numpy as np
+
 from .metrics import RoadQualityMetrics
 from .model_factory import ModelFactory
 from .preprocessor import ImagePreprocessor
@@ -12,6 +15,8 @@ class RoadQualityService:
     def __init__(self, model_path: Optional[str] = None):
         self.model = ModelFactory.create_model(model_path)
         self.preprocessor = ImagePreprocessor()
+        # YOLO predictors are not thread-safe; serialise inference
+        self._model_lock = threading.Lock()
         self._initialize()
 
     def _initialize(self):
@@ -41,7 +46,8 @@ class RoadQualityService:
                 return None
 
             # Run model inference
-            predictions = self.model.predict(processed_image)
+            with self._model_lock:
+                predictions = self.model.predict(processed_image)
 
             # Convert to structured metrics
             model_info = self.model.get_model_info()
@@ -50,6 +56,43 @@ class RoadQualityService:
         except Exception as e:
             raise RuntimeError(f"Error assessing road quality for {image_path}: {e}") from e
 
+    def assess_road_quality_batch(
+        self, image_paths: list[str]
+    ) -> list[Optional[RoadQualityMetrics]]:
+        """
+        Assess road quality for several images with one model call
+
+        Args:
+            image_paths: Paths to the input images
+
+        Returns:
+            Assessment results in input order, None for images that could not be loaded
+        """
+        try:
+            processed_images = [
+                self.preprocessor.load_and_preprocess(image_path) for image_path in image_paths
+            ]
+            loaded = [image for image in processed_images if image is not None]
+
+            with self._model_lock:
+                predictions = iter(self.model.predict_batch(loaded))
+
+            model_info = self.model.get_model_info()
+            return [
+                None
+                if image is None
+                else RoadQualityMetrics.from_model_output(next(predictions), model_info)
+                for image in processed_images
+            ]
+
+        except Exception as e:
+            raise RuntimeError(f"Error assessing road quality batch: {e}") from e
+
+    def warm_up(self, image: np.ndarray) -> None:
+        """Run one inference so the model's one-off setup is paid before real images."""
+        with self._model_lock:
+            self.model.predict(image)
+
     def batch_assess(self, image_paths: list[str]) -> dict[str, Optional[RoadQualityMetrics]]:
         """
         Assess road quality for multiple images
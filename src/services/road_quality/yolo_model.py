@@ -46,18 +46,32 @@ class YOLOv8RoadModel(RoadQualityModel):
         if not self.is_loaded:
             raise RuntimeError("Model not loaded")
 
+        # Run detection
+        results = self.model(self._to_model_image(image_batch))
+
+        # Parse results
+        return self._parse_yolo_results(results[0])
+
+    def predict_batch(self, images: list[np.ndarray]) -> list[dict[str, Any]]:
+        """Run inference on several images in a single forward pass"""
+        if not self.is_loaded:
+            raise RuntimeError("Model not loaded")
+        if not images:
+            return []
+
+        results = self.model([self._to_model_image(image) for image in images])
+        return [self._parse_yolo_results(result) for result in results]
+
+    @staticmethod
+    def _to_model_image(image_batch: np.ndarray) -> np.ndarray:
+        """Convert a preprocessed image (batch) into the single uint8 image YOLO expects"""
         # YOLOv8 expects single images, not batches
         image = image_batch[0] if len(image_batch.shape) == 4 else image_batch
 
         # Convert from normalized [0,1] back to [0,255]
         if image.max() <= 1.0:
             image = (image * 255).astype(np.uint8)
-
-        # Run detection
-        results = self.model(image)
-
-        # Parse results
-        return self._parse_yolo_results(results[0])
+        return image
 
     def _parse_yolo_results(self, result) -> dict[str, Any]:
         """Convert YOLO results to our metrics format"""
@@ -0,0 +1,121 @@
+import hashlib
+import math
+import struct
+
+
+# Serialized layer header: capacity, count, num_hashes, num_bytes
+_LAYER_HEADER = struct.Struct("<QQIQ")
+_MAGIC = b"BLM1"
+
+
+class BloomFilter:
+    """
+    Scalable Bloom filter for string keys.
+
+    Membership tests never give false negatives; false positives stay below
+    roughly `error_rate`. When a layer fills up a new one with twice the
+    capacity (and half the error rate) is added, so the filter can grow
+    without knowing the final number of keys.
+    """
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.01):
+        """
+        Initialize an empty filter.
+
+        Args:
+            capacity: Number of keys the first layer holds at error_rate
+            error_rate: Target false positive rate
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Each layer: [capacity, count, num_hashes, bits]
+        self._layers: list[list] = []
+        self._add_layer()
+
+    def _add_layer(self) -> None:
+        """Append a layer sized for twice the previous capacity."""
+        index = len(self._layers)
+        capacity = self.capacity * 2**index
+        # Tighten each layer so the compounded error rate stays bounded
+        error_rate = self.error_rate * 0.5 ** (index + 1)
+        num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        self._layers.append([capacity, 0, num_hashes, bytearray((num_bits + 7) // 8)])
+
+    @staticmethod
+    def _positions(key: str, num_hashes: int, num_bits: int) -> list[int]:
+        """Bit positions of a key using double hashing."""
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return [(h1 + i * h2) % num_bits for i in range(num_hashes)]
+
+    def add(self, key: str) -> None:
+        """Add a key to the filter."""
+        if key in self:
+            return
+
+        layer = self._layers[-1]
+        if layer[1] >= layer[0]:
+            self._add_layer()
+            layer = self._layers[-1]
+
+        _, _, num_hashes, bits = layer
+        for position in self._positions(key, num_hashes, len(bits) * 8):
+            bits[position >> 3] |= 1 << (position & 7)
+        layer[1] += 1
+
+    def __contains__(self, key: str) -> bool:
+        """Check whether a key may have been added."""
+        for _, _, num_hashes, bits in self._layers:
+            if all(
+                bits[position >> 3] & (1 << (position & 7))
+                for position in self._positions(key, num_hashes, len(bits) * 8)
+            ):
+                return True
+        return False
+
+    def __len__(self) -> int:
+        """Number of keys added (keys that already tested present are not counted)."""
+        return sum(layer[1] for layer in self._layers)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the filter."""
+        parts = [_MAGIC, struct.pack("<QdI", self.capacity, self.error_rate, len(self._layers))]
+        for capacity, count, num_hashes, bits in self._layers:
+            parts.append(_LAYER_HEADER.pack(capacity, count, num_hashes, len(bits)))
+            parts.append(bytes(bits))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        """
+        Restore a filter serialized with to_bytes.
+
+        Raises:
+            ValueError: If the data is not a serialized filter
+        """
+        if data[:4] != _MAGIC:
+            raise ValueError("Not a serialized Bloom filter")
+
+        try:
+            capacity, error_rate, num_layers = struct.unpack_from("<QdI", data, 4)
+            offset = 4 + struct.calcsize("<QdI")
+
+            bloom = cls(capacity, error_rate)
+            bloom._layers = []
+            for _ in range(num_layers):
+                layer_capacity, count, num_hashes, num_bytes = _LAYER_HEADER.unpack_from(
+                    data, offset
+                )
+                offset += _LAYER_HEADER.size
+                bits = bytearray(data[offset : offset + num_bytes])
+                if len(bits) != num_bytes:
+                    raise ValueError("Truncated Bloom filter data")
+                offset += num_bytes
+                bloom._layers.append([layer_capacity, count, num_hashes, bits])
+        except struct.error as e:
+            raise ValueError(f"Truncated Bloom filter data: {e}") from e
+
+        if not bloom._layers:
+            raise ValueError("Bloom filter has no layers")
+        return bloom
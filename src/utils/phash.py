@@ -0,0 +1,51 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+# DCT input size and the low-frequency block kept for the hash (8x8 = 64 bits)
+_DCT_SIZE = 32
+_HASH_SIZE = 8
+
+
+def phash_image(gray: np.ndarray) -> int:
+    """
+    Compute the 64-bit perceptual hash of a grayscale image.
+
+    The low frequencies of the image's DCT are compared with their median, so
+    re-encoding, rescaling and small exposure changes flip only a few bits.
+
+    Args:
+        gray: Grayscale image array
+
+    Returns:
+        Unsigned 64-bit hash
+    """
+    small = cv2.resize(gray, (_DCT_SIZE, _DCT_SIZE), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:_HASH_SIZE, :_HASH_SIZE].flatten()
+    # The DC term (overall brightness) would skew the median
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def phash_file(image_path: str) -> Optional[int]:
+    """
+    Compute the perceptual hash of an image file.
+
+    Args:
+        image_path: Path to the image
+
+    Returns:
+        Unsigned 64-bit hash, or None if the image cannot be read
+    """
+    # The hash only needs 32x32 pixels, so let the decoder downscale
+    gray = cv2.imread(image_path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        return None
+    return phash_image(gray)
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(hash_a ^ hash_b).count("1")
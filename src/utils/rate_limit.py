@@ -0,0 +1,43 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting calls to `calls` per `period` seconds.
+
+    Bursts up to `calls` are allowed; after that, acquire() blocks until
+    enough time has passed to refill a token.
+    """
+
+    def __init__(self, calls: int, period: float):
+        """
+        Initialize the token bucket.
+
+        Args:
+            calls: Maximum number of calls per period
+            period: Period length in seconds
+        """
+        self.capacity = float(calls)
+        self.refill_rate = calls / period
+        self._tokens = float(calls)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.refill_rate
+                )
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait_s = (1 - self._tokens) / self.refill_rate
+
+            time.sleep(wait_s)
@@ -0,0 +1,56 @@
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+
+
+# Files hinted ahead of the one being consumed
+DEFAULT_READAHEAD_WINDOW = 4
+
+
+def prefetch_file(path: str) -> None:
+    """
+    Ask the OS to start reading a file into the page cache.
+
+    The kernel reads the file in the background, so this returns immediately.
+    A no-op where posix_fadvise is unavailable or the file cannot be opened.
+
+    Args:
+        path: File to prefetch
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def readahead(paths: Iterable[str], window: int = DEFAULT_READAHEAD_WINDOW) -> Iterator[str]:
+    """
+    Yield paths while prefetching the next `window` files.
+
+    Each file is hinted to the OS `window` paths before it is yielded, so its
+    bytes are being read while the consumer works on earlier files. The input
+    is pulled `window` items ahead, so only use it with iterables whose items
+    are already available (e.g. lists), not with slow generators.
+
+    Args:
+        paths: File paths in the order they will be consumed
+        window: Number of files to keep prefetched ahead of the consumer
+
+    Yields:
+        The input paths, unchanged and in order
+    """
+    pending = deque()
+    for path in paths:
+        prefetch_file(path)
+        pending.append(path)
+        if len(pending) > window:
+            yield pending.popleft()
+    yield from pending
@@ -0,0 +1,62 @@
+"""
+Unit tests for the Bloom filter used to skip database duplicate checks.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.bloom_filter import BloomFilter
+
+
+class TestBloomFilter(unittest.TestCase):
+    """Test membership, growth and serialization."""
+
+    def test_no_false_negatives_across_layers(self):
+        """Every added key should be found, also after the filter grows."""
+        bloom = BloomFilter(capacity=100, error_rate=0.01)
+        keys = [f"id:mapillary:{i}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+
+        self.assertGreater(len(bloom), 980)
+        self.assertGreater(len(bloom._layers), 1)
+        self.assertTrue(all(key in bloom for key in keys))
+
+    def test_false_positive_rate(self):
+        """Unseen keys should rarely be reported as members."""
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        for i in range(2000):
+            bloom.add(f"seen:{i}")
+
+        false_positives = sum(f"unseen:{i}" in bloom for i in range(10000))
+
+        self.assertLess(false_positives, 200)
+
+    def test_round_trip(self):
+        """A restored filter should answer like the original."""
+        bloom = BloomFilter(capacity=10)
+        for i in range(50):
+            bloom.add(str(i))
+
+        restored = BloomFilter.from_bytes(bloom.to_bytes())
+
+        self.assertEqual(len(restored), len(bloom))
+        self.assertTrue(all(str(i) in restored for i in range(50)))
+        self.assertEqual(restored.to_bytes(), bloom.to_bytes())
+
+    def test_invalid_data(self):
+        """Corrupt or truncated data should raise ValueError."""
+        data = BloomFilter().to_bytes()
+
+        with self.assertRaises(ValueError):
+            BloomFilter.from_bytes(b"nope")
+        with self.assertRaises(ValueError):
+            BloomFilter.from_bytes(data[:-10])
+
+
+if __name__ == "__main__":
+    unittest.main()
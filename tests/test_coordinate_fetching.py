@@ -5,12 +5,16 @@ Tests the integration of MapillaryClient, ImageFetcherService, and
 RoadAnalysisPipeline for fetching and analyzing images from coordinates.
 """
 
+import io
 import os
 import sys
 import tempfile
 import unittest
 from pathlib import Path
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
+
+import requests
+import urllib3
 
 
 sys.path.append(str(Path(__file__).parent.parent))
@@ -19,6 +23,7 @@ from src.services.image_fetcher import ImageFetcherService
 from src.services.mapillary_client import MapillaryClient
 from src.services.pipeline.road_analysis_pipeline import RoadAnalysisPipeline
 from src.utils.coord_utils import bbox_from_point
+from src.utils.rate_limit import TokenBucket
 
 
 class TestCoordinateFetching(unittest.TestCase):
@@ -61,6 +66,29 @@ class TestCoordinateFetching(unittest.TestCase):
         self.assertAlmostEqual(center_lon, self.test_lon, places=5)
 
 
+class TestTokenBucket(unittest.TestCase):
+    """Test the token bucket rate limiter."""
+
+    @patch("src.utils.rate_limit.time.sleep")
+    def test_blocks_once_burst_is_spent(self, mock_sleep):
+        """Test calls beyond the burst capacity wait for a refill."""
+        bucket = TokenBucket(calls=2, period=1000)
+
+        bucket.acquire()
+        bucket.acquire()
+        mock_sleep.assert_not_called()
+
+        # Refill the bucket as if time had passed while sleeping
+        def refill(seconds):
+            bucket._updated -= seconds
+
+        mock_sleep.side_effect = refill
+        bucket.acquire()
+
+        mock_sleep.assert_called_once()
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], 500, delta=1)
+
+
 class TestMapillaryClientMocked(unittest.TestCase):
     """Test MapillaryClient with mocked API responses."""
 
@@ -94,7 +122,7 @@ class TestMapillaryClientMocked(unittest.TestCase):
             shutil.rmtree(self.temp_dir)
 
     @patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"})
-    @patch("src.services.mapillary_client.requests.get")
+    @patch("src.services.mapillary_client.http_session.get")
     def test_fetch_images_success(self, mock_get):
         """Test successful image metadata fetching."""
         # Mock API response
@@ -118,13 +146,48 @@ class TestMapillaryClientMocked(unittest.TestCase):
         self.assertEqual(call_args[1]["params"]["limit"], 2)
 
     @patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"})
-    @patch("src.services.mapillary_client.requests.get")
+    @patch("src.services.mapillary_client.http_session.get")
+    def test_fetch_images_uses_disk_cache(self, mock_get):
+        """Test repeated metadata queries are served from the cache directory."""
+        mock_response = Mock()
+        mock_response.raise_for_status.return_value = None
+        mock_response.json.return_value = {"data": self.mock_image_data}
+        mock_get.return_value = mock_response
+
+        client = MapillaryClient(cache_dir=self.temp_dir)
+        bbox = bbox_from_point(51.5007, -0.1246, 100)
+        first = client.fetch_images(bbox, limit=2)
+        second = client.fetch_images(bbox, limit=2)
+
+        self.assertEqual(first, second)
+        mock_get.assert_called_once()
+        self.assertEqual(list(Path(self.temp_dir).glob("*.tmp")), [])
+
+        # A different query is a cache miss
+        client.fetch_images(bbox, limit=3)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"})
+    @patch("src.services.mapillary_client.http_session.get")
+    def test_download_image_skips_existing_file(self, mock_get):
+        """Test images already on disk are not downloaded again."""
+        existing = Path(self.temp_dir) / "test_image_1.jpg"
+        existing.write_bytes(b"cached")
+
+        client = MapillaryClient()
+        file_path = client.download_image(self.mock_image_data[0], self.temp_dir)
+
+        self.assertEqual(file_path, str(existing))
+        mock_get.assert_not_called()
+
+    @patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"})
+    @patch("src.services.mapillary_client.http_session.get")
     def test_download_image_success(self, mock_get):
         """Test successful single image download."""
         # Mock image download response
-        mock_response = Mock()
+        mock_response = MagicMock()
         mock_response.raise_for_status.return_value = None
-        mock_response.iter_content.return_value = [b"fake_image_data"]
+        mock_response.raw = io.BytesIO(b"fake_image_data")
         mock_get.return_value = mock_response
 
         client = MapillaryClient()
@@ -141,6 +204,108 @@ class TestMapillaryClientMocked(unittest.TestCase):
             content = f.read()
         self.assertEqual(content, b"fake_image_data")
 
+    @patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"})
+    @patch("src.services.mapillary_client.http_session.get")
+    def test_download_image_interrupted(self, mock_get):
+        """Test a dropped connection mid-stream raises and leaves no image file."""
+        mock_response = MagicMock()
+        mock_response.raise_for_status.return_value = None
+        mock_response.raw.readinto.side_effect = urllib3.exceptions.ProtocolError("reset")
+        mock_get.return_value = mock_response
+
+        client = MapillaryClient()
+
+        with self.assertRaises(requests.ConnectionError):
+            client.download_image(self.mock_image_data[0], self.temp_dir)
+        self.assertFalse((Path(self.temp_dir) / "test_image_1.jpg").exists())
+        self.assertEqual(list(Path(self.temp_dir).glob("*.part")), [])
+        mock_response.__exit__.assert_called_once()
+
+    @patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"})
+    @patch("src.services.mapillary_client.http_session.get")
+    def test_download_image_write_failure(self, mock_get):
+        """Test a local write error is reported like a failed download."""
+        mock_response = MagicMock()
+        mock_response.raise_for_status.return_value = None
+        mock_response.raw = io.BytesIO(b"fake_image_data")
+        mock_get.return_value = mock_response
+
+        client = MapillaryClient()
+
+        disk_full = patch.object(
+            Path, "replace", side_effect=OSError(28, "No space left on device")
+        )
+        with disk_full, self.assertRaises(requests.ConnectionError):
+            client.download_image(self.mock_image_data[0], self.temp_dir)
+        self.assertEqual(list(Path(self.temp_dir).iterdir()), [])
+
+    @patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"})
+    @patch("src.services.mapillary_client.http_session.get")
+    def test_download_image_finished_by_another_thread(self, mock_get):
+        """Test an image saved by a concurrent download of the same id is reused."""
+        mock_response = MagicMock()
+        mock_response.raise_for_status.return_value = None
+        mock_response.raw = io.BytesIO(b"fake_image_data")
+        mock_get.return_value = mock_response
+        target = Path(self.temp_dir) / "test_image_1.jpg"
+
+        def replaced_concurrently(path, destination):
+            target.write_bytes(b"other_download")
+            raise FileNotFoundError(path)
+
+        client = MapillaryClient()
+
+        with patch.object(Path, "replace", replaced_concurrently):
+            file_path = client.download_image(self.mock_image_data[0], self.temp_dir)
+
+        self.assertEqual(file_path, str(target))
+        self.assertEqual(list(Path(self.temp_dir).glob("*.part")), [])
+
+    @patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"})
+    @patch("src.services.mapillary_client.http_session.get")
+    def test_download_images_skips_failures(self, mock_get):
+        """Test concurrent download keeps input order and skips failed images."""
+
+        def fake_get(url, **kwargs):
+            if url.endswith("image1.jpg"):
+                raise requests.ConnectionError("connection reset")
+            response = MagicMock()
+            response.raise_for_status.return_value = None
+            response.raw = io.BytesIO(b"fake_image_data")
+            return response
+
+        mock_get.side_effect = fake_get
+
+        client = MapillaryClient()
+        images = [
+            *self.mock_image_data,
+            {"id": "test_image_3", "thumb_original_url": "https://example.com/image3.jpg"},
+        ]
+
+        paths = client.download_images(images, self.temp_dir)
+
+        self.assertEqual(
+            [Path(path).name for path in paths], ["test_image_2.jpg", "test_image_3.jpg"]
+        )
+        self.assertEqual(mock_get.call_count, 3)
+
+    @patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"})
+    @patch("src.services.mapillary_client.time.sleep")
+    @patch("src.services.mapillary_client.http_session.get")
+    def test_fetch_images_retries_on_429(self, mock_get, mock_sleep):
+        """Test rate-limited responses are retried with backoff."""
+        throttled = Mock(status_code=429, headers={"Retry-After": "3"})
+        ok = Mock(status_code=200)
+        ok.json.return_value = {"data": self.mock_image_data}
+        mock_get.side_effect = [throttled, throttled, ok]
+
+        client = MapillaryClient()
+        images = client.fetch_images(bbox_from_point(51.5007, -0.1246, 100), limit=2)
+
+        self.assertEqual(len(images), 2)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual([c.args[0] for c in mock_sleep.call_args_list], [3.0, 3.0])
+
 
 class TestImageFetcherService(unittest.TestCase):
     """Test ImageFetcherService functionality."""
@@ -217,6 +382,64 @@ class TestImageFetcherService(unittest.TestCase):
         self.assertEqual(result["images_downloaded"], 0)
         self.assertEqual(len(result["image_paths"]), 0)
 
+    @patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"})
+    @patch("src.services.image_fetcher.MapillaryClient")
+    def test_fetch_images_at_points_single_request(self, mock_client_class):
+        """Test batched fetching makes one metadata request and splits results per point."""
+        mock_client = Mock()
+        mock_client.fetch_images.return_value = [
+            {"id": "near_a", "geometry": {"coordinates": [-0.1246, 51.5007]}},
+            {"id": "near_b", "geometry": {"coordinates": [-0.1100, 51.5100]}},
+            {"id": "no_geometry"},
+        ]
+        mock_client.download_images.side_effect = lambda images, output_dir: [
+            f"{output_dir}/{img['id']}.jpg" for img in images
+        ]
+        mock_client_class.return_value = mock_client
+
+        fetcher = ImageFetcherService()
+        results = fetcher.fetch_images_at_points(
+            [(51.5007, -0.1246), (51.5100, -0.1100)], radius_m=50, output_dir=self.temp_dir
+        )
+
+        mock_client.fetch_images.assert_called_once()
+        mock_client.download_images.assert_called_once()
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["image_paths"], [f"{self.temp_dir}/near_a.jpg"])
+        self.assertEqual(results[1]["image_paths"], [f"{self.temp_dir}/near_b.jpg"])
+        for result in results:
+            self.assertTrue(result["success"])
+            self.assertEqual(result["images_found"], 1)
+            self.assertEqual(result["failed_downloads"], 0)
+
+    @patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"})
+    @patch("src.services.image_fetcher.MapillaryClient")
+    def test_fetch_images_at_points_refetches_crowded_out_points(self, mock_client_class):
+        """Test points missed by a capped batched query are queried on their own."""
+        crowded = [
+            {"id": f"near_a_{i}", "geometry": {"coordinates": [-0.1246, 51.5007]}} for i in range(2)
+        ]
+        near_b = [{"id": "near_b", "geometry": {"coordinates": [-0.1100, 51.5100]}}]
+        mock_client = Mock()
+        mock_client.fetch_images.side_effect = [crowded, near_b]
+        mock_client.download_images.side_effect = lambda images, output_dir: [
+            f"{output_dir}/{img['id']}.jpg" for img in images
+        ]
+        mock_client_class.return_value = mock_client
+
+        fetcher = ImageFetcherService()
+        results = fetcher.fetch_images_at_points(
+            [(51.5007, -0.1246), (51.5100, -0.1100)],
+            radius_m=50,
+            limit=1,
+            output_dir=self.temp_dir,
+        )
+
+        self.assertEqual(mock_client.fetch_images.call_count, 2)
+        self.assertEqual(mock_client.fetch_images.call_args.kwargs["limit"], 1)
+        self.assertEqual(results[0]["image_paths"], [f"{self.temp_dir}/near_a_0.jpg"])
+        self.assertEqual(results[1]["image_paths"], [f"{self.temp_dir}/near_b.jpg"])
+
     def test_service_info(self):
         """Test service info retrieval."""
         with patch.dict(os.environ, {"MAPILLARY_ACCESS_TOKEN": "test_token"}):
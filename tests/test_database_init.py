@@ -0,0 +1,64 @@
+"""
+Unit tests for database initialization helpers.
+
+These tests exercise the schema parsing logic only and do not require
+a running PostgreSQL instance.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database.db_init import DatabaseInitializer
+
+
+SCHEMA_FILE = Path(__file__).parent.parent / "src" / "database_schema.sql"
+
+
+class TestSchemaSplitting(unittest.TestCase):
+    """Test splitting the schema into batch DDL and deferred indexes."""
+
+    def test_index_statements_are_deferred(self):
+        """All CREATE INDEX lines should be moved out of the DDL batch."""
+        ddl_sql, index_statements = DatabaseInitializer._split_schema(SCHEMA_FILE.read_text())
+
+        self.assertGreater(len(index_statements), 0)
+        self.assertNotIn("CREATE INDEX", ddl_sql)
+        self.assertIn("CREATE TABLE photos", ddl_sql)
+        for statement in index_statements:
+            self.assertRegex(statement, r"^CREATE (UNIQUE )?INDEX")
+            self.assertTrue(statement.endswith(";"))
+
+    def test_concurrent_marker(self):
+        """Statements preceded by the marker should be deferred as well."""
+        schema_sql = (
+            "CREATE TABLE t (id INT);\n-- @concurrent\nCREATE UNIQUE INDEX t_id ON t(id);\n"
+        )
+
+        ddl_sql, index_statements = DatabaseInitializer._split_schema(schema_sql)
+
+        self.assertEqual(ddl_sql.strip(), "CREATE TABLE t (id INT);")
+        self.assertEqual(index_statements, ["CREATE UNIQUE INDEX t_id ON t(id);"])
+
+    def test_concurrent_statement_rewrite(self):
+        """CREATE INDEX should be rewritten to build CONCURRENTLY."""
+        rewrite = DatabaseInitializer._concurrent_statement
+
+        self.assertEqual(
+            rewrite("CREATE INDEX idx_a ON a(x);"), "CREATE INDEX CONCURRENTLY idx_a ON a(x);"
+        )
+        self.assertEqual(
+            rewrite("CREATE UNIQUE INDEX idx_a ON a(x);"),
+            "CREATE UNIQUE INDEX CONCURRENTLY idx_a ON a(x);",
+        )
+        self.assertEqual(
+            rewrite("CREATE INDEX CONCURRENTLY idx_a ON a(x);"),
+            "CREATE INDEX CONCURRENTLY idx_a ON a(x);",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,702 @@
+"""
+Unit tests for the metadata helpers of the database pipeline.
+
+The pipeline is created without running __init__, so no models or
+database connection are needed.
+"""
+
+import sys
+import tempfile
+import threading
+import unittest
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database import DatabaseService
+from src.services.image_quality import ImageQualityMetrics
+from src.services.pipeline.database_pipeline import DatabasePipeline, _parse_iso
+from src.utils.bloom_filter import BloomFilter
+
+
+class TestParseMapillaryDates(unittest.TestCase):
+    """Test single and batched captured_at parsing."""
+
+    def setUp(self):
+        """Create a pipeline without loading models."""
+        self.pipeline = DatabasePipeline.__new__(DatabasePipeline)
+
+    def test_batch_matches_single_parse(self):
+        """Batch parsing should agree with the per-value parser."""
+        values = [
+            1700000000000,  # Mapillary epoch milliseconds
+            1700000000,  # epoch seconds
+            1700000000123.25,  # fractional milliseconds
+            "2023-01-01T12:00:00Z",
+            "2023-01-01T12:00:00.123456Z",
+            "2023-01-01T12:00:00+01:00",
+            None,
+            "not a date",
+            1e30,
+            float("nan"),
+        ]
+
+        batch = self.pipeline._parse_mapillary_dates_batch(values)
+        single = [self.pipeline._parse_mapillary_date(value) for value in values]
+
+        self.assertEqual(batch, single)
+
+    def test_timestamps_are_utc(self):
+        """Timestamps should become aware UTC datetimes."""
+        expected = datetime(2023, 11, 14, 22, 13, 20, tzinfo=timezone.utc)
+
+        self.assertEqual(
+            self.pipeline._parse_mapillary_dates_batch([1700000000000, 1700000000]),
+            [expected, expected],
+        )
+
+    def test_iso_strings_keep_offsets(self):
+        """ISO strings should keep their UTC offset."""
+        dates = self.pipeline._parse_mapillary_dates_batch(
+            ["2023-01-01T12:00:00Z", "2023-01-01T12:00:00.500+01:00"]
+        )
+
+        self.assertEqual(dates[0], datetime(2023, 1, 1, 12, tzinfo=timezone.utc))
+        self.assertEqual(dates[1].utcoffset(), timedelta(hours=1))
+        self.assertEqual(dates[1].microsecond, 500000)
+
+    def test_iso_parses_are_cached(self):
+        """Repeated ISO strings should be parsed once."""
+        _parse_iso.cache_clear()
+
+        for _ in range(3):
+            self.pipeline._parse_mapillary_date("2023-01-01T12:00:00Z")
+
+        self.assertEqual(_parse_iso.cache_info().hits, 2)
+        self.assertEqual(_parse_iso.cache_info().misses, 1)
+
+    def test_empty_batch(self):
+        """An empty batch should parse to an empty list."""
+        self.assertEqual(self.pipeline._parse_mapillary_dates_batch([]), [])
+
+
+class TestExtractMetadata(unittest.TestCase):
+    """Test splitting Mapillary records into parallel lists."""
+
+    def test_parallel_lists(self):
+        """Each list should hold one entry per record, None where missing."""
+        pipeline = DatabasePipeline.__new__(DatabasePipeline)
+        metadata = [
+            {
+                "id": "1",
+                "geometry": {"type": "Point", "coordinates": [-0.12, 51.5]},
+                "captured_at": 1700000000000,
+                "compass_angle": 90.0,
+            },
+            {"id": "2", "compass_angle": 400},
+            {},
+        ]
+
+        ids, locations, dates, angles = pipeline._extract_metadata_soa(metadata)
+
+        self.assertEqual(ids, ["1", "2", None])
+        self.assertEqual(locations, [(51.5, -0.12), None, None])
+        self.assertEqual(dates[0], datetime(2023, 11, 14, 22, 13, 20, tzinfo=timezone.utc))
+        self.assertEqual(dates[1:], [None, None])
+        self.assertEqual(angles, [90.0, None, None])
+
+
+class TestValidateCompassAngle(unittest.TestCase):
+    """Test compass angle validation."""
+
+    def test_angles(self):
+        """Angles in [0, 360) should be kept as floats, others dropped."""
+        pipeline = DatabasePipeline.__new__(DatabasePipeline)
+        cases = {0.0: 0.0, 359.9: 359.9, 90: 90.0, "45.5": 45.5, 360.0: None, -1.0: None}
+        for angle, expected in cases.items():
+            self.assertEqual(pipeline._validate_compass_angle(angle), expected, angle)
+        self.assertIsNone(pipeline._validate_compass_angle(float("nan")))
+        self.assertIsNone(pipeline._validate_compass_angle("north"))
+        self.assertIsNone(pipeline._validate_compass_angle(None))
+
+    def test_batch_matches_single_values(self):
+        """Batch validation should agree with validating each angle alone."""
+        pipeline = DatabasePipeline.__new__(DatabasePipeline)
+        values = [0.0, 359.9, 360.0, -1.0, float("nan"), 90, "45.5", "north", None, 12.5]
+
+        self.assertEqual(
+            pipeline._validate_compass_angles_batch(values),
+            [pipeline._validate_compass_angle(value) for value in values],
+        )
+
+
+class TestDuplicateResult(unittest.TestCase):
+    """Test results returned for duplicate photos."""
+
+    def setUp(self):
+        """Create a pipeline with a mocked database service."""
+        self.pipeline = DatabasePipeline.__new__(DatabasePipeline)
+        self.pipeline.db_service = MagicMock()
+        self.pipeline.db_service.get_photo_with_results.return_value = {"photo": {"id": 5}}
+
+    def test_existing_results_are_lazy(self):
+        """Without fetching, no extra query should be issued."""
+        result = self.pipeline._duplicate_result("a.jpg", {"id": 5}, False)
+
+        self.assertTrue(result["duplicate_found"])
+        self.assertEqual(result["duplicate_photo"], {"id": 5})
+        self.assertIsNone(result["existing_results"])
+        self.pipeline.db_service.get_photo_with_results.assert_not_called()
+
+    def test_existing_results_fetched(self):
+        """With fetching, the stored results should be included."""
+        result = self.pipeline._duplicate_result("a.jpg", {"id": 5}, True)
+
+        self.assertEqual(result["existing_results"], {"photo": {"id": 5}})
+        self.pipeline.db_service.get_photo_with_results.assert_called_once_with(5)
+
+
+class TestKnownPhotoCache(unittest.TestCase):
+    """Test the bounded cache of stored photo IDs."""
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """The cache should drop the entry used longest ago when full."""
+        pipeline = DatabasePipeline.__new__(DatabasePipeline)
+        pipeline._known_photos = OrderedDict()
+        pipeline._known_photos_lock = threading.Lock()
+        photos = [{"source": "mapillary", "source_image_id": key} for key in "abc"]
+
+        with patch("src.services.pipeline.database_pipeline.KNOWN_PHOTO_CACHE_SIZE", 2):
+            pipeline._cache_photo_id(photos[0], 1)
+            pipeline._cache_photo_id(photos[1], 2)
+            self.assertEqual(pipeline._known_photo_id(photos[0]), 1)
+            pipeline._cache_photo_id(photos[2], 3)
+
+        self.assertEqual(pipeline._known_photo_id(photos[0]), 1)
+        self.assertIsNone(pipeline._known_photo_id(photos[1]))
+        self.assertEqual(pipeline._known_photo_id(photos[2]), 3)
+        self.assertIsNone(pipeline._known_photo_id({"source": "mapillary"}))
+
+
+class TestProcessImageWithDb(unittest.TestCase):
+    """Test analysing and saving a single image."""
+
+    def setUp(self):
+        """Create a pipeline whose analysis and database calls are recorded."""
+        self.pipeline = DatabasePipeline.__new__(DatabasePipeline)
+        self.pipeline.save_to_db = True
+        self.pipeline._dup_bloom = None
+        self.pipeline._dup_bloom_changed = False
+        self.pipeline._known_photos = OrderedDict()
+        self.pipeline._known_photos_lock = threading.Lock()
+        self.pipeline.visual_duplicates = False
+        self.events = []
+
+        @contextmanager
+        def transaction():
+            self.events.append("begin")
+            yield MagicMock()
+            self.events.append("commit")
+
+        def process_image(path):
+            self.events.append("analyse")
+            return MagicMock(road_metrics=None)
+
+        def save_photo_idempotent(**photo):
+            self.events.append("claim")
+            return {"id": 7, "inserted": True}
+
+        self.db_service = MagicMock()
+        self.db_service.transaction = transaction
+        self.db_service.check_duplicate_photo.return_value = None
+        self.db_service.save_photo_idempotent.side_effect = save_photo_idempotent
+        self.db_service.save_photo_results.return_value = {
+            "quality_id": 1,
+            "road_analysis_id": None,
+        }
+        self.pipeline.db_service = self.db_service
+        self.pipeline.process_image = MagicMock(side_effect=process_image)
+
+    def _process(self):
+        """Process one Mapillary image without loading stored results."""
+        return self.pipeline.process_image_with_db(
+            "a.jpg",
+            source="mapillary",
+            source_image_id="a",
+            location=(51.5, -0.12),
+            fetch_existing_results=False,
+        )
+
+    def test_photo_is_claimed_after_analysis(self):
+        """No transaction should be open while the models run."""
+        result = self._process()
+
+        self.assertEqual(self.events, ["analyse", "begin", "claim", "commit"])
+        self.assertEqual(result["database_ids"]["photo_id"], 7)
+
+    def test_stored_duplicate_skips_analysis(self):
+        """A photo found by the duplicate check should not be analysed."""
+        self.db_service.check_duplicate_photo.return_value = {"id": 3}
+
+        result = self._process()
+
+        self.pipeline.process_image.assert_not_called()
+        self.assertEqual(result["photo_id"], 3)
+        photo = {"source": "mapillary", "source_image_id": "a"}
+        self.assertEqual(self.pipeline._known_photo_id(photo), 3)
+
+    def test_concurrently_stored_photo_is_a_duplicate(self):
+        """A claim lost to a concurrent run should return the stored photo."""
+        self.db_service.save_photo_idempotent.side_effect = None
+        self.db_service.save_photo_idempotent.return_value = {"id": 4, "inserted": False}
+
+        result = self._process()
+
+        self.assertTrue(result["duplicate_found"])
+        self.assertEqual(result["photo_id"], 4)
+        self.db_service.save_photo_results.assert_not_called()
+
+    def test_perceptual_hash_is_saved(self):
+        """With visual duplicates enabled the image hash should be stored with the photo."""
+        self.pipeline.visual_duplicates = True
+        self.db_service.find_visual_duplicate.return_value = None
+
+        with patch("src.services.pipeline.database_pipeline.phash_file", return_value=5):
+            self._process()
+
+        self.assertEqual(self.db_service.save_photo_idempotent.call_args.kwargs["phash"], 5)
+
+
+class TestProcessCoordinateWithDb(unittest.TestCase):
+    """Test the staged duplicate check, analysis and bulk save of a coordinate."""
+
+    def setUp(self):
+        """Create a pipeline with a mocked fetcher, analysis and database."""
+        self.pipeline = DatabasePipeline.__new__(DatabasePipeline)
+        self.pipeline.save_to_db = True
+        self.pipeline.analysis_workers = 1
+        self.pipeline.analysis_threads = False
+        self.pipeline.analysis_batch_size = 1
+        self.pipeline._dup_bloom = None
+        self.pipeline._dup_bloom_changed = False
+        self.pipeline._known_photos = OrderedDict()
+        self.pipeline._known_photos_lock = threading.Lock()
+        self.pipeline.visual_duplicates = False
+        self.pipeline.warm_up = MagicMock()
+
+        self.db_service = DatabaseService(password="test")
+        patcher = patch.object(DatabaseService, "get_connection", return_value=MagicMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pipeline.db_service = self.db_service
+
+        self.pipeline.fetcher_service = MagicMock()
+        self.pipeline.fetcher_service.fetch_image_metadata_at_point.return_value = [
+            {"id": "a"},
+            {"id": "b"},
+            {"id": "c"},
+        ]
+        # Downloads complete out of order
+        self.pipeline.fetcher_service.iter_download_images.side_effect = lambda images, _: (
+            (index, f"{images[index]['id']}.jpg") for index in reversed(range(len(images)))
+        )
+        self.analysed = []
+
+        def process_stream(paths, max_workers, use_threads=False, road_batch_size=1):
+            results = {}
+            for path in paths:
+                self.analysed.append(path)
+                results[path] = MagicMock(
+                    quality_metrics=MagicMock(spec=ImageQualityMetrics), road_metrics=None
+                )
+            return results
+
+        self.pipeline.process_stream = MagicMock(side_effect=process_stream)
+
+    def test_failed_visual_check_analyses_image(self):
+        """A failing visual duplicate lookup should not stop the other images."""
+        self.pipeline._find_visual_duplicate = MagicMock(side_effect=OSError("unreadable"))
+
+        with (
+            patch.object(
+                DatabaseService, "check_duplicate_photos_batch", return_value=[None, None, None]
+            ),
+            patch.object(
+                DatabaseService,
+                "save_photos_bulk_idempotent",
+                return_value=[{"id": 10 + i, "inserted": True} for i in range(3)],
+            ),
+            patch.object(DatabaseService, "save_quality_results_bulk", return_value=[20, 21, 22]),
+            patch.object(DatabaseService, "save_road_analysis_bulk", return_value=[]),
+        ):
+            result = self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        self.assertCountEqual(self.analysed, ["a.jpg", "b.jpg", "c.jpg"])
+        self.assertEqual(result["summary"]["successful_database_saves"], 3)
+
+    def test_summary_counts(self):
+        """New images should be analysed and saved, duplicates skipped."""
+        with (
+            patch.object(
+                DatabaseService,
+                "check_duplicate_photos_batch",
+                return_value=[None, {"id": 5}, None],
+            ),
+            patch.object(
+                DatabaseService,
+                "save_photos_bulk_idempotent",
+                return_value=[{"id": 10, "inserted": True}, {"id": 11, "inserted": True}],
+            ),
+            patch.object(DatabaseService, "save_quality_results_bulk", return_value=[20, 21]),
+            patch.object(DatabaseService, "save_road_analysis_bulk", return_value=[]),
+        ):
+            result = self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        self.assertEqual(
+            result["summary"],
+            {
+                "total_images_fetched": 3,
+                "total_processed": 3,
+                "successful_database_saves": 2,
+                "duplicates_found": 1,
+                "processing_errors": 0,
+            },
+        )
+        self.assertEqual(
+            result["database_results"],
+            [
+                {"photo_id": 10, "quality_id": 20, "road_analysis_id": None},
+                {"photo_id": 11, "quality_id": 21, "road_analysis_id": None},
+            ],
+        )
+        self.assertEqual(self.analysed, ["c.jpg", "a.jpg"])
+        self.assertTrue(result["processed_images"][1]["duplicate_found"])
+        # Only new images are downloaded
+        downloaded = self.pipeline.fetcher_service.iter_download_images.call_args.args[0]
+        self.assertEqual(downloaded, [{"id": "a"}, {"id": "c"}])
+        self.assertEqual(result["fetch_result"]["image_paths"], ["a.jpg", "c.jpg"])
+
+    def test_repeated_image_ids_are_processed_once(self):
+        """An image listed twice should be checked, downloaded and saved once."""
+        self.pipeline.fetcher_service.fetch_image_metadata_at_point.return_value = [
+            {"id": "a"},
+            {"id": "b"},
+            {"id": "a"},
+        ]
+        with (
+            patch.object(
+                DatabaseService, "check_duplicate_photos_batch", return_value=[None, None]
+            ) as check,
+            patch.object(
+                DatabaseService,
+                "save_photos_bulk_idempotent",
+                return_value=[{"id": 10, "inserted": True}, {"id": 11, "inserted": True}],
+            ) as save_photos,
+            patch.object(DatabaseService, "save_quality_results_bulk", return_value=[20, 21]),
+            patch.object(DatabaseService, "save_road_analysis_bulk", return_value=[]),
+        ):
+            result = self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        self.assertEqual(len(check.call_args.args[0]), 2)
+        downloaded = self.pipeline.fetcher_service.iter_download_images.call_args.args[0]
+        self.assertEqual(downloaded, [{"id": "a"}, {"id": "b"}])
+        saved_ids = [photo["source_image_id"] for photo in save_photos.call_args.args[0]]
+        self.assertCountEqual(saved_ids, ["a", "b"])
+        self.assertEqual(result["summary"]["total_images_fetched"], 2)
+        self.assertEqual(result["summary"]["successful_database_saves"], 2)
+
+    def test_failed_download_keeps_metadata_aligned(self):
+        """Results should stay matched to their metadata when a download fails."""
+        self.pipeline.fetcher_service.iter_download_images.side_effect = lambda images, _: iter(
+            [(2, "c.jpg")]
+        )
+        with (
+            patch.object(
+                DatabaseService, "check_duplicate_photos_batch", return_value=[None, None, None]
+            ),
+            patch.object(
+                DatabaseService,
+                "save_photos_bulk_idempotent",
+                return_value=[{"id": 10, "inserted": True}],
+            ) as save_photos,
+            patch.object(DatabaseService, "save_quality_results_bulk", return_value=[20]),
+            patch.object(DatabaseService, "save_road_analysis_bulk", return_value=[]),
+        ):
+            result = self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        saved_photos = save_photos.call_args.args[0]
+        self.assertEqual([photo["source_image_id"] for photo in saved_photos], ["c"])
+        self.assertEqual(result["fetch_result"]["failed_downloads"], 2)
+        self.assertEqual(result["summary"]["total_processed"], 1)
+        self.assertEqual(result["summary"]["successful_database_saves"], 1)
+
+    def test_quality_rejects_skip_road_insert(self):
+        """Images that failed quality should be saved without a road analysis INSERT."""
+        with (
+            patch.object(
+                DatabaseService, "check_duplicate_photos_batch", return_value=[None, None, None]
+            ),
+            patch(
+                "src.database.database_service.execute_values",
+                side_effect=lambda cursor, sql, values, **kwargs: [
+                    {"id": i, "inserted": True} for i in range(len(values))
+                ],
+            ) as execute_values,
+            patch.object(DatabaseService, "_quality_result_values", return_value=()),
+        ):
+            result = self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        # photos and quality_results only
+        self.assertEqual(execute_values.call_count, 2)
+        self.assertEqual(result["summary"]["successful_database_saves"], 3)
+        for ids in result["database_results"]:
+            self.assertIsNone(ids["road_analysis_id"])
+
+    def test_visual_duplicate_is_not_analysed(self):
+        """A downloaded image that looks like a stored photo should be skipped."""
+        self.pipeline.visual_duplicates = True
+        self.pipeline.fetcher_service.fetch_image_metadata_at_point.return_value = [
+            {"id": "a", "geometry": {"coordinates": [-0.12, 51.5]}},
+            {"id": "b", "geometry": {"coordinates": [-0.13, 51.6]}},
+        ]
+        with (
+            patch(
+                "src.services.pipeline.database_pipeline.phash_file",
+                side_effect=lambda path: {"a.jpg": 1, "b.jpg": 2}[path],
+            ),
+            patch.object(
+                DatabaseService, "check_duplicate_photos_batch", return_value=[None, None]
+            ),
+            patch.object(
+                DatabaseService,
+                "find_visual_duplicate",
+                side_effect=lambda location, phash: {"id": 9} if phash == 1 else None,
+            ),
+            patch.object(
+                DatabaseService,
+                "save_photos_bulk_idempotent",
+                return_value=[{"id": 10, "inserted": True}],
+            ) as save_photos,
+            patch.object(DatabaseService, "save_quality_results_bulk", return_value=[20]),
+            patch.object(DatabaseService, "save_road_analysis_bulk", return_value=[]),
+        ):
+            result = self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        self.assertEqual(self.analysed, ["b.jpg"])
+        self.assertEqual(save_photos.call_args.args[0][0]["phash"], 2)
+        self.assertEqual(result["processed_images"][0]["photo_id"], 9)
+        self.assertEqual(result["summary"]["duplicates_found"], 1)
+        self.assertEqual(result["summary"]["successful_database_saves"], 1)
+        self.assertEqual(result["fetch_result"]["images_downloaded"], 2)
+
+    def test_models_warm_up_in_process_only(self):
+        """Warm-up should run with in-process analysis and be skipped with workers."""
+        with patch.object(DatabaseService, "check_duplicate_photos_batch", return_value=[]):
+            self.pipeline.fetcher_service.fetch_image_metadata_at_point.return_value = []
+            self.pipeline.process_coordinate_with_db(51.5, -0.12)
+            self.pipeline.analysis_workers = 4
+            self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        self.pipeline.warm_up.assert_called_once()
+
+    def test_thread_workers_share_warmed_models(self):
+        """Thread workers should warm the shared models and be requested from analysis."""
+        self.pipeline.analysis_workers = 4
+        self.pipeline.analysis_threads = True
+        with (
+            patch.object(
+                DatabaseService,
+                "check_duplicate_photos_batch",
+                return_value=[None, {"id": 5}, None],
+            ),
+            patch.object(
+                DatabaseService,
+                "save_photos_bulk_idempotent",
+                return_value=[{"id": 10, "inserted": True}, {"id": 11, "inserted": True}],
+            ),
+            patch.object(DatabaseService, "save_quality_results_bulk", return_value=[20, 21]),
+            patch.object(DatabaseService, "save_road_analysis_bulk", return_value=[]),
+        ):
+            self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        self.pipeline.warm_up.assert_called_once()
+        self.assertEqual(self.pipeline.process_stream.call_args.kwargs["max_workers"], 4)
+        self.assertTrue(self.pipeline.process_stream.call_args.kwargs["use_threads"])
+
+    def test_known_photos_skip_database_check(self):
+        """Photos seen at an earlier coordinate should not be checked again."""
+        with (
+            patch.object(
+                DatabaseService,
+                "check_duplicate_photos_batch",
+                return_value=[None, {"id": 5}, None],
+            ),
+            patch.object(
+                DatabaseService,
+                "save_photos_bulk_idempotent",
+                return_value=[{"id": 10, "inserted": True}, {"id": 11, "inserted": True}],
+            ),
+            patch.object(DatabaseService, "save_quality_results_bulk", return_value=[20, 21]),
+            patch.object(DatabaseService, "save_road_analysis_bulk", return_value=[]),
+        ):
+            self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        with patch.object(DatabaseService, "check_duplicate_photos_batch") as check:
+            check.return_value = []
+            result = self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        self.assertEqual(check.call_args.args[0], [])
+        self.assertEqual([image["photo_id"] for image in result["processed_images"]], [10, 5, 11])
+        self.assertEqual(result["summary"]["duplicates_found"], 3)
+
+    def test_concurrently_stored_photo_is_a_duplicate(self):
+        """A photo stored since the duplicate check should not fail the flush."""
+        with (
+            patch.object(
+                DatabaseService, "check_duplicate_photos_batch", return_value=[None, None, None]
+            ),
+            patch.object(
+                DatabaseService,
+                "save_photos_bulk_idempotent",
+                return_value=[
+                    {"id": 10, "inserted": True},
+                    {"id": 7, "inserted": False},
+                    {"id": 11, "inserted": True},
+                ],
+            ),
+            patch.object(
+                DatabaseService, "save_quality_results_bulk", return_value=[20, 21]
+            ) as save_quality,
+            patch.object(DatabaseService, "save_road_analysis_bulk", return_value=[]),
+        ):
+            result = self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        self.assertEqual([photo_id for photo_id, _ in save_quality.call_args.args[0]], [10, 11])
+        self.assertEqual(result["processed_images"][1]["photo_id"], 7)
+        self.assertEqual(result["processed_images"][2]["database_ids"]["quality_id"], 21)
+        self.assertEqual(result["summary"]["successful_database_saves"], 2)
+        self.assertEqual(result["summary"]["duplicates_found"], 1)
+        self.assertEqual(result["summary"]["processing_errors"], 0)
+
+    def test_existing_results_loaded_in_one_query(self):
+        """Stored results of every duplicate should come from one batched lookup."""
+        with (
+            patch.object(
+                DatabaseService,
+                "check_duplicate_photos_batch",
+                return_value=[{"id": 5}, {"id": 6}, None],
+            ),
+            patch.object(
+                DatabaseService, "get_photos_with_results", return_value={5: {"photo_id": 5}}
+            ) as get_photos,
+            patch.object(
+                DatabaseService,
+                "save_photos_bulk_idempotent",
+                return_value=[{"id": 10, "inserted": True}],
+            ),
+            patch.object(DatabaseService, "save_quality_results_bulk", return_value=[20]),
+            patch.object(DatabaseService, "save_road_analysis_bulk", return_value=[]),
+        ):
+            result = self.pipeline.process_coordinate_with_db(
+                51.5, -0.12, fetch_existing_results=True
+            )
+
+        get_photos.assert_called_once_with([5, 6])
+        self.assertEqual(result["processed_images"][0]["existing_results"], {"photo_id": 5})
+        self.assertIsNone(result["processed_images"][1]["existing_results"])
+        self.assertEqual(result["summary"]["duplicates_found"], 2)
+
+    def test_failed_flush_counts_as_errors(self):
+        """A failed bulk save should mark every new image as unsaved."""
+        with (
+            patch.object(
+                DatabaseService, "check_duplicate_photos_batch", return_value=[None, None, None]
+            ),
+            patch.object(
+                DatabaseService, "save_photos_bulk_idempotent", side_effect=RuntimeError("down")
+            ),
+        ):
+            result = self.pipeline.process_coordinate_with_db(51.5, -0.12)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["summary"]["successful_database_saves"], 0)
+        self.assertEqual(result["summary"]["processing_errors"], 3)
+
+
+class TestProcessCoordinatesWithDb(unittest.TestCase):
+    """Test processing several coordinates."""
+
+    def setUp(self):
+        """Create a pipeline whose single-coordinate processing is mocked."""
+        self.pipeline = DatabasePipeline.__new__(DatabasePipeline)
+        self.pipeline._dup_bloom = None
+        self.pipeline._dup_bloom_changed = False
+
+        def process_coordinate(lat, lon, **kwargs):
+            if lat < 0:
+                return {"error": "fetch failed", "success": False, "coordinates": (lat, lon)}
+            self.pipeline._remember_photo({"source": "mapillary", "source_image_id": str(lat)})
+            return {
+                "success": True,
+                "coordinates": (lat, lon),
+                "summary": {
+                    "total_images_fetched": 3,
+                    "total_processed": 3,
+                    "successful_database_saves": 2,
+                    "duplicates_found": 1,
+                    "processing_errors": 0,
+                },
+            }
+
+        self.pipeline.process_coordinate_with_db = MagicMock(side_effect=process_coordinate)
+
+    def test_results_and_summary(self):
+        """Results should keep input order and summaries should be summed."""
+        points = [(51.5, -0.12), (-1.0, 0.0), (51.6, -0.13)]
+        for max_workers in (1, 3):
+            result = self.pipeline.process_coordinates_with_db(points, max_workers=max_workers)
+
+            self.assertEqual([r["coordinates"] for r in result["results"]], points)
+            summary = result["summary"]
+            self.assertEqual(summary["points_processed"], 3)
+            self.assertEqual(summary["failed_points"], 1)
+            self.assertEqual(summary["total_images_fetched"], 6)
+            self.assertEqual(summary["successful_database_saves"], 4)
+            self.assertEqual(summary["duplicates_found"], 2)
+
+    def test_duplicate_filter_saved_once_per_run(self):
+        """The duplicate filter should be saved after the run, not per coordinate."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        filter_path = Path(tmp_dir.name) / "duplicates.bloom"
+        self.pipeline.duplicate_filter_path = str(filter_path)
+        self.pipeline._dup_bloom = BloomFilter()
+        self.pipeline._dup_bloom_max_id = 7
+        self.pipeline._dup_bloom_lock = threading.Lock()
+
+        points = [(51.5, -0.12), (51.6, -0.13), (51.7, -0.14)]
+        with patch.object(
+            DatabasePipeline,
+            "save_duplicate_filter",
+            autospec=True,
+            side_effect=DatabasePipeline.save_duplicate_filter,
+        ) as save:
+            self.pipeline.process_coordinates_with_db(points, max_workers=2)
+            # Nothing new to save on a second run
+            self.pipeline.process_coordinates_with_db([(-1.0, 0.0)])
+
+        save.assert_called_once()
+        for call in self.pipeline.process_coordinate_with_db.call_args_list:
+            self.assertFalse(call.kwargs["save_filter"])
+        self.assertEqual([p.name for p in Path(tmp_dir.name).iterdir()], [filter_path.name])
+        saved = BloomFilter.from_bytes(filter_path.read_bytes()[8:])
+        self.assertIn("id:mapillary:51.6", saved)
+
+
+if __name__ == "__main__":
+    unittest.main()
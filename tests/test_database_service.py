@@ -0,0 +1,618 @@
+"""
+Unit tests for the database service layer.
+
+Covers the psycopg2 adapters and query-building helpers without
+requiring a running PostgreSQL instance.
+"""
+
+import sys
+import threading
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from psycopg2.extensions import adapt
+from psycopg2.pool import PoolError
+
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database import DatabaseService, GeoPoint
+from src.database.database_service import SOURCE_IMAGE_INDEX_UPGRADE
+from src.services.image_quality import ImageFailureReason, ImageQualityMetrics
+from src.services.road_quality import RoadQualityMetrics
+
+
+def make_quality_metrics(is_usable: bool = True) -> ImageQualityMetrics:
+    """Create quality metrics for a usable or failed image."""
+    return ImageQualityMetrics(
+        image_path="test.jpg",
+        overall_score=85.0 if is_usable else 10.0,
+        is_usable=is_usable,
+        failure_reasons=[] if is_usable else [ImageFailureReason.TOO_BLURRY],
+        blur_score=100.0,
+        exposure_score=100.0,
+        size_score=100.0,
+        road_surface_percentage=40.0,
+        has_sufficient_road=is_usable,
+        timestamp=1704110400.0,
+        assessment_version="1.0.0",
+    )
+
+
+def make_road_metrics(score: float = 80.0) -> RoadQualityMetrics:
+    """Create road metrics with the given overall score."""
+    return RoadQualityMetrics(
+        overall_quality_score=score,
+        crack_confidence=0.1,
+        crack_severity="none",
+        pothole_confidence=0.0,
+        pothole_count=0,
+        surface_roughness=0.1,
+        lane_marking_visibility=0.5,
+        debris_score=0.0,
+        weather_condition="unknown",
+        assessment_confidence=0.5,
+        timestamp="2024-01-01T12:00:00",
+        model_name="YOLOv8RoadQuality",
+        model_version="1.0.0",
+    )
+
+
+class MockConnectionMixin:
+    """Patch DatabaseService.get_connection with a mock connection."""
+
+    def setUp(self):
+        """Set up a service with a mocked connection and cursor."""
+        self.service = DatabaseService(password="test")
+        self.cursor = MagicMock()
+        self.conn = MagicMock()
+        self.conn.cursor.return_value = self.cursor
+        patcher = patch.object(DatabaseService, "get_connection", return_value=self.conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def executed_sql(self) -> list[str]:
+        """Return the SQL text of every executed statement."""
+        return [call.args[0] for call in self.cursor.execute.call_args_list]
+
+
+class TestDatabaseAdapters(unittest.TestCase):
+    """Test psycopg2 adapters registered by the database package."""
+
+    def test_numpy_scalars(self):
+        """Numpy scalars should adapt to plain SQL literals."""
+        self.assertEqual(adapt(np.float32(1.5)).getquoted(), b"1.5")
+        self.assertEqual(adapt(np.int64(3)).getquoted(), b"3")
+        self.assertEqual(adapt(np.bool_(True)).getquoted(), b"true")
+
+    def test_geo_point(self):
+        """GeoPoint should render as an SRID 4326 PostGIS point."""
+        point = GeoPoint.from_lat_lon((51.5007, -0.1246))
+
+        self.assertEqual(point, (-0.1246, 51.5007))
+        self.assertEqual(
+            adapt(point).getquoted(), b"ST_SetSRID(ST_MakePoint(-0.1246, 51.5007), 4326)"
+        )
+
+    def test_non_finite_geo_point_rejected(self):
+        """NaN or infinite coordinates should never be rendered into SQL."""
+        for location in [(float("nan"), -0.1246), (51.5007, float("inf"))]:
+            with self.assertRaises(ValueError):
+                GeoPoint.from_lat_lon(location)
+
+        with self.assertRaises(ValueError):
+            adapt(GeoPoint((float("nan"), 51.5007)))
+
+
+class TestSessionSettings(unittest.TestCase):
+    """Test per-connection session settings."""
+
+    @patch("src.database.database_service.psycopg2.connect")
+    def test_defaults_sent_as_connect_options(self, connect):
+        """Default settings should be applied via the startup options."""
+        DatabaseService(password="test").get_connection()
+
+        options = connect.call_args.kwargs["options"]
+        self.assertIn("-c synchronous_commit=off", options)
+        self.assertIn("-c lock_timeout=5s", options)
+
+    @patch("src.database.database_service.psycopg2.connect")
+    def test_empty_settings_use_server_defaults(self, connect):
+        """An empty mapping should send no options."""
+        DatabaseService(password="test", session_settings={}).get_connection()
+
+        self.assertIsNone(connect.call_args.kwargs["options"])
+
+    def test_values_are_escaped(self):
+        """Spaces in values should be escaped for libpq."""
+        options = DatabaseService._session_options({"search_path": "a, b"})
+
+        self.assertEqual(options, "-c search_path=a,\\ b")
+
+
+class TestEnsureDuplicateIndexes(MockConnectionMixin, unittest.TestCase):
+    """Test the idempotent duplicate check index migration."""
+
+    CURRENT_INDEXDEF = (
+        "CREATE UNIQUE INDEX idx_photos_source_image_id ON public.photos "
+        "USING btree (source, source_image_id)"
+    )
+
+    def test_current_index_is_kept(self):
+        """A valid index with the expected definition should not be rebuilt."""
+        self.cursor.fetchone.return_value = {"indexdef": self.CURRENT_INDEXDEF, "valid": True}
+
+        self.service.ensure_duplicate_indexes()
+
+        self.assertEqual(len(self.executed_sql()), 1)
+
+    def test_old_missing_or_invalid_index_is_rebuilt(self):
+        """Other definitions should be replaced only after the new index is built."""
+        existing = [
+            {
+                "indexdef": "CREATE INDEX idx_photos_source_image_id ON public.photos "
+                "USING btree (source_image_id)",
+                "valid": True,
+            },
+            None,
+            {"indexdef": self.CURRENT_INDEXDEF, "valid": False},
+        ]
+        for row in existing:
+            self.cursor.reset_mock()
+            self.cursor.fetchone.side_effect = [row, {"duplicates": 0}]
+
+            self.service.ensure_duplicate_indexes()
+
+            self.assertEqual(self.executed_sql()[2:], list(SOURCE_IMAGE_INDEX_UPGRADE))
+            self.assertTrue(self.conn.autocommit)
+
+    def test_duplicate_rows_raise(self):
+        """Duplicate rows should be reported instead of failing the unique build."""
+        self.cursor.fetchone.side_effect = [None, {"duplicates": 3}]
+
+        with self.assertRaisesRegex(RuntimeError, "3 source"):
+            self.service.ensure_duplicate_indexes()
+
+        self.assertEqual(len(self.executed_sql()), 2)
+
+
+class TestEnsureOptionalQualityScores(MockConnectionMixin, unittest.TestCase):
+    """Test the NOT NULL migration for scores that may not be computed."""
+
+    def test_not_null_columns_are_altered(self):
+        """Only columns still marked NOT NULL should be altered."""
+        self.cursor.fetchall.return_value = [{"column_name": "exposure_score"}]
+
+        self.service.ensure_optional_quality_scores()
+
+        self.assertEqual(
+            self.executed_sql()[1:],
+            ["ALTER TABLE quality_results ALTER COLUMN exposure_score DROP NOT NULL"],
+        )
+        self.conn.commit.assert_called_once()
+
+    def test_current_schema_is_left_alone(self):
+        """Nothing should be altered once both columns allow NULL."""
+        self.cursor.fetchall.return_value = []
+
+        self.service.ensure_optional_quality_scores()
+
+        self.assertEqual(len(self.executed_sql()), 1)
+
+
+class TestSavePhotoIdempotent(MockConnectionMixin, unittest.TestCase):
+    """Test the combined duplicate check and photo insert."""
+
+    def test_new_photo_is_inserted(self):
+        """A new photo should be inserted with a single statement."""
+        self.cursor.fetchone.return_value = {"id": 7, "inserted": True}
+
+        result = self.service.save_photo_idempotent(
+            source="mapillary",
+            source_image_id="abc",
+            location=(51.5, -0.12),
+            date_taken=datetime(2024, 1, 1),
+            phash=(1 << 64) - 1,
+        )
+
+        self.assertEqual(result, {"id": 7, "inserted": True})
+        self.assertEqual(self.cursor.execute.call_count, 1)
+        sql, params = self.cursor.execute.call_args.args
+        self.assertIn("ON CONFLICT (source, source_image_id) DO NOTHING", sql)
+        self.assertTrue(params["check_location"])
+        self.assertEqual(params["phash"], -1)
+
+    def test_duplicate_is_reported(self):
+        """An existing photo should be returned without inserting."""
+        self.cursor.fetchone.return_value = {"id": 3, "inserted": False}
+
+        result = self.service.save_photo_idempotent(source="mapillary", source_image_id="abc")
+
+        self.assertEqual(result, {"id": 3, "inserted": False})
+        self.assertFalse(self.cursor.execute.call_args.args[1]["check_location"])
+
+    def test_lost_insert_race_falls_back_to_lookup(self):
+        """With no row returned the concurrently inserted photo should be looked up."""
+        self.cursor.fetchone.side_effect = [None, {"id": 9}]
+
+        result = self.service.save_photo_idempotent(source="mapillary", source_image_id="abc")
+
+        self.assertEqual(result, {"id": 9, "inserted": False})
+
+
+class TestSavePhotoResults(MockConnectionMixin, unittest.TestCase):
+    """Test saving results for an already stored photo."""
+
+    def test_results_reference_photo(self):
+        """Both result rows should be written for the given photo in one statement."""
+        self.cursor.fetchone.return_value = {"quality_id": 2, "road_analysis_id": 3}
+
+        ids = self.service.save_photo_results(7, make_quality_metrics(), make_road_metrics())
+
+        self.assertEqual(ids, {"quality_id": 2, "road_analysis_id": 3})
+        sql, params = self.cursor.execute.call_args.args
+        self.assertIn("new_road", sql)
+        self.assertEqual(params.count(7), 2)
+
+
+class TestCheckDuplicatePhotosBatch(MockConnectionMixin, unittest.TestCase):
+    """Test the batched duplicate lookup."""
+
+    def test_results_are_aligned_with_input(self):
+        """Matches should come back at the index of the photo they belong to."""
+        date_taken = datetime(2024, 1, 1, 12, 0)
+        photos = [
+            {"source": "mapillary", "source_image_id": "a", "location": None, "date_taken": None},
+            {"source": "mapillary", "source_image_id": "b", "location": None, "date_taken": None},
+            {
+                "source": "mapillary",
+                "source_image_id": None,
+                "location": (51.5, -0.12),
+                "date_taken": date_taken,
+            },
+        ]
+        self.cursor.fetchall.side_effect = [[{"idx": 1, "id": 10}], [{"idx": 2, "id": 20}]]
+
+        duplicates = self.service.check_duplicate_photos_batch(photos)
+
+        self.assertEqual(duplicates, [None, {"id": 10}, {"id": 20}])
+        self.assertEqual(self.cursor.execute.call_count, 2)
+        id_params, location_params = [call.args[1] for call in self.cursor.execute.call_args_list]
+        self.assertEqual(id_params, ([0, 1], ["mapillary", "mapillary"], ["a", "b"]))
+        self.assertEqual(location_params[:4], ([2], [51.5], [-0.12], [date_taken]))
+
+    def test_location_query_skipped_when_all_matched(self):
+        """Photos matched by ID should not be looked up by location."""
+        photos = [
+            {
+                "source": "mapillary",
+                "source_image_id": "a",
+                "location": (51.5, -0.12),
+                "date_taken": datetime(2024, 1, 1),
+            }
+        ]
+        self.cursor.fetchall.return_value = [{"idx": 0, "id": 10}]
+
+        self.assertEqual(self.service.check_duplicate_photos_batch(photos), [{"id": 10}])
+        self.assertEqual(self.cursor.execute.call_count, 1)
+
+    def test_empty_batch_skips_database(self):
+        """An empty batch should not open a connection."""
+        self.assertEqual(self.service.check_duplicate_photos_batch([]), [])
+        self.conn.commit.assert_not_called()
+
+
+class TestBulkInserts(MockConnectionMixin, unittest.TestCase):
+    """Test the multi-row insert helpers."""
+
+    def setUp(self):
+        """Patch execute_values to return one freshly inserted row per value."""
+        super().setUp()
+        patcher = patch(
+            "src.database.database_service.execute_values",
+            side_effect=lambda cursor, sql, values, **kwargs: [
+                {"id": i + 1, "inserted": True} for i in range(len(values))
+            ],
+        )
+        self.execute_values = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_photos_share_one_statement(self):
+        """All photos should be inserted by a single execute_values call."""
+        photos = [
+            {"source": "mapillary", "source_image_id": "a", "location": (51.5, -0.12)},
+            {"source": "mapillary", "source_image_id": "b"},
+        ]
+
+        claimed = self.service.save_photos_bulk_idempotent(photos)
+
+        self.assertEqual([row["id"] for row in claimed], [1, 2])
+        self.execute_values.assert_called_once()
+        values = self.execute_values.call_args.args[2]
+        self.assertEqual(values[0][3], (-0.12, 51.5))
+        self.assertIsNone(values[1][3])
+        self.assertEqual(self.execute_values.call_args.kwargs["page_size"], 2)
+        self.conn.commit.assert_called_once()
+
+    def test_photo_hash_stored_as_signed_bigint(self):
+        """Hashes with the top bit set should wrap to negative BIGINT values."""
+        self.service.save_photos_bulk_idempotent(
+            [
+                {"source": "mapillary", "phash": (1 << 64) - 1},
+                {"source": "mapillary", "phash": 5},
+                {"source": "mapillary"},
+            ]
+        )
+
+        values = self.execute_values.call_args.args[2]
+        self.assertEqual([row[6] for row in values], [-1, 5, None])
+
+    def test_idempotent_photos_report_conflicts(self):
+        """Conflicting photos should come back with their existing IDs."""
+        self.execute_values.side_effect = lambda cursor, sql, values, **kwargs: [
+            {"id": 1, "inserted": True},
+            {"id": 9, "inserted": False},
+        ]
+
+        claimed = self.service.save_photos_bulk_idempotent(
+            [
+                {"source": "mapillary", "source_image_id": "a"},
+                {"source": "mapillary", "source_image_id": "b"},
+            ]
+        )
+
+        self.assertEqual(claimed, [{"id": 1, "inserted": True}, {"id": 9, "inserted": False}])
+        sql = self.execute_values.call_args.args[1]
+        self.assertIn("ON CONFLICT (source, source_image_id)", sql)
+
+    def test_results_reference_photo_ids(self):
+        """Child rows should carry the photo ID as their first value."""
+        self.service.save_quality_results_bulk([(7, make_quality_metrics())])
+        self.service.save_road_analysis_bulk([(7, make_road_metrics())])
+
+        for call in self.execute_values.call_args_list:
+            self.assertEqual(call.args[2][0][0], 7)
+
+    def test_empty_batch_skips_database(self):
+        """An empty batch should not open a connection."""
+        self.assertEqual(self.service.save_photos_bulk_idempotent([]), [])
+
+        self.execute_values.assert_not_called()
+        self.conn.commit.assert_not_called()
+
+    def test_missing_ids_raise(self):
+        """A short RETURNING result should be reported as an error."""
+        self.execute_values.side_effect = lambda *args, **kwargs: []
+
+        with self.assertRaisesRegex(Exception, "Expected 1 rows"):
+            self.service.save_road_analysis_bulk([(1, make_road_metrics())])
+
+
+class TestNestedTransactions(MockConnectionMixin, unittest.TestCase):
+    """Test savepoint handling for transactions opened inside another."""
+
+    def test_nested_transaction_uses_savepoint(self):
+        """Nested blocks should share the connection and commit once."""
+        with self.service.transaction() as outer, self.service.transaction() as inner:
+            self.assertIs(inner, outer)
+
+        self.assertEqual(self.executed_sql(), ["SAVEPOINT nested_1", "RELEASE SAVEPOINT nested_1"])
+        self.conn.commit.assert_called_once()
+        self.conn.close.assert_called_once()
+
+    def test_nested_failure_only_rolls_back_savepoint(self):
+        """A failing nested block should not abort the outer transaction."""
+        with (
+            self.service.transaction(),
+            self.assertRaises(RuntimeError),
+            self.service.transaction(),
+        ):
+            raise RuntimeError("boom")
+
+        self.assertEqual(
+            self.executed_sql(), ["SAVEPOINT nested_1", "ROLLBACK TO SAVEPOINT nested_1"]
+        )
+        self.conn.rollback.assert_not_called()
+        self.conn.commit.assert_called_once()
+
+    def test_transaction_state_is_cleared(self):
+        """A new top-level transaction should open a fresh connection."""
+        with self.service.transaction():
+            pass
+        with self.service.transaction():
+            pass
+
+        self.assertEqual(self.conn.commit.call_count, 2)
+        self.assertEqual(self.executed_sql(), [])
+
+
+class TestGetPhotosWithResults(MockConnectionMixin, unittest.TestCase):
+    """Test the batched photo and results lookup."""
+
+    def test_one_query_keyed_by_photo(self):
+        """All photos should be loaded with one query, one record per photo."""
+        self.cursor.fetchall.return_value = [
+            {"photo_id": 5, "quality_id": 1},
+            {"photo_id": 5, "quality_id": 2},
+            {"photo_id": 8, "quality_id": 3},
+        ]
+
+        photos = self.service.get_photos_with_results([5, 8, 9])
+
+        self.assertEqual(
+            photos,
+            {5: {"photo_id": 5, "quality_id": 1}, 8: {"photo_id": 8, "quality_id": 3}},
+        )
+        self.assertEqual(len(self.executed_sql()), 1)
+        self.assertEqual(self.cursor.execute.call_args.args[1], ([5, 8, 9],))
+
+    def test_no_ids_skip_database(self):
+        """An empty ID list should not open a connection."""
+        self.assertEqual(self.service.get_photos_with_results([]), {})
+        DatabaseService.get_connection.assert_not_called()
+
+
+class TestPinnedConnection(MockConnectionMixin, unittest.TestCase):
+    """Test reusing one connection across transactions."""
+
+    def setUp(self):
+        """Mark the mock connection as open."""
+        super().setUp()
+        self.conn.closed = 0
+
+    def test_transactions_share_one_connection(self):
+        """Transactions in the block should commit separately on one connection."""
+        with self.service.pinned_connection():
+            with self.service.transaction() as first:
+                pass
+            with self.service.transaction() as second:
+                pass
+            self.conn.close.assert_not_called()
+
+        self.assertIs(first, second)
+        DatabaseService.get_connection.assert_called_once()
+        self.assertEqual(self.conn.commit.call_count, 2)
+        self.conn.close.assert_called_once()
+
+    def test_unused_block_does_not_connect(self):
+        """No connection should be opened until a transaction needs one."""
+        with self.service.pinned_connection():
+            pass
+
+        DatabaseService.get_connection.assert_not_called()
+
+    def test_closed_connection_is_replaced(self):
+        """A pinned connection that was closed should be reopened."""
+        with self.service.pinned_connection():
+            with self.service.transaction():
+                pass
+            self.conn.closed = 1
+            with self.service.transaction():
+                pass
+
+        self.assertEqual(DatabaseService.get_connection.call_count, 2)
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Test reusing pooled connections across transactions."""
+
+    def setUp(self):
+        """Patch the pool class with a mock handing out one connection."""
+        patcher = patch("src.database.database_service.ThreadedConnectionPool")
+        self.pool_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = self.pool_class.return_value
+        self.conn = MagicMock(closed=0)
+        self.pool.getconn.return_value = self.conn
+        self.service = DatabaseService(password="test", pool_size=4)
+
+    def test_pool_is_created_on_first_transaction(self):
+        """Constructing the service should not connect."""
+        self.pool_class.assert_not_called()
+
+        with self.service.transaction():
+            pass
+        with self.service.transaction():
+            pass
+
+        self.pool_class.assert_called_once()
+        self.assertEqual(self.pool_class.call_args.args, (0, 4))
+        self.assertEqual(self.pool.getconn.call_count, 2)
+        self.pool.putconn.assert_called_with(self.conn, close=False)
+        self.conn.close.assert_not_called()
+
+    def test_broken_connection_is_discarded(self):
+        """A connection closed by the server should not go back into the pool."""
+        with self.assertRaises(RuntimeError), self.service.transaction():
+            self.conn.closed = 2
+            raise RuntimeError("server closed the connection")
+
+        self.pool.putconn.assert_called_once_with(self.conn, close=True)
+
+    def test_threads_wait_for_a_free_connection(self):
+        """More threads than pooled connections should wait rather than fail."""
+        checked_out = []
+        peak = []
+        lock = threading.Lock()
+
+        def getconn():
+            with lock:
+                if len(checked_out) >= 2:
+                    raise PoolError("connection pool exhausted")
+                conn = MagicMock(closed=0)
+                checked_out.append(conn)
+                peak.append(len(checked_out))
+                return conn
+
+        def putconn(conn, close=False):
+            with lock:
+                checked_out.remove(conn)
+
+        self.pool.getconn.side_effect = getconn
+        self.pool.putconn.side_effect = putconn
+        service = DatabaseService(password="test", pool_size=2)
+        errors = []
+
+        def run_transaction():
+            try:
+                with service.transaction():
+                    time.sleep(0.01)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run_transaction) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.pool.getconn.call_count, 8)
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(checked_out, [])
+
+    def test_close_closes_pool(self):
+        """close() should close every pooled connection."""
+        with self.service.transaction():
+            pass
+
+        self.service.close()
+
+        self.pool.closeall.assert_called_once()
+
+
+class TestRoadAnalysisValues(unittest.TestCase):
+    """Test mapping of road metrics to road_analysis_results columns."""
+
+    def test_quality_rating_boundaries(self):
+        """Scores on a threshold should map to the higher rating."""
+        expected = {
+            100.0: "excellent",
+            90.0: "excellent",
+            89.9: "good",
+            75.0: "good",
+            50.0: "fair",
+            25.0: "poor",
+            24.9: "severe_issues",
+            0.0: "severe_issues",
+        }
+        for score, rating in expected.items():
+            values = DatabaseService._road_analysis_values(make_road_metrics(score))
+            self.assertEqual(values[1], rating, f"score={score}")
+
+    def test_unknown_crack_severity(self):
+        """Unknown crack severities should be stored as 'none'."""
+        metrics = make_road_metrics()
+        metrics.crack_severity = "catastrophic"
+
+        values = DatabaseService._road_analysis_values(metrics)
+
+        self.assertEqual(values[3], "none")
+
+
+if __name__ == "__main__":
+    unittest.main()
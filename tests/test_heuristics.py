@@ -0,0 +1,228 @@
+"""
+Unit tests for the fast Stage 1 image quality heuristics.
+
+Uses small synthetic images so no sample data is required.
+"""
+
+import struct
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.config import QualityConfig
+from src.services.image_quality.buffer_pool import BufferPool
+from src.services.image_quality.heuristics import (
+    check_image_quality,
+    is_blurry,
+    is_exposed_poorly,
+    is_too_small,
+    read_image_size,
+)
+
+
+def make_image(value: int, width: int = 640, height: int = 480) -> np.ndarray:
+    """Create a uniform BGR image with the given intensity."""
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+def write_rotated_jpeg(path: str, image: np.ndarray) -> None:
+    """Write a JPEG tagged with EXIF orientation 6 (rotate 90 degrees clockwise)."""
+    data = cv2.imencode(".jpg", image)[1].tobytes()
+    tiff = b"MM\x00*\x00\x00\x00\x08" + struct.pack(">HHHIHHI", 1, 0x0112, 3, 1, 6, 0, 0)
+    exif = b"Exif\x00\x00" + tiff
+    app1 = b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif
+    Path(path).write_bytes(data[:2] + app1 + data[2:])
+
+
+class TestBlur(unittest.TestCase):
+    """Test Laplacian-variance blur checks."""
+
+    def test_matches_float_laplacian_variance(self):
+        """Variance should match the float64 Laplacian reference."""
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, size=(120, 160, 3), dtype=np.uint8)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        expected = cv2.Laplacian(gray, cv2.CV_64F).var()
+
+        blurry, lap_var = is_blurry(image, QualityConfig())
+
+        self.assertAlmostEqual(lap_var, expected, delta=expected * 1e-6)
+        self.assertFalse(blurry)
+
+    def test_accepts_grayscale(self):
+        """Grayscale input should give the same result as the BGR image."""
+        rng = np.random.default_rng(1)
+        image = rng.integers(0, 256, size=(120, 160, 3), dtype=np.uint8)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        config = QualityConfig()
+
+        self.assertEqual(is_blurry(gray, config), is_blurry(image, config))
+        self.assertEqual(is_exposed_poorly(gray, config), is_exposed_poorly(image, config))
+
+    def test_uniform_image_is_blurry(self):
+        """A flat image has zero Laplacian variance."""
+        blurry, lap_var = is_blurry(make_image(128), QualityConfig())
+
+        self.assertTrue(blurry)
+        self.assertEqual(lap_var, 0.0)
+
+
+class TestExposure(unittest.TestCase):
+    """Test histogram-based exposure checks."""
+
+    def setUp(self):
+        """Set up default configuration."""
+        self.config = QualityConfig()
+
+    def test_dark_and_bright_fractions(self):
+        """Fractions should count pixels below dark and at/above bright thresholds."""
+        image = make_image(128)
+        image[:120] = self.config.dark_pixel_value - 1
+        image[120:240] = self.config.dark_pixel_value
+        image[-120:] = self.config.bright_pixel_value
+
+        too_dark, too_bright, dark_frac, bright_frac = is_exposed_poorly(image, self.config)
+
+        self.assertAlmostEqual(dark_frac, 0.25)
+        self.assertAlmostEqual(bright_frac, 0.25)
+        self.assertTrue(too_dark)
+        self.assertFalse(too_bright)
+
+    def test_mid_grey_is_well_exposed(self):
+        """A mid-grey image should be neither too dark nor too bright."""
+        too_dark, too_bright, dark_frac, bright_frac = is_exposed_poorly(
+            make_image(128), self.config
+        )
+
+        self.assertFalse(too_dark or too_bright)
+        self.assertEqual(dark_frac, 0.0)
+        self.assertEqual(bright_frac, 0.0)
+
+
+class TestCheckImageQuality(unittest.TestCase):
+    """Test the combined Stage 1 check."""
+
+    def setUp(self):
+        """Write a noisy test image to a temporary file."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        rng = np.random.default_rng(0)
+        self.image = rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+        self.image_path = str(Path(self.temp_dir.name) / "noise.png")
+        cv2.imwrite(self.image_path, self.image)
+        self.config = QualityConfig()
+
+    def test_matches_individual_checks(self):
+        """Combined results should match running each check separately."""
+        results = check_image_quality(self.image_path, self.config)
+
+        self.assertEqual(results["blurry"], is_blurry(self.image, self.config))
+        too_dark, too_bright, dark_frac, bright_frac = is_exposed_poorly(self.image, self.config)
+        self.assertEqual(
+            results["poor_exposure"], (too_dark or too_bright, (dark_frac, bright_frac))
+        )
+        self.assertEqual((results["too_dark"], results["too_bright"]), (too_dark, too_bright))
+        self.assertEqual(results["too_small"], is_too_small(self.image, self.config))
+        self.assertTrue(results["usable"])
+
+    def test_reduced_resolution_decode(self):
+        """Downscaled decoding should report full-size dimensions."""
+        jpeg_path = str(Path(self.temp_dir.name) / "noise.jpg")
+        cv2.imwrite(jpeg_path, self.image)
+        config = QualityConfig(heuristic_downscale=4)
+
+        results = check_image_quality(jpeg_path, config)
+
+        self.assertEqual(results["too_small"], (False, (640, 480)))
+
+    def test_header_size_follows_exif_orientation(self):
+        """Path and decoded-array checks should agree for rotated JPEGs."""
+        jpeg_path = str(Path(self.temp_dir.name) / "rotated.jpg")
+        portrait = np.random.default_rng(0).integers(0, 256, size=(500, 350, 3), dtype=np.uint8)
+        write_rotated_jpeg(jpeg_path, portrait)
+        config = QualityConfig(min_width=500, min_height=350, heuristic_downscale=8)
+
+        results = check_image_quality(jpeg_path, config)
+
+        self.assertEqual(results["too_small"], (False, (500, 350)))
+        self.assertEqual(results["too_small"], is_too_small(cv2.imread(jpeg_path), config))
+
+    def test_reduced_decode_size_rounds_down(self):
+        """A reduced decode should not round a too-small image up to the minimum."""
+        config = QualityConfig(min_width=640, min_height=480)
+
+        self.assertTrue(is_too_small(make_image(0, width=80, height=60), config, 8)[0])
+        self.assertFalse(is_too_small(make_image(0, width=81, height=61), config, 8)[0])
+
+    def test_accepts_decoded_image(self):
+        """Passing the decoded array should give the same results as the path."""
+        self.assertEqual(
+            check_image_quality(self.image, self.config),
+            check_image_quality(self.image_path, self.config),
+        )
+
+
+class TestReadImageSize(unittest.TestCase):
+    """Test reading image dimensions from file headers."""
+
+    def setUp(self):
+        """Create a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def write(self, name: str, params: tuple = ()) -> str:
+        """Write a 457x123 image and return its path."""
+        path = str(Path(self.temp_dir.name) / name)
+        cv2.imwrite(path, make_image(100, width=457, height=123), list(params))
+        return path
+
+    def test_jpeg_and_png(self):
+        """Baseline JPEG, progressive JPEG and PNG headers should be parsed."""
+        self.assertEqual(read_image_size(self.write("a.jpg")), (457, 123))
+        self.assertEqual(
+            read_image_size(self.write("p.jpg", (cv2.IMWRITE_JPEG_PROGRESSIVE, 1))), (457, 123)
+        )
+        self.assertEqual(read_image_size(self.write("a.png")), (457, 123))
+
+    def test_unsupported_or_broken(self):
+        """Other formats, truncated files and missing files should return None."""
+        self.assertIsNone(read_image_size(self.write("a.bmp")))
+
+        truncated = Path(self.temp_dir.name) / "truncated.jpg"
+        truncated.write_bytes(Path(self.write("b.jpg")).read_bytes()[:20])
+        self.assertIsNone(read_image_size(truncated))
+        self.assertIsNone(read_image_size(Path(self.temp_dir.name) / "missing.jpg"))
+
+
+class TestBufferPool(unittest.TestCase):
+    """Test reuse of thread-local scratch buffers."""
+
+    def test_reuses_buffer_for_smaller_shapes(self):
+        """Smaller requests should share memory with the existing buffer."""
+        pool = BufferPool()
+        large = pool.get("gray", (480, 640), np.uint8)
+        small = pool.get("gray", (240, 320), np.uint8)
+
+        self.assertEqual(small.shape, (240, 320))
+        self.assertTrue(np.shares_memory(large, small))
+
+    def test_grows_for_larger_shape_or_new_dtype(self):
+        """Larger shapes and different dtypes should allocate a new buffer."""
+        pool = BufferPool()
+        small = pool.get("lap", (10, 10), np.int16)
+        large = pool.get("lap", (20, 20), np.int16)
+        other = pool.get("lap", (20, 20), np.float32)
+
+        self.assertFalse(np.shares_memory(small, large))
+        self.assertEqual(other.dtype, np.float32)
+
+
+if __name__ == "__main__":
+    unittest.main()
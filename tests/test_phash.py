@@ -0,0 +1,69 @@
+"""
+Unit tests for the perceptual hash used to find visual duplicates.
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.phash import hamming_distance, phash_file, phash_image
+
+
+def _gradient_scene(seed: int) -> np.ndarray:
+    """Create a smooth random grayscale scene."""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, size=(12, 16), dtype=np.uint8)
+    return cv2.resize(coarse, (640, 480), interpolation=cv2.INTER_CUBIC)
+
+
+class TestPerceptualHash(unittest.TestCase):
+    """Test hash stability and separation."""
+
+    def test_hash_is_64_bit(self):
+        """Hashes should fit in 64 unsigned bits."""
+        image_hash = phash_image(_gradient_scene(0))
+
+        self.assertGreaterEqual(image_hash, 0)
+        self.assertLess(image_hash, 1 << 64)
+
+    def test_resized_and_brightened_image_is_close(self):
+        """Rescaling and a brightness shift should flip only a few bits."""
+        scene = _gradient_scene(1)
+        variant = cv2.convertScaleAbs(cv2.resize(scene, (320, 240)), alpha=1.0, beta=20)
+
+        self.assertLessEqual(hamming_distance(phash_image(scene), phash_image(variant)), 5)
+
+    def test_different_scenes_are_far(self):
+        """Unrelated images should differ in many bits."""
+        distance = hamming_distance(
+            phash_image(_gradient_scene(2)), phash_image(_gradient_scene(3))
+        )
+
+        self.assertGreater(distance, 10)
+
+    def test_file_hash(self):
+        """A saved JPEG should hash close to the array it was written from."""
+        scene = _gradient_scene(4)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "scene.jpg")
+            cv2.imwrite(path, scene)
+
+            self.assertLessEqual(hamming_distance(phash_file(path), phash_image(scene)), 5)
+            self.assertIsNone(phash_file(str(Path(tmp_dir) / "missing.jpg")))
+
+    def test_hamming_distance(self):
+        """Distance should count differing bits."""
+        self.assertEqual(hamming_distance(0, 0), 0)
+        self.assertEqual(hamming_distance(0b1011, 0b0001), 2)
+        self.assertEqual(hamming_distance(0, (1 << 64) - 1), 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Unit tests for ImageQualityService.
+
+Uses synthetic images and the traditional segmentation fallback, so neither
+sample data nor the YOLO model is required.
+"""
+
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.image_quality import ImageFailureReason, ImageQualityService
+from src.services.image_quality.segmentation import RoadSegmentation
+
+
+class QualityServiceTestCase(unittest.TestCase):
+    """Base class providing a service without the AI model and a temp image dir."""
+
+    def setUp(self):
+        """Create the service and temporary directory."""
+        patcher = patch.object(RoadSegmentation, "_load_model", return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = ImageQualityService()
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def write_image(self, name: str, image: np.ndarray) -> str:
+        """Write an image into the temp directory and return its path."""
+        path = str(Path(self.temp_dir.name) / name)
+        cv2.imwrite(path, image)
+        return path
+
+    def road_image(self, name: str = "road.png") -> str:
+        """Write a sharp, well exposed image with a flat grey road in the lower half."""
+        rng = np.random.default_rng(0)
+        image = rng.integers(60, 200, size=(480, 640, 3), dtype=np.uint8)
+        image[240:] = 100
+        return self.write_image(name, image)
+
+
+class TestEvaluate(QualityServiceTestCase):
+    """Test single image evaluation."""
+
+    def test_decodes_image_once(self):
+        """Heuristics and segmentation should share a single decode."""
+        path = self.road_image()
+
+        with patch("cv2.imread", wraps=cv2.imread) as mock_imread:
+            result = self.service.evaluate(path)
+
+        self.assertTrue(result.is_usable)
+        mock_imread.assert_called_once()
+
+    def test_small_image_rejected_from_header(self):
+        """Undersized images should fail without decoding pixels."""
+        path = self.write_image("small.jpg", np.full((100, 100, 3), 128, dtype=np.uint8))
+
+        with patch("cv2.imread", wraps=cv2.imread) as mock_imread:
+            result = self.service.evaluate(path)
+
+        mock_imread.assert_not_called()
+        self.assertFalse(result.is_usable)
+        self.assertEqual(result.failure_reasons, [ImageFailureReason.RESOLUTION_TOO_SMALL])
+        self.assertEqual(result.overall_score, result.size_score)
+        self.assertIsNone(result.blur_score)
+        self.assertIsNone(result.exposure_score)
+
+    def test_header_size_ignores_orientation(self):
+        """Images that would fit when rotated should be checked after decoding."""
+        path = self.write_image("portrait.jpg", np.full((500, 350, 3), 128, dtype=np.uint8))
+
+        with patch("cv2.imread", wraps=cv2.imread) as mock_imread:
+            result = self.service.evaluate(path)
+
+        mock_imread.assert_called()
+        self.assertIn(ImageFailureReason.RESOLUTION_TOO_SMALL, result.failure_reasons)
+        self.assertIsNotNone(result.blur_score)
+
+    def test_timestamp_serialised_as_iso(self):
+        """Timestamps are stored as epoch seconds and formatted on serialisation."""
+        result = self.service.evaluate(self.road_image())
+
+        self.assertIsInstance(result.timestamp, float)
+        timestamp = result.to_dict()["metadata"]["timestamp"]
+        self.assertAlmostEqual(
+            datetime.fromisoformat(timestamp).timestamp(), result.timestamp, places=5
+        )
+
+    def test_unreadable_image(self):
+        """Files that cannot be decoded should be reported as processing errors."""
+        path = Path(self.temp_dir.name) / "broken.jpg"
+        path.write_bytes(b"not an image")
+
+        result = self.service.evaluate(str(path))
+
+        self.assertEqual(result.failure_reasons, [ImageFailureReason.PROCESSING_ERROR])
+
+
+class TestEvaluateBatch(QualityServiceTestCase):
+    """Test concurrent batch evaluation."""
+
+    def test_matches_sequential_evaluation(self):
+        """Batch results should match evaluate() and keep input order."""
+        paths = [
+            self.road_image(),
+            self.write_image("dark.png", np.zeros((480, 640, 3), dtype=np.uint8)),
+            str(Path(self.temp_dir.name) / "missing.png"),
+            self.write_image("small.png", np.zeros((100, 100, 3), dtype=np.uint8)),
+        ]
+
+        results = self.service.evaluate_batch(paths, max_workers=4)
+
+        self.assertEqual([r.image_path for r in results], paths)
+        for path, result in zip(paths, results):
+            expected = self.service.evaluate(path)
+            self.assertEqual(result.is_usable, expected.is_usable)
+            self.assertEqual(result.failure_reasons, expected.failure_reasons)
+            self.assertEqual(result.overall_score, expected.overall_score)
+
+        self.assertTrue(results[0].is_usable)
+        self.assertIn(ImageFailureReason.TOO_DARK, results[1].failure_reasons)
+        self.assertEqual(results[2].failure_reasons, [ImageFailureReason.FILE_NOT_FOUND])
+        self.assertIn(ImageFailureReason.RESOLUTION_TOO_SMALL, results[3].failure_reasons)
+
+    def test_segments_survivors_in_one_call(self):
+        """Only images passing heuristics should be segmented, in a single call."""
+        paths = [
+            self.road_image("a.png"),
+            self.write_image("dark.png", np.zeros((480, 640, 3), dtype=np.uint8)),
+            self.road_image("b.png"),
+        ]
+
+        with patch.object(
+            self.service.segmentation,
+            "detect_road_surface_batch",
+            return_value=[(50.0, True), (5.0, False)],
+        ) as mock_batch:
+            results = self.service.evaluate_batch(paths)
+
+        mock_batch.assert_called_once_with([paths[0], paths[2]])
+        self.assertTrue(results[0].is_usable)
+        self.assertEqual(results[0].road_surface_percentage, 50.0)
+        self.assertIn(ImageFailureReason.TOO_DARK, results[1].failure_reasons)
+        self.assertEqual(results[2].failure_reasons, [ImageFailureReason.INSUFFICIENT_ROAD_SURFACE])
+
+    def test_empty_batch(self):
+        """An empty batch should return an empty list."""
+        self.assertEqual(self.service.evaluate_batch([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
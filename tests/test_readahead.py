@@ -0,0 +1,51 @@
+"""
+Unit tests for prefetching image files ahead of their use.
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils import readahead as readahead_module
+from src.utils.readahead import prefetch_file, readahead
+
+
+class TestReadahead(unittest.TestCase):
+    """Test the prefetch window and passthrough of paths."""
+
+    def test_paths_pass_through_in_order(self):
+        """All paths should be yielded unchanged, including a short tail."""
+        paths = [f"{i}.jpg" for i in range(6)]
+
+        with patch.object(readahead_module, "prefetch_file"):
+            self.assertEqual(list(readahead(paths, window=4)), paths)
+            self.assertEqual(list(readahead(paths[:2], window=4)), paths[:2])
+
+    def test_prefetch_stays_window_ahead(self):
+        """Each file should be prefetched `window` paths before it is consumed."""
+        prefetched = []
+        with patch.object(readahead_module, "prefetch_file", side_effect=prefetched.append):
+            stream = readahead([f"{i}.jpg" for i in range(6)], window=2)
+
+            self.assertEqual(next(stream), "0.jpg")
+            self.assertEqual(prefetched, ["0.jpg", "1.jpg", "2.jpg"])
+            self.assertEqual(next(stream), "1.jpg")
+            self.assertEqual(prefetched[-1], "3.jpg")
+
+    def test_prefetch_file_tolerates_missing_files(self):
+        """Prefetching should never raise for unreadable paths."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            existing = Path(tmp_dir) / "image.jpg"
+            existing.write_bytes(b"\xff\xd8" * 100)
+
+            prefetch_file(str(existing))
+            prefetch_file(str(Path(tmp_dir) / "missing.jpg"))
+
+
+if __name__ == "__main__":
+    unittest.main()
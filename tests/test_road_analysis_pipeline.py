@@ -0,0 +1,327 @@
+"""
+Unit tests for the batch modes and result cache of the road analysis pipeline.
+
+The quality and road services are mocked, so no models are loaded.
+"""
+
+import sys
+import tempfile
+import threading
+import unittest
+from collections import OrderedDict
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.image_quality import ImageFailureReason, ImageQualityMetrics
+from src.services.pipeline.road_analysis_pipeline import RoadAnalysisPipeline
+
+
+def _write_scene(path: Path, seed: int, brightness: int = 0) -> str:
+    """Write a smooth random scene as a JPEG and return its path."""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, size=(12, 16, 3), dtype=np.uint8)
+    scene = cv2.resize(coarse, (640, 480), interpolation=cv2.INTER_CUBIC)
+    cv2.imwrite(str(path), cv2.convertScaleAbs(scene, alpha=1.0, beta=brightness))
+    return str(path)
+
+
+class TestTwoStageBatch(unittest.TestCase):
+    """Test the quality stage feeding batched road analysis."""
+
+    def setUp(self):
+        """Create a pipeline with mocked quality and road services."""
+        self.pipeline = RoadAnalysisPipeline.__new__(RoadAnalysisPipeline)
+        self.pipeline.quality_service = MagicMock()
+        self.batches_lock = threading.Lock()
+        self.quality_chunks = []
+
+        def evaluate_batch(paths, max_workers=None):
+            with self.batches_lock:
+                self.quality_chunks.append(list(paths))
+            return [MagicMock(is_usable=not path.startswith("blurry")) for path in paths]
+
+        self.pipeline.quality_service.evaluate_batch.side_effect = evaluate_batch
+        self.pipeline.road_service = MagicMock()
+        self.batches = []
+
+        def assess_batch(paths):
+            with self.batches_lock:
+                self.batches.append(list(paths))
+            return [None if path.startswith("broken") else MagicMock() for path in paths]
+
+        self.pipeline.road_service.assess_road_quality_batch.side_effect = assess_batch
+
+    def test_results_in_input_order(self):
+        """Every image should get a result, in input order, with the gate applied."""
+        paths = ["a.jpg", "blurry.jpg", "b.jpg", "broken.jpg", "c.jpg"]
+
+        results = self.pipeline.process_batch(paths, max_workers=3, road_batch_size=2)
+
+        self.assertEqual(list(results), paths)
+        self.assertTrue(results["a.jpg"].processed_successfully)
+        self.assertTrue(results["c.jpg"].processed_successfully)
+        self.assertFalse(results["blurry.jpg"].processed_successfully)
+        self.assertIsNone(results["blurry.jpg"].road_metrics)
+        self.assertFalse(results["broken.jpg"].processed_successfully)
+
+    def test_only_usable_images_are_batched(self):
+        """Road batches should hold only usable images and respect the batch size."""
+        paths = [f"{name}{i}.jpg" for i in range(5) for name in ("road", "blurry")]
+
+        self.pipeline.process_batch(paths, max_workers=2, road_batch_size=3)
+
+        batched = [path for batch in self.batches for path in batch]
+        self.assertCountEqual(batched, [path for path in paths if path.startswith("road")])
+        self.assertTrue(all(1 <= len(batch) <= 3 for batch in self.batches))
+
+    def test_quality_checks_run_per_chunk(self):
+        """Each chunk of images should be quality-checked by one batched call."""
+        paths = [f"road{i}.jpg" for i in range(5)]
+
+        self.pipeline.process_batch(paths, max_workers=2, road_batch_size=2)
+
+        self.assertCountEqual(
+            self.quality_chunks,
+            [["road0.jpg", "road1.jpg"], ["road2.jpg", "road3.jpg"], ["road4.jpg"]],
+        )
+        self.pipeline.quality_service.evaluate.assert_not_called()
+
+    def test_failed_batch_marks_its_images(self):
+        """A raising road model call should fail only the images of that batch."""
+        self.pipeline.road_service.assess_road_quality_batch.side_effect = RuntimeError("boom")
+
+        results = self.pipeline.process_batch(["a.jpg", "b.jpg"], road_batch_size=4)
+
+        self.assertEqual(len(results), 2)
+        self.assertFalse(any(result.processed_successfully for result in results.values()))
+
+    def test_quality_error_is_processing_failure(self):
+        """An exception in the quality stage should not stop the batch."""
+        self.pipeline.quality_service.evaluate_batch.side_effect = OSError("unreadable")
+
+        results = self.pipeline.process_batch(["a.jpg"], road_batch_size=2)
+
+        self.assertFalse(results["a.jpg"].processed_successfully)
+        self.pipeline.road_service.assess_road_quality_batch.assert_not_called()
+
+
+class TestResultCache(unittest.TestCase):
+    """Test reusing results of visually near-identical images."""
+
+    def setUp(self):
+        """Create a pipeline with mocked models and a small result cache."""
+        self.pipeline = RoadAnalysisPipeline.__new__(RoadAnalysisPipeline)
+        self.pipeline.result_cache_size = 2
+        self.pipeline._result_cache = OrderedDict()
+        self.pipeline._result_cache_lock = threading.Lock()
+        self.pipeline.quality_service = MagicMock()
+        self.pipeline.quality_service.evaluate.side_effect = lambda path: ImageQualityMetrics(
+            image_path=path,
+            overall_score=80.0,
+            is_usable=True,
+            failure_reasons=[],
+            blur_score=80.0,
+            exposure_score=80.0,
+            size_score=80.0,
+            road_surface_percentage=40.0,
+            has_sufficient_road=True,
+            timestamp=0.0,
+            assessment_version="1.0.0",
+        )
+        self.pipeline.road_service = MagicMock()
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_path = Path(tmp_dir.name)
+
+    def test_near_identical_image_reuses_result(self):
+        """A brightened copy should reuse the metrics without running the models."""
+        original = _write_scene(self.tmp_path / "a.jpg", seed=1)
+        copy = _write_scene(self.tmp_path / "b.jpg", seed=1, brightness=15)
+
+        first = self.pipeline.process_image(original)
+        second = self.pipeline.process_image(copy)
+
+        self.pipeline.quality_service.evaluate.assert_called_once_with(original)
+        self.assertEqual(second.image_path, copy)
+        self.assertEqual(second.quality_metrics.image_path, copy)
+        self.assertIs(second.road_metrics, first.road_metrics)
+
+    def test_different_images_are_analysed(self):
+        """Unrelated images should each run through the models."""
+        self.pipeline.process_image(_write_scene(self.tmp_path / "a.jpg", seed=1))
+        self.pipeline.process_image(_write_scene(self.tmp_path / "b.jpg", seed=2))
+
+        self.assertEqual(self.pipeline.quality_service.evaluate.call_count, 2)
+
+    def test_processing_errors_are_not_cached(self):
+        """A failed analysis should be retried for the next near-identical image."""
+        self.pipeline.road_service.assess_road_quality.return_value = None
+        path = _write_scene(self.tmp_path / "a.jpg", seed=1)
+
+        result = self.pipeline.process_image(path)
+        self.pipeline.process_image(path)
+
+        self.assertIn(ImageFailureReason.PROCESSING_ERROR, result.quality_metrics.failure_reasons)
+        self.assertEqual(self.pipeline.quality_service.evaluate.call_count, 2)
+
+    def test_cache_is_bounded(self):
+        """The least recently used result should be evicted beyond the cache size."""
+        for seed in range(3):
+            self.pipeline.process_image(_write_scene(self.tmp_path / f"{seed}.jpg", seed=seed))
+
+        self.assertEqual(len(self.pipeline._result_cache), 2)
+
+
+class TestWarmUp(unittest.TestCase):
+    """Test warming the models up once across threads."""
+
+    def test_concurrent_warm_ups_run_once(self):
+        """Threads calling warm_up together should share one warm-up run."""
+        pipeline = RoadAnalysisPipeline.__new__(RoadAnalysisPipeline)
+        pipeline._warmed_up = False
+        pipeline._warm_up_lock = threading.Lock()
+        pipeline.quality_service = MagicMock()
+        pipeline.road_service = MagicMock()
+
+        threads = [threading.Thread(target=pipeline.warm_up) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        pipeline.quality_service.segmentation.detect_road_surface.assert_called_once()
+        pipeline.road_service.warm_up.assert_called_once()
+        pipeline.road_service.model.predict.assert_not_called()
+
+    def test_failed_warm_up_is_logged(self):
+        """A model that fails to warm up should be reported, not hidden."""
+        pipeline = RoadAnalysisPipeline.__new__(RoadAnalysisPipeline)
+        pipeline._warmed_up = False
+        pipeline._warm_up_lock = threading.Lock()
+        pipeline.quality_service = MagicMock()
+        pipeline.road_service = MagicMock()
+        pipeline.road_service.warm_up.side_effect = RuntimeError("weights missing")
+
+        with self.assertLogs(
+            "src.services.pipeline.road_analysis_pipeline", level="WARNING"
+        ) as logs:
+            pipeline.warm_up()
+
+        self.assertIn("weights missing", logs.output[0])
+        self.assertTrue(pipeline._warmed_up)
+
+
+class TestContentDeduplication(unittest.TestCase):
+    """Test analysing byte-identical files once per batch."""
+
+    def setUp(self):
+        """Create a pipeline whose analysis records the images it sees."""
+        self.pipeline = RoadAnalysisPipeline.__new__(RoadAnalysisPipeline)
+        self.analysed = []
+
+        def process_image(path):
+            self.analysed.append(path)
+            return MagicMock(
+                image_path=path,
+                quality_metrics=ImageQualityMetrics.create_failed(
+                    path, ImageFailureReason.TOO_BLURRY
+                ),
+                road_metrics=None,
+            )
+
+        self.pipeline.process_image = process_image
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_path = Path(tmp_dir.name)
+
+    def _write(self, name: str, content: bytes) -> str:
+        """Write a file into the temporary directory and return its path."""
+        path = self.tmp_path / name
+        path.write_bytes(content)
+        return str(path)
+
+    def test_identical_files_share_one_analysis(self):
+        """Copies should reuse the first copy's result under their own path."""
+        original = self._write("a.jpg", b"photo-1")
+        copy = self._write("b.jpg", b"photo-1")
+        same_size = self._write("c.jpg", b"photo-2")
+        other = self._write("d.jpg", b"another photo")
+
+        results = self.pipeline.process_batch([original, copy, same_size, other])
+
+        self.assertEqual(self.analysed, [original, same_size, other])
+        self.assertEqual(list(results), [original, copy, same_size, other])
+        self.assertEqual(results[copy].image_path, copy)
+        self.assertEqual(results[copy].quality_metrics.image_path, copy)
+        self.assertEqual(
+            results[copy].quality_metrics.failure_reasons, [ImageFailureReason.TOO_BLURRY]
+        )
+
+    def test_missing_files_are_still_analysed(self):
+        """Unreadable paths should pass through to the pipeline unchanged."""
+        missing = str(self.tmp_path / "missing.jpg")
+
+        results = self.pipeline.process_batch([missing])
+
+        self.assertEqual(self.analysed, [missing])
+        self.assertIn(missing, results)
+
+
+class TestPipelineStats(unittest.TestCase):
+    """Test the batch statistics summary."""
+
+    def setUp(self):
+        """Create a pipeline without loading any models."""
+        self.pipeline = RoadAnalysisPipeline.__new__(RoadAnalysisPipeline)
+
+    @staticmethod
+    def _result(success: bool, time_ms: float, quality: float = 0.0, road=None):
+        """Create a minimal pipeline result."""
+        return MagicMock(
+            processed_successfully=success,
+            processing_time_ms=time_ms,
+            quality_metrics=MagicMock(overall_score=quality),
+            road_metrics=None if road is None else MagicMock(overall_quality_score=road),
+        )
+
+    def test_stats(self):
+        """Counts, averages and extremes should cover the right subsets."""
+        results = {
+            "a.jpg": self._result(True, 100.0, quality=80.0, road=60.0),
+            "b.jpg": self._result(True, 200.0, quality=60.0),
+            "c.jpg": self._result(True, 300.0, quality=70.0, road=40.0),
+            "d.jpg": self._result(False, 20.0, quality=10.0),
+        }
+
+        stats = self.pipeline.get_pipeline_stats(results)
+
+        self.assertEqual(stats["total_images"], 4)
+        self.assertEqual(stats["successful_analyses"], 3)
+        self.assertEqual(stats["failed_quality_check"], 1)
+        self.assertEqual(stats["success_rate"], 75.0)
+        self.assertEqual(stats["processing_times"]["average_total_ms"], 155.0)
+        self.assertEqual(stats["processing_times"]["average_successful_ms"], 200.0)
+        self.assertEqual(stats["processing_times"]["average_failed_ms"], 20.0)
+        self.assertEqual(stats["quality_scores"], {"average": 70.0, "min": 60.0, "max": 80.0})
+        self.assertEqual(stats["road_scores"], {"average": 50.0, "min": 40.0, "max": 60.0})
+
+    def test_empty_results(self):
+        """An empty batch should report zeros rather than fail."""
+        stats = self.pipeline.get_pipeline_stats({})
+
+        self.assertEqual(stats["total_images"], 0)
+        self.assertEqual(stats["success_rate"], 0)
+        self.assertEqual(stats["processing_times"]["average_total_ms"], 0)
+        self.assertEqual(stats["quality_scores"], {"average": 0, "min": 0, "max": 0})
+        self.assertEqual(stats["road_scores"], {"average": 0, "min": 0, "max": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
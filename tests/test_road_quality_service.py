@@ -229,7 +229,7 @@ class TestYOLOv8RoadModel(unittest.TestCase):
     def test_model_loading_failure(self, mock_yolo):
         """Test model loading failure handling."""
         mock_yolo.side_effect = Exception("Model loading failed")
-        
+
         with self.assertRaises(RuntimeError) as context:
             self.model.load_model()
 
@@ -386,6 +386,20 @@ class TestRoadQualityService(unittest.TestCase):
 
         self.assertIsNone(result)
 
+    @patch("src.services.road_quality.road_quality_service.ModelFactory")
+    def test_warm_up_holds_model_lock(self, mock_factory):
+        """Test warm-up inference is serialised with other inference."""
+        mock_model = Mock()
+        mock_model.load_model.return_value = True
+        mock_factory.create_model.return_value = mock_model
+
+        service = RoadQualityService()
+        mock_model.predict.side_effect = lambda image: self.assertTrue(service._model_lock.locked())
+        service.warm_up(np.zeros((64, 64, 3), dtype=np.uint8))
+
+        mock_model.predict.assert_called_once()
+        self.assertFalse(service._model_lock.locked())
+
     @patch("src.services.road_quality.road_quality_service.ModelFactory")
     def test_get_service_info(self, mock_factory):
         """Test service information retrieval."""
@@ -441,6 +455,36 @@ class TestRoadQualityService(unittest.TestCase):
                 self.assertIn(path, results)
                 self.assertIsNotNone(results[path])
 
+    @patch("src.services.road_quality.road_quality_service.ModelFactory")
+    @patch("src.services.road_quality.road_quality_service.ImagePreprocessor")
+    def test_assess_road_quality_batch(self, mock_preprocessor_class, mock_factory):
+        """Test one model call per batch, skipping images that fail to load."""
+        mock_model = Mock()
+        mock_model.load_model.return_value = True
+        mock_model.predict_batch.return_value = [
+            {"crack_confidence": 0.1},
+            {"crack_confidence": 0.9},
+        ]
+        mock_model.get_model_info.return_value = {"model_name": "YOLOv8", "version": "1.0.0"}
+        mock_factory.create_model.return_value = mock_model
+
+        mock_preprocessor = Mock()
+        mock_preprocessor.load_and_preprocess.side_effect = [
+            np.zeros((1, 224, 224, 3)),
+            None,
+            np.ones((1, 224, 224, 3)),
+        ]
+        mock_preprocessor_class.return_value = mock_preprocessor
+
+        service = RoadQualityService()
+        results = service.assess_road_quality_batch(["a.jpg", "missing.jpg", "b.jpg"])
+
+        mock_model.predict_batch.assert_called_once()
+        self.assertEqual(len(mock_model.predict_batch.call_args.args[0]), 2)
+        self.assertIsNone(results[1])
+        self.assertEqual(results[0].crack_confidence, 0.1)
+        self.assertEqual(results[2].crack_confidence, 0.9)
+
 
 class TestIntegration(unittest.TestCase):
     """Integration tests for the complete road quality assessment pipeline."""
@@ -0,0 +1,104 @@
+"""
+Unit tests for the traditional computer vision road segmentation fallback.
+
+Uses synthetic images so neither sample data nor the YOLO model is required.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import cv2
+import numpy as np
+
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.image_quality.segmentation import RoadSegmentation
+
+
+class TestColorTextureDetection(unittest.TestCase):
+    """Test road detection by colour and texture."""
+
+    def setUp(self):
+        """Create a segmenter without loading the AI model."""
+        with patch.object(RoadSegmentation, "_load_model", return_value=False):
+            self.segmentation = RoadSegmentation()
+
+    def detect(self, bgr: np.ndarray) -> np.ndarray:
+        """Run colour/texture detection on a BGR image."""
+        gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+        return self.segmentation._detect_road_by_color_texture(gray, hsv)
+
+    def test_flat_grey_is_road(self):
+        """A smooth mid-grey surface should be detected as road everywhere."""
+        mask = self.detect(np.full((120, 160, 3), 100, dtype=np.uint8))
+
+        self.assertEqual(mask.dtype, np.uint8)
+        self.assertTrue((mask == 255).all())
+
+    def test_high_texture_is_not_road(self):
+        """Strong high-frequency texture should be rejected."""
+        checker = np.indices((120, 160)).sum(axis=0) % 2 * 150 + 30
+        image = np.repeat(checker[:, :, None], 3, axis=2).astype(np.uint8)
+        image[::4] = 255
+
+        mask = self.detect(image)
+
+        self.assertLess(np.count_nonzero(mask) / mask.size, 0.1)
+
+    def test_saturated_colour_is_not_road(self):
+        """Flat but strongly coloured areas should be rejected."""
+        image = np.zeros((120, 160, 3), dtype=np.uint8)
+        image[:, :] = (0, 0, 150)  # flat red in BGR
+
+        mask = self.detect(image)
+
+        self.assertFalse(mask.any())
+
+    def test_color_thresholds_are_exclusive(self):
+        """Brightness bounds 30 and 180 and saturation 50 should not count as road."""
+        values = [30, 31, 179, 180]
+        image = np.concatenate(
+            [np.full((40, 40, 3), value, dtype=np.uint8) for value in values], axis=1
+        )
+
+        mask = self.detect(image)
+
+        for i, expected in enumerate([0, 255, 255, 0]):
+            self.assertEqual(mask[20, i * 40 + 20], expected, f"value={values[i]}")
+
+
+class TestRoadPercentage(unittest.TestCase):
+    """Test road coverage from YOLO segmentation results."""
+
+    @staticmethod
+    def make_result(masks: np.ndarray, classes: list[int]) -> Mock:
+        """Build a fake YOLO result exposing tensors via .cpu().numpy()."""
+        result = Mock()
+        result.masks.data.cpu.return_value.numpy.return_value = masks
+        result.boxes.cls.cpu.return_value.numpy.return_value = np.array(classes)
+        return result
+
+    def test_union_of_vehicle_masks(self):
+        """Coverage should be the union of masks for road-indicating classes."""
+        masks = np.zeros((3, 10, 10), dtype=np.float32)
+        masks[0, :5] = 1.0  # car, top half
+        masks[1, 3:6] = 1.0  # bus, overlaps car
+        masks[2, 8:] = 1.0  # class 15 (cat), ignored
+
+        percentage = RoadSegmentation._road_percentage(self.make_result(masks, [2, 5, 15]))
+
+        self.assertAlmostEqual(percentage, 60.0)
+
+    def test_no_vehicles_assumes_default(self):
+        """Without road-indicating detections the default estimate is used."""
+        masks = np.ones((1, 10, 10), dtype=np.float32)
+
+        self.assertEqual(RoadSegmentation._road_percentage(self.make_result(masks, [15])), 40.0)
+
+
+if __name__ == "__main__":
+    unittest.main()